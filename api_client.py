@@ -0,0 +1,260 @@
+"""
+Cliente HTTP compartido para football-data.org.
+
+- Una única requests.Session con pool de conexiones para todas las llamadas.
+- RateGovernor: ritmo adaptativo a partir de las cabeceras de cuota del API
+  (X-Requests-Available-Minute / X-RequestCounter-Reset); sin cabeceras usa un
+  token bucket con el límite configurado.
+- 429: respeta Retry-After con backoff exponencial con jitter.
+- El estado (cuota, bloqueos, circuitos) es por proceso y se comparte entre
+  sus hilos. En multi-worker solo el líder del lease llama al API, así que
+  la cuota del proceso es la de la cuenta.
+- CircuitBreaker: tras errores repetidos de plan/autenticación en un endpoint
+  o competición deja de llamarlo durante un tiempo.
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+
+class CircuitOpenError(Exception):
+    """El circuito de esta clave está abierto: no se hace la petición."""
+
+
+class TokenBucket:
+    """
+    Token bucket seguro entre hilos. Cada acquire() reserva un token y duerme
+    exactamente hasta que ese token esté disponible (sin esperas fijas).
+    """
+
+    def __init__(self, rate_per_min: float, capacity: float = 1.0):
+        self.rate     = rate_per_min / 60.0   # tokens por segundo
+        self.capacity = max(1.0, capacity)
+        self.tokens   = self.capacity
+        self._stamp   = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def reserve(self) -> float:
+        """Reserva un token. Retorna los segundos a esperar para usarlo."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self.tokens -= 1.0
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def acquire(self) -> float:
+        """Reserva un token y espera. Retorna los segundos esperados."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RateGovernor:
+    """
+    Reparte las peticiones restantes de la ventana actual de forma uniforme
+    hasta el reset que anuncia el API. Mientras no hay cabeceras, o si la
+    última respuesta con cabeceras tiene más de `header_ttl` segundos, se usa
+    el token bucket configurado.
+    """
+
+    def __init__(self, rate_per_min: float, burst: float = 1.0, header_ttl: float = 120.0):
+        self.bucket        = TokenBucket(rate_per_min, burst)
+        self.header_ttl    = header_ttl
+        self._remaining    = None   # peticiones que quedan en la ventana
+        self._reset_at     = 0.0    # monotonic en que se reinicia la ventana
+        self._window_quota = None   # cuota por ventana aprendida de las cabeceras
+        self._updated_at   = 0.0    # monotonic de las últimas cabeceras recibidas
+        self._next_slot    = 0.0
+        self._blocked      = 0.0    # Retry-After: nadie llama antes de esto
+        self._lock         = threading.Lock()
+
+    def acquire(self) -> float:
+        """Espera hasta el siguiente hueco permitido. Retorna los segundos esperados."""
+        with self._lock:
+            now = time.monotonic()
+            if self._remaining is not None and now - self._updated_at > self.header_ttl:
+                # Cabeceras caducadas: lo aprendido ya no es fiable, vuelve el token bucket
+                self._remaining    = None
+                self._window_quota = None
+            if self._remaining is not None and now >= self._reset_at and self._window_quota:
+                # Nueva ventana: el API repone la cuota completa
+                self._remaining = self._window_quota
+                self._reset_at  = now + 60.0
+            if self._remaining is None:
+                slot = now + self.bucket.reserve()
+            elif self._remaining > 0:
+                interval = max(0.0, self._reset_at - now) / self._remaining
+                slot = max(now, self._next_slot)
+                self._next_slot = slot + interval
+                self._remaining -= 1
+            else:
+                slot = max(now, self._reset_at)
+                self._next_slot = slot
+            slot = max(slot, self._blocked)
+        wait = max(0.0, slot - time.monotonic())
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def update(self, headers):
+        """Sincroniza la cuota con las cabeceras de la respuesta (si vienen)."""
+        remaining = headers.get("X-Requests-Available-Minute")
+        reset     = headers.get("X-RequestCounter-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining, reset = int(remaining), float(reset)
+        except ValueError:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._remaining    = max(0, remaining)
+            self._reset_at     = now + max(0.0, reset)
+            self._window_quota = max(self._window_quota or 0, remaining + 1)
+            self._updated_at   = now
+
+    def block_for(self, seconds: float):
+        """Retry-After: bloquea a todos los hilos del proceso `seconds` segundos."""
+        with self._lock:
+            self._blocked = max(self._blocked, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """Circuito por clave (endpoint o competición) para errores de plan/autenticación."""
+
+    def __init__(self, threshold: int = 3, cooldown: float = 1800.0):
+        self.threshold = threshold
+        self.cooldown  = cooldown
+        self._failures = {}   # clave -> fallos consecutivos
+        self._open     = {}   # clave -> monotonic hasta el que está abierto
+        self._lock     = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        """False si el circuito está abierto. Pasado el cooldown deja pasar una prueba."""
+        with self._lock:
+            until = self._open.get(key)
+            if until is None:
+                return True
+            if time.monotonic() >= until:
+                # Semiabierto: una petición de prueba; si falla, vuelve a abrirse
+                self._open[key] = time.monotonic() + self.cooldown
+                return True
+            return False
+
+    def record_failure(self, key: str) -> bool:
+        """Registra un fallo. Retorna True si el circuito se acaba de abrir."""
+        with self._lock:
+            self._failures[key] = self._failures.get(key, 0) + 1
+            if self._failures[key] >= self.threshold and key not in self._open:
+                self._open[key] = time.monotonic() + self.cooldown
+                return True
+            return False
+
+    def record_success(self, key: str):
+        with self._lock:
+            self._failures.pop(key, None)
+            self._open.pop(key, None)
+
+    def open_keys(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            return sorted(k for k, until in self._open.items() if until > now)
+
+
+def _is_plan_or_auth_error(resp) -> bool:
+    if resp.status_code in (401, 403):
+        return True
+    if resp.status_code == 400:
+        text = resp.text.lower()
+        return "plan" in text or "token" in text or "restricted" in text
+    return False
+
+
+class ApiClient:
+    """Cliente único de football-data.org para FixItPRO."""
+
+    def __init__(self, token: str, rate_per_min: float, burst: float = 1.0,
+                 user_agent: str = "FixItFootball/2.0", pool_size: int = 8,
+                 max_retries: int = 3, breaker_threshold: int = 3, breaker_cooldown: float = 1800.0,
+                 recorder=None, log=None):
+        self.session = requests.Session()
+        # Sin proxies del entorno: evitaban cuelgues en Render
+        self.session.trust_env = False
+        self.session.headers.update({"X-Auth-Token": token or "", "User-Agent": user_agent})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.governor    = RateGovernor(rate_per_min, burst)
+        self.breaker     = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.max_retries = max_retries
+        self.recorder    = recorder
+        self._log        = log or (lambda msg: None)
+
+    def get(self, url: str, endpoint: str, circuit_key: str = None, timeout=15, params: dict = None):
+        """
+        GET con ritmo adaptativo, reintentos ante 429/5xx y circuit breaker.
+        Lanza CircuitOpenError si `circuit_key` (por defecto `endpoint`) está abierto.
+        `params` va a la query string sin formar parte de `url`, que es lo que
+        se graba y se loguea (credenciales como apiKey van aquí).
+        """
+        key = circuit_key or endpoint
+        if not self.breaker.allow(key):
+            raise CircuitOpenError(f"Circuito abierto para {key}")
+
+        for attempt in range(self.max_retries + 1):
+            metrics.RATE_LIMIT_WAIT_SECONDS.observe(self.governor.acquire(), endpoint=endpoint)
+            start = time.perf_counter()
+            try:
+                resp = self.session.get(url, params=params, timeout=timeout)
+            except Exception:
+                metrics.API_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, status="error")
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            metrics.API_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint,
+                                                status=resp.status_code)
+            self.governor.update(resp.headers)
+            if self.recorder is not None:
+                try:
+                    self.recorder.record(url, resp)
+                except Exception as e:
+                    self._log(f"ApiClient: No se pudo grabar {url} ({e})")
+
+            if resp.status_code == 429 and attempt < self.max_retries:
+                retry_after = self._retry_after(resp)
+                self.governor.block_for(retry_after)
+                self._log(f"ApiClient: 429 en {endpoint}, reintento en {retry_after:.1f}s")
+                time.sleep(retry_after + self._backoff(attempt))
+                continue
+            if resp.status_code >= 500 and attempt < self.max_retries:
+                time.sleep(self._backoff(attempt))
+                continue
+            if _is_plan_or_auth_error(resp):
+                if self.breaker.record_failure(key):
+                    self._log(f"ApiClient: Circuito abierto para {key} tras errores de plan/auth: {resp.text[:100]}")
+            elif resp.status_code < 400:
+                self.breaker.record_success(key)
+            return resp
+        return resp
+
+    @staticmethod
+    def _retry_after(resp) -> float:
+        for header in ("Retry-After", "X-RequestCounter-Reset"):
+            try:
+                return max(0.0, float(resp.headers[header]))
+            except (KeyError, ValueError):
+                continue
+        return 6.0
+
+    @staticmethod
+    def _backoff(attempt: int, base: float = 0.5, cap: float = 10.0) -> float:
+        """Backoff exponencial con jitter completo."""
+        return random.uniform(0, min(cap, base * (2 ** attempt)))
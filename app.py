@@ -1,10 +1,72 @@
-from flask import Flask, render_template
+from flask import Flask, render_template, request, Response, g
 import main
+import metrics
+import applog
+import time
+import gzip
+import hashlib
+import threading
 import urllib.parse
-from datetime import datetime
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from html import escape
 
 app = Flask(__name__)
 
+# ─────────────────────────────────────────────────────────
+#  CACHE DE LA PÁGINA PRINCIPAL
+# ─────────────────────────────────────────────────────────
+CachedPage = namedtuple("CachedPage", "key html gzip etag last_modified")
+
+
+class PageCache:
+    """
+    HTML renderizado de `/` (y su copia gzip) indexado por la versión del
+    snapshot del motor y la fecha mostrada. Cualquier cambio de picks, stats o
+    estado de sincronización cambia la versión y la invalida.
+    """
+
+    def __init__(self):
+        self._entry = None
+        self._lock  = threading.Lock()
+
+    def get(self, key, published_at: float, render) -> CachedPage:
+        entry = self._entry
+        if entry is not None and entry.key == key:
+            return entry
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry.key != key:
+                html  = render().encode("utf-8")
+                entry = CachedPage(
+                    key=key,
+                    html=html,
+                    gzip=gzip.compress(html, compresslevel=6),
+                    # ETag por contenido: coherente entre workers con distinta versión local
+                    etag=hashlib.sha1(html).hexdigest()[:20],
+                    last_modified=datetime.fromtimestamp(int(published_at), dt_timezone.utc),
+                )
+                self._entry = entry
+        return entry
+
+
+PAGE_CACHE = PageCache()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(resp):
+    start = getattr(g, "request_start", None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "<no-match>"
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route=route,
+                                             method=request.method, status=resp.status_code)
+    return resp
+
+
 @app.before_request
 def start_engine_on_first_load():
     # Solo ejecutar una vez por proceso
@@ -12,6 +74,7 @@ def start_engine_on_first_load():
         from main import init_engine
         init_engine()
         main.engine._thread_initialized = True
+    main.engine.refresh_from_snapshot()
 
 @app.template_filter('urlencode')
 def urlencode_filter(s):
@@ -24,14 +87,29 @@ def debug():
     import os
     from main import engine
     key = os.getenv("FOOTBALLDATA_API_KEY") or os.getenv("FOOTBALL_API_KEY")
-    top_pick = engine.cached_picks[0] if engine.cached_picks else {}
+    snap = main.get_snapshot()
+    top_pick = snap.picks[0] if snap.picks else {}
+    job = engine.sync.current()
     return {
         "api_key_detected": "SI" if key else "NO",
         "api_key_preview": key[:4] if key and len(key) >= 4 else "????",
-        "engine_status": engine.last_updated,
-        "picks_count": len(engine.cached_picks),
-        "matches_count": len(engine.matches),
+        "engine_status": snap.last_updated,
+        "picks_count": len(snap.picks),
+        "matches_count": snap.matches_count,
+        "snapshot_version": snap.version,
         "thread_started": getattr(engine, '_thread_started', False),
+        "role": engine.role,
+        "snapshot_generation": engine._snapshot_generation,
+        "history_cache": engine.history_cache.counters(),
+        "api_open_circuits": engine.api.breaker.open_keys(),
+        "sync_job": job.to_dict() if job else engine.leader_job,
+        "scheduled_jobs": engine.scheduler.pending()[:20],
+        "background_jobs": {"settlement": engine.settle_queue.pending(),
+                            "projections": engine.projection_queue.pending()},
+        "ledger": engine.ledger.counters(),
+        "league_models": main.LEAGUE_MODELS.summary(),
+        "odds": engine.odds.counters() if engine.odds else None,
+        "logs": applog.LOGGER.counters(),
         "top_pick_sample": {
             "teams": top_pick.get("teams", "n/a"),
             "market": top_pick.get("market", "n/a"),
@@ -39,18 +117,107 @@ def debug():
         }
     }
 
+# Espera máxima permitida a un cliente de /sync?wait=N (segundos)
+SYNC_MAX_WAIT = 120.0
+
+
+def _sync_wait_seconds() -> float:
+    try:
+        return min(max(float(request.args.get("wait", 0)), 0.0), SYNC_MAX_WAIT)
+    except ValueError:
+        return 0.0
+
+
+def _job_response(job, coalesced: bool = None):
+    body = {"job": job.to_dict()}
+    if coalesced is not None:
+        body["coalesced"] = coalesced
+    return body, (200 if job.finished else 202)
+
+
 @app.route('/sync')
 def sync():
-    """Fuerza una sincronización inmediata del motor."""
-    import threading
+    """
+    Pide una sincronización al coordinador single-flight.
+    ?comp=PL,SA  refresca solo esas competiciones y fusiona sus picks
+    ?wait=30     bloquea hasta que termine (o venza el timeout)
+    """
     from main import engine
-    # Solo lanzar un nuevo hilo si no hay uno activo
-    with engine._lock:
-        if engine.is_fetching:
-            return {"status": "Sincronización ocupada", "message": "Ya hay una actualización en curso. Por favor, espera a que termine."}
+    comps = None
+    if request.args.get("comp"):
+        comps = sorted({c.strip().upper() for c in request.args["comp"].split(",") if c.strip()})
+        unknown = [c for c in comps if c not in main.ENABLED_COMPETITIONS]
+        if unknown:
+            return {"error": "unknown_competition", "unknown": unknown,
+                    "enabled": sorted(main.ENABLED_COMPETITIONS)}, 400
+    # En modo multi-worker solo el líder consulta el API
+    if engine.role == "follower":
+        engine.shared.request_sync(comps)
+        return {"job": None, "requested": {"comps": comps}, "leader_job": engine.leader_job}, 202
+    job, coalesced = engine.sync.submit(comps)
+    if not coalesced:
         engine.last_updated = "Sincronizando manualmente..."
-    threading.Thread(target=engine.fetch_data, daemon=True).start()
-    return {"status": "Sincronización iniciada", "message": "Procesando datos del API. Esto puede tardar 1-2 minutos..."}
+    wait = _sync_wait_seconds()
+    if wait:
+        job.wait(wait)
+    return _job_response(job, coalesced)
+
+
+@app.route('/sync/<int:job_id>')
+def sync_status(job_id):
+    """Progreso de una sincronización (?wait=N para bloquear hasta que termine)."""
+    from main import engine
+    job = engine.sync.get(job_id)
+    if job is None:
+        return {"error": "unknown_job", "id": job_id, "leader_job": engine.leader_job}, 404
+    wait = _sync_wait_seconds()
+    if wait:
+        job.wait(wait)
+    return _job_response(job)
+
+@app.route('/ledger/export')
+def ledger_export():
+    """
+    Exporta el ledger de picks en streaming (?format=ndjson|csv).
+    Filtros indexados: ?from=YYYY-MM-DD&to=YYYY-MM-DD&league=...&market=<market_key>
+    """
+    fmt = request.args.get("format", "ndjson").lower()
+    if fmt not in ("ndjson", "csv"):
+        return {"error": "unknown_format", "formats": ["ndjson", "csv"]}, 400
+    filters = {"date_from": request.args.get("from"), "date_to": request.args.get("to"),
+               "league": request.args.get("league"), "market": request.args.get("market")}
+    if fmt == "csv":
+        resp = Response(main.engine.ledger.export_csv(**filters), mimetype="text/csv")
+    else:
+        resp = Response(main.engine.ledger.export_ndjson(**filters), mimetype="application/x-ndjson")
+    resp.headers["Content-Disposition"] = f"attachment; filename=picks.{fmt}"
+    return resp
+
+@app.route('/ledger/summary')
+def ledger_summary():
+    """Agregados del ledger: aciertos y fallos totales, por liga y por mercado."""
+    return {"aggregates": main.engine.ledger.summary(), "ledger": main.engine.ledger.counters()}
+
+@app.route('/projections')
+def projections():
+    """Resumen de las proyecciones de temporada disponibles."""
+    summary = {}
+    for comp in main.SIM_COMPETITIONS:
+        result = main.engine.get_projection(comp)
+        if result:
+            leader = result["table"][0] if result["table"] else {}
+            summary[comp] = {"league": result["league"], "simulations": result["simulations"],
+                             "remaining_matches": result["remaining_matches"],
+                             "simulated_at": result["simulated_at"],
+                             "favourite": {"team": leader.get("team"), "title": leader.get("title")}}
+    return {"competitions": summary}
+
+@app.route('/projections/<comp>')
+def projection(comp):
+    result = main.engine.get_projection(comp.upper())
+    if result is None:
+        return {"error": "no_projection", "comp": comp, "available": main.SIM_COMPETITIONS}, 404
+    return result
 
 @app.route('/test-api')
 def test_api():
@@ -68,36 +235,75 @@ def test_api():
 @app.route('/health')
 def health():
     """Ruta de salud para monitoreo de despliegue."""
-    return {"status": "healthy", "engine_status": main.engine.last_updated}, 200
+    return {"status": "healthy", "engine_status": main.get_snapshot().last_updated}, 200
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Métricas del proceso en formato de texto de Prometheus."""
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+# Registros máximos por página de /p-logs
+LOG_PAGE_MAX = 1000
 
 @app.route('/p-logs')
 def p_logs():
-    return "<br>".join(main.LOG_BUFFER)
+    """
+    Logs del proceso desde el ring buffer, paginados por cursor.
+    ?since=<cursor>&level=WARNING&phase=history&fixture=<id>&limit=N&format=json|html
+    Sin `since` devuelve los más recientes; `next` es el cursor de la página siguiente.
+    """
+    try:
+        since = int(request.args["since"]) if request.args.get("since") else None
+        limit = min(max(int(request.args.get("limit", 200)), 1), LOG_PAGE_MAX)
+        page  = applog.LOGGER.query(since=since, level=request.args.get("level"),
+                                    phase=request.args.get("phase"), fixture_id=request.args.get("fixture"),
+                                    limit=limit)
+    except ValueError as e:
+        return {"error": "bad_request", "detail": str(e)}, 400
+    if request.args.get("format", "html").lower() == "json":
+        return {**page, "records": [r.to_dict() for r in page["records"]]}
+    return "<br>".join(escape(r.format()) for r in page["records"])
 
 @app.route('/')
 def index():
-    # Obtener el Top picks actual
-    top_picks = main.get_all_money_machine_picks()
-    
-    # Obtener Estadísticas y Ranking de Ligas
-    stats = main.get_stats()
-    top_leagues = main.get_top_leagues_rank()
-    
-    # Obtener la Cartelera Diaria para el Sidebar
-    sidebar_matches = main.get_daily_leagues_matches()
+    # Un único snapshot inmutable por petición: picks, stats y sidebar coherentes
+    snap = main.get_snapshot()
     
     # Fecha de hoy dinámica (España CET)
     from datetime import timezone, timedelta
     tz_spain = timezone(timedelta(hours=1))
     hoy_str = datetime.now(tz_spain).strftime("%Y-%m-%d")
     
-    return render_template('index.html', 
-                           picks=top_picks, 
-                           stats=stats,
-                           top_leagues=top_leagues,
-                           sidebar_matches=sidebar_matches,
+    page = PAGE_CACHE.get((snap.version, hoy_str), snap.published_at, lambda: render_template(
+                           'index.html', 
+                           picks=snap.picks, 
+                           stats=snap.stats,
+                           top_leagues=snap.top_leagues,
+                           sidebar_matches=snap.sidebar,
                            hoy=hoy_str,
-                           last_sync=main.engine.last_updated)
+                           last_sync=snap.last_updated))
+
+    # Cada representación (gzip / sin comprimir) lleva su propio ETag fuerte
+    use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+    etag     = f"{page.etag}-gz" if use_gzip else page.etag
+
+    # 304 si el navegador ya tiene esta versión
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(request.if_modified_since) and request.if_modified_since >= page.last_modified
+    if not_modified:
+        resp = Response(status=304)
+    elif use_gzip:
+        resp = Response(page.gzip, mimetype="text/html")
+        resp.headers["Content-Encoding"] = "gzip"
+    else:
+        resp = Response(page.html, mimetype="text/html")
+    resp.set_etag(etag)
+    resp.last_modified = page.last_modified
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
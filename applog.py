@@ -0,0 +1,284 @@
+"""
+Logs del motor: registros estructurados en un ring buffer y escritura en segundo plano.
+
+- log() crea un LogRecord (cursor, ts, nivel, pid, fase, fixture, mensaje),
+  lo añade a un ring buffer de tamaño fijo (deque con maxlen: O(1), los más
+  antiguos se descartan solos) y lo encola para el escritor. No hace I/O:
+  el hilo de la sync nunca espera a stdout ni al disco.
+- Un hilo daemon vacía la cola hacia stdout y, si se define LOG_FILE, a un
+  fichero, con un flush por lote en vez de uno por línea. Si la cola se
+  llena (stdout bloqueado) la línea se descarta y se cuenta; el registro
+  sigue en el buffer.
+- LOG_LEVEL filtra en origen: lo que queda por debajo no se guarda ni se escribe.
+- La fase es por hilo (set_phase / phase()): la sync marca la fase en curso
+  y los logs de ese hilo la heredan si no pasan una explícita.
+- query() pagina por cursor: `since` es el cursor del último registro visto
+  y se devuelven los posteriores, filtrados por nivel, fase o fixture.
+"""
+import atexit
+import os
+import queue
+import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+LEVELS      = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+LEVEL_NAMES = {v: k for k, v in LEVELS.items()}
+
+
+def parse_level(level) -> int:
+    """'warning' / 'WARNING' / 30 → 30. ValueError si no es un nivel conocido."""
+    if isinstance(level, int):
+        return level
+    try:
+        return LEVELS[str(level).strip().upper()]
+    except KeyError:
+        raise ValueError(f"nivel desconocido: {level!r} (válidos: {', '.join(LEVELS)})") from None
+
+
+class LogRecord:
+    """Un log: `seq` es el cursor (creciente, contiguo entre los registros guardados)."""
+    __slots__ = ("seq", "ts", "level", "pid", "phase", "fixture_id", "msg")
+
+    def __init__(self, seq: int, ts: datetime, level: int, pid: int, phase, fixture_id, msg: str):
+        self.seq        = seq
+        self.ts         = ts
+        self.level      = level
+        self.pid        = pid
+        self.phase      = phase
+        self.fixture_id = fixture_id
+        self.msg        = msg
+
+    @property
+    def level_name(self) -> str:
+        return LEVEL_NAMES.get(self.level, str(self.level))
+
+    def format(self) -> str:
+        """'[ts][PID:n] msg' de siempre, con etiquetas de nivel (salvo INFO), fase y fixture."""
+        tags = "" if self.level == LEVELS["INFO"] else f"[{self.level_name}]"
+        if self.phase:
+            tags += f"[{self.phase}]"
+        if self.fixture_id is not None:
+            tags += f"[fx:{self.fixture_id}]"
+        return f"[{self.ts}][PID:{self.pid}]{tags} {self.msg}"
+
+    def to_dict(self) -> dict:
+        return {"seq": self.seq, "ts": self.ts.isoformat(), "level": self.level_name, "pid": self.pid,
+                "phase": self.phase, "fixture_id": self.fixture_id, "msg": self.msg}
+
+
+class LogSink:
+    """Escritor en segundo plano: cola acotada → stdout (+ fichero opcional)."""
+
+    def __init__(self, path: str = None, maxsize: int = 10000, stream=None):
+        self.path     = path
+        self.maxsize  = maxsize
+        self.stream   = stream
+        self.dropped  = 0
+        self._queue   = None
+        self._thread  = None
+        self._file    = None
+        self._lock    = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._queue  = queue.Queue(self.maxsize)
+                self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+                self._thread.start()
+
+    def put(self, record: LogRecord):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        q = self._queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            self._write([r for r in batch if r is not None])
+            for _ in batch:
+                q.task_done()
+            if stop:
+                return
+
+    def _write(self, records: list):
+        if not records:
+            return
+        text = "".join(r.format() + "\n" for r in records)
+        try:
+            stream = self.stream or sys.stdout
+            stream.write(text)
+            stream.flush()
+        except Exception:
+            pass
+        if self.path:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(text)
+                self._file.flush()
+            except Exception:
+                pass
+
+    def flush(self, timeout: float = 2.0):
+        """Espera (como mucho `timeout` s) a que el escritor vacíe la cola."""
+        q = self._queue
+        if q is None:
+            return
+        done = threading.Event()
+        threading.Thread(target=lambda: (q.join(), done.set()), daemon=True).start()
+        done.wait(timeout)
+
+    def close(self, timeout: float = 2.0):
+        """Vacía la cola y detiene el escritor (atexit)."""
+        with self._lock:
+            thread, q = self._thread, self._queue
+            self._thread = None
+        if thread is None:
+            return
+        try:
+            q.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def after_fork(self):
+        """El hilo escritor no sobrevive a fork(): el hijo arranca el suyo al primer log."""
+        self._lock    = threading.Lock()
+        self._thread  = None
+        self._queue   = None
+        self._file    = None
+
+
+class RingLog:
+    """Ring buffer de LogRecord + filtro de nivel + fase por hilo."""
+
+    def __init__(self, capacity: int = 2000, level="INFO", sink: LogSink = None):
+        self.capacity = capacity
+        self.level    = parse_level(level)
+        self.sink     = sink
+        self.pid      = os.getpid()
+        self._ring    = deque(maxlen=capacity)
+        self._seq     = 0
+        self._lock    = threading.Lock()
+        self._local   = threading.local()
+
+    # ── Fase por hilo ─────────────────────────────────────
+    def set_phase(self, name):
+        """Fija la fase de los próximos logs de este hilo. Retorna la anterior."""
+        previous = getattr(self._local, "phase", None)
+        self._local.phase = name
+        return previous
+
+    @contextmanager
+    def phase(self, name):
+        previous = self.set_phase(name)
+        try:
+            yield
+        finally:
+            self.set_phase(previous)
+
+    # ── Escritura ─────────────────────────────────────────
+    def log(self, msg, level="INFO", phase=None, fixture_id=None):
+        if not isinstance(level, int):
+            level = LEVELS.get(level) or parse_level(level)
+        if level < self.level:
+            return None
+        if phase is None:
+            phase = getattr(self._local, "phase", None)
+        ts = datetime.now()
+        with self._lock:
+            self._seq += 1
+            record = LogRecord(self._seq, ts, level, self.pid, phase, fixture_id, str(msg))
+            self._ring.append(record)
+        if self.sink is not None:
+            self.sink.put(record)
+        return record
+
+    # ── Lectura ───────────────────────────────────────────
+    def query(self, since: int = None, level=None, phase: str = None, fixture_id=None,
+              limit: int = 100) -> dict:
+        """
+        LogRecords filtrados en orden cronológico y el cursor para la página siguiente.
+        Sin `since` devuelve los `limit` más recientes; con `since`, los `limit`
+        primeros posteriores a ese cursor. `truncated` indica que el ring ya
+        descartó registros posteriores a `since` que no llegaron a leerse.
+        """
+        min_level = parse_level(level) if level is not None else None
+        fixture_id = None if fixture_id is None else str(fixture_id)
+        with self._lock:
+            last = self._seq
+            first = self._ring[0].seq if self._ring else last + 1
+            if since is not None:
+                since = min(since, last)   # cursor de otro proceso o de antes de un reinicio
+            if since is not None and since >= first:
+                records = list(self._ring)[since - first + 1:]
+            else:
+                records = list(self._ring)
+
+        def keep(r):
+            return ((min_level is None or r.level >= min_level)
+                    and (phase is None or r.phase == phase)
+                    and (fixture_id is None or str(r.fixture_id) == fixture_id))
+
+        if since is None:
+            page = [r for r in reversed(records) if keep(r)][:limit][::-1]
+            cursor = last
+        else:
+            page = []
+            cursor = max(since, first - 1)
+            for r in records:
+                if len(page) >= limit:
+                    break
+                cursor = r.seq
+                if keep(r):
+                    page.append(r)
+            if len(page) < limit:
+                cursor = max(cursor, last)
+        return {"records": page, "next": cursor,
+                "truncated": since is not None and since < first - 1}
+
+    def counters(self) -> dict:
+        with self._lock:
+            return {"records": self._seq, "buffered": len(self._ring), "capacity": self.capacity,
+                    "level": LEVEL_NAMES.get(self.level, self.level),
+                    "dropped": self.sink.dropped if self.sink else 0}
+
+    def after_fork(self):
+        self.pid   = os.getpid()
+        self._lock = threading.Lock()
+        if self.sink is not None:
+            self.sink.after_fork()
+
+
+def _from_env() -> RingLog:
+    try:
+        level = parse_level(os.getenv("LOG_LEVEL", "INFO"))
+    except ValueError:
+        level = LEVELS["INFO"]
+    ring = RingLog(int(os.getenv("LOG_RING_SIZE", "2000")), level, LogSink(os.getenv("LOG_FILE") or None))
+    atexit.register(ring.sink.close)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=ring.after_fork)
+    return ring
+
+
+LOGGER    = _from_env()
+log       = LOGGER.log
+set_phase = LOGGER.set_phase
+phase     = LOGGER.phase
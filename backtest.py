@@ -0,0 +1,345 @@
+"""
+Backtest histórico del modelo Poisson sobre un dataset local de temporadas.
+
+Recorre los partidos de cada competición-temporada en orden cronológico. En
+cada kickoff las features de cada equipo (TeamFeatureStore) contienen solo
+los partidos FINISHED anteriores, como las vería el motor, y el ajuste de
+máxima verosimilitud de la competición (LeagueModels) se rehace al empezar
+cada día de partidos con los terminados en los LEAGUE_FIT_WINDOW_DAYS
+anteriores, como el refit de cada sync en modo bulk (--no-league-fit lo
+desactiva). Se calculan λ con compute_lambdas(comp=...) + apply_fatigue y la
+matriz de marcadores del lote entero con scoreline_grid_batch. Para cada
+punto de la rejilla de parámetros se obtiene:
+
+- Brier score y log-loss del 1X2 (total y por competición)
+- curva de calibración del 1X2 (10 tramos de probabilidad)
+- picks, aciertos y ROI por mercado y competición con las mismas reglas de
+  selección que _evaluate_fixtures (ROI solo donde hay cuota)
+
+Cada competición-temporada es un shard de un pool de procesos; dentro del
+shard todo va vectorizado y la rejilla solo recalcula matrices por cada valor
+distinto de fatigue_penalty. Las features no cruzan competiciones: un shard
+solo ve sus propios partidos.
+
+Dataset: directorio con JSON de football-data.org ({"matches": [...]}, una
+lista de partidos o entradas grabadas por replay.Recorder).
+
+Uso:
+  python backtest.py data/ --grid value_edge=0.05,0.10,0.15 \\
+      --grid confidence=0.35,0.40 --grid fatigue_penalty=0.90,0.95,1.0 --out report.json
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+# El motor se instancia al importar main: que no toque los ficheros del proyecto
+_TMP = tempfile.mkdtemp(prefix="fixit-backtest-")
+for _var, _name in (("STATS_DB", "stats.db"), ("SNAPSHOT_DB", "snapshot.db"),
+                    ("LEASE_FILE", "fixit.lease"), ("LEDGER_DIR", "ledger")):
+    os.environ.setdefault(_var, os.path.join(_TMP, _name))
+
+import main  # noqa: E402
+from features import TeamFeatureStore  # noqa: E402
+from fitting import LeagueModels  # noqa: E402
+from records import MatchRow  # noqa: E402
+from settlement import grade_pick  # noqa: E402
+
+MARKETS = tuple(k for k in main.MARKET_META if k != "correct_score")
+ONE_X_TWO = ("home_win", "draw", "away_win")
+CALIBRATION_BINS = 10
+
+# Parámetros que acepta --grid y su valor actual en el motor
+DEFAULT_PARAMS = {
+    "value_edge":      main.VALUE_EDGE_THRESHOLD,
+    "confidence":      main.PURE_POISSON_THRESHOLDS["home_win"],
+    "fatigue_penalty": main.FATIGUE_PENALTY,
+}
+
+
+# ─────────────────────────────────────────────────────────
+#  DATASET
+# ─────────────────────────────────────────────────────────
+
+def _matches_in(payload) -> list:
+    if isinstance(payload, dict) and isinstance(payload.get("body"), str):
+        payload = json.loads(payload["body"])   # entrada de replay.Recorder
+    if isinstance(payload, dict):
+        payload = payload.get("matches", [])
+    return payload if isinstance(payload, list) else []
+
+
+def _season(m: dict) -> str:
+    start = (m.get("season") or {}).get("startDate")
+    if start:
+        return start[:4]
+    year, month = int(m["utcDate"][:4]), int(m["utcDate"][5:7])
+    return str(year if month >= 7 else year - 1)
+
+
+def load_dataset(data_dir: str, comps=None) -> dict:
+    """{(competición, temporada): [partidos FINISHED ordenados por kickoff]} sin duplicados."""
+    by_id = {}
+    for path in glob.glob(os.path.join(data_dir, "**", "*.json"), recursive=True):
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                payload = json.load(f)
+            except ValueError:
+                continue
+        for m in _matches_in(payload):
+            full_time = (m.get("score") or {}).get("fullTime") or {}
+            if (m.get("status") == "FINISHED" and m.get("id") is not None and m.get("utcDate")
+                    and full_time.get("home") is not None and full_time.get("away") is not None):
+                by_id[m["id"]] = m
+    shards = {}
+    for m in by_id.values():
+        code = (m.get("competition") or {}).get("code", "")
+        if comps and code not in comps:
+            continue
+        shards.setdefault((code, _season(m)), []).append(m)
+    for matches in shards.values():
+        matches.sort(key=lambda m: (m["utcDate"], m["id"]))
+    return shards
+
+
+# ─────────────────────────────────────────────────────────
+#  SHARD: una competición-temporada
+# ─────────────────────────────────────────────────────────
+
+def _market_masks(max_goals: int) -> np.ndarray:
+    """(mercados, G·G): 1 donde el marcador (i, j) gana el mercado, según grade_pick."""
+    g = max_goals + 1
+    return np.array([[grade_pick({"market_key": k}, i, j) == "won" for i in range(g) for j in range(g)]
+                     for k in MARKETS], dtype=float)
+
+
+def _replay_inputs(matches: list, alpha: float, comp: str = None) -> dict:
+    """
+    λ base, flags de fatiga, marcadores y cuotas de cada partido en orden
+    cronológico. Con `comp`, λ del ajuste de la competición con los partidos
+    anteriores al día del kickoff (None: solo features, sin ajuste).
+    """
+    features = TeamFeatureStore(alpha)
+    models   = LeagueModels(main.LEAGUE_FIT_DECAY, main.LEAGUE_FIT_PRIOR)
+    window   = main.LEAGUE_FIT_WINDOW_DAYS * 86400
+    finished = []     # MatchRow ya jugados, en orden de kickoff
+    fit_day  = None
+    lam_h, lam_a, tired_h, tired_a, goals, odds = [], [], [], [], [], []
+    for m in matches:
+        home_id, away_id = m["homeTeam"]["id"], m["awayTeam"]["id"]
+        home_f  = features.get(home_id)
+        away_f  = features.get(away_id)
+        kickoff = datetime.fromisoformat(m["utcDate"].replace("Z", "+00:00"))
+
+        if comp is not None and kickoff.date() != fit_day:
+            # Como el motor: un ajuste por sync con lo terminado antes de ese día
+            fit_day   = kickoff.date()
+            day_start = datetime(fit_day.year, fit_day.month, fit_day.day, tzinfo=timezone.utc).timestamp()
+            models.refit(comp, [r for r in finished if day_start - window <= r.kickoff < day_start], day_start)
+
+        lh, la = main.compute_lambdas(home_f, away_f, comp=comp, home_id=home_id, away_id=away_id,
+                                      models=models)
+        lam_h.append(lh)
+        lam_a.append(la)
+        # apply_fatigue con penalty=0 dice si aplica la penalización (0.0) o no (λ intacta)
+        tired_h.append(main.apply_fatigue(1.0, home_f.rest_days(kickoff) if home_f else None, penalty=0.0) == 0.0)
+        tired_a.append(main.apply_fatigue(1.0, away_f.rest_days(kickoff) if away_f else None, penalty=0.0) == 0.0)
+        full_time = m["score"]["fullTime"]
+        goals.append((full_time["home"], full_time["away"]))
+        block = m.get("odds") or {}
+        odds.append([block.get(k) if isinstance(block.get(k), (int, float)) else np.nan
+                     for k in ("homeWin", "draw", "awayWin")])
+        rows = MatchRow.project([m])
+        features.ingest(rows)
+        finished.extend(rows)
+    return {
+        "lam_home": np.array(lam_h), "lam_away": np.array(lam_a),
+        "tired_home": np.array(tired_h), "tired_away": np.array(tired_a),
+        "goals": np.array(goals, dtype=int).reshape(-1, 2), "odds": np.array(odds, dtype=float).reshape(-1, 3),
+    }
+
+
+def _new_accumulator() -> dict:
+    return {"matches": 0, "brier_sum": 0.0, "logloss_sum": 0.0,
+            "calibration": np.zeros((3, CALIBRATION_BINS)),   # suma predicha, suma observada, n
+            "by_comp": {}, "markets": {}}
+
+
+def run_shard(task) -> list:
+    """Evalúa un shard para toda la rejilla. Retorna [(params, acumulador)]."""
+    (comp, season), matches, grid, alpha, max_goals, league_fit = task
+    inputs = _replay_inputs(matches, alpha, comp if league_fit else None)
+    n = len(matches)
+    if n == 0:
+        return []
+    masks  = _market_masks(max_goals)
+    goals  = inputs["goals"]
+    odds   = inputs["odds"]
+    # Resultado real de cada mercado (marcadores por encima de la rejilla incluidos)
+    won = np.array([[grade_pick({"market_key": k}, h, a) == "won" for k in MARKETS] for h, a in goals], dtype=bool)
+    actual_1x2 = np.select([goals[:, 0] > goals[:, 1], goals[:, 0] == goals[:, 1]], [0, 1], 2)
+    onehot     = np.eye(3)[actual_1x2]
+    has_odds   = ~np.isnan(odds).all(axis=1)
+    cols       = max_goals + 1
+    market_idx = {k: i for i, k in enumerate(MARKETS)}
+
+    results = []
+    by_penalty = {}
+    for params in grid:
+        penalty = params["fatigue_penalty"]
+        if penalty not in by_penalty:
+            lh = inputs["lam_home"] * np.where(inputs["tired_home"], penalty, 1.0)
+            la = inputs["lam_away"] * np.where(inputs["tired_away"], penalty, 1.0)
+            flat  = main.scoreline_grid_batch(lh, la, max_goals).reshape(n, -1)
+            probs = flat @ masks.T                                     # (n, mercados)
+            top   = np.argsort(flat, axis=1)[:, ::-1][:, :main.CORRECT_SCORE_TOP_N]
+            by_penalty[penalty] = (flat, probs, top)
+        flat, probs, top = by_penalty[penalty]
+
+        acc = _new_accumulator()
+        p1x2 = probs[:, [market_idx[k] for k in ONE_X_TWO]]
+        brier   = ((p1x2 - onehot) ** 2).sum(axis=1)
+        logloss = -np.log(np.clip(p1x2[np.arange(n), actual_1x2], 1e-15, 1.0))
+        acc["matches"], acc["brier_sum"], acc["logloss_sum"] = n, float(brier.sum()), float(logloss.sum())
+        acc["by_comp"][comp] = dict(matches=n, brier_sum=acc["brier_sum"], logloss_sum=acc["logloss_sum"])
+        bins = np.minimum((p1x2 * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1).ravel()
+        np.add.at(acc["calibration"][0], bins, p1x2.ravel())
+        np.add.at(acc["calibration"][1], bins, onehot.ravel())
+        np.add.at(acc["calibration"][2], bins, 1)
+
+        # ── Selección de picks (mismas reglas que _evaluate_fixtures) ──
+        for k, i in market_idx.items():
+            odd = odds[:, ONE_X_TWO.index(k)] if k in ONE_X_TWO else np.full(n, np.nan)
+            with_odd  = has_odds & (odd > 1.0)
+            by_value  = with_odd & (probs[:, i] * np.nan_to_num(odd) - 1.0 > params["value_edge"])
+            threshold = params["confidence"] if k in ONE_X_TWO else main.PURE_POISSON_THRESHOLDS[k]
+            by_conf   = ~with_odd & (probs[:, i] > threshold)
+            hits      = won[:, i]
+            profit    = np.where(hits, np.nan_to_num(odd) - 1.0, -1.0)
+            acc["markets"][f"{k}|{comp}"] = [
+                int((by_value | by_conf).sum()), int((hits & (by_value | by_conf)).sum()),
+                int(by_value.sum()), float(profit[by_value].sum()),
+            ]
+        cs_prob = np.take_along_axis(flat, top, axis=1)
+        cs_pick = cs_prob > main.PURE_POISSON_THRESHOLDS["correct_score"]
+        cs_hit  = (top // cols == goals[:, [0]]) & (top % cols == goals[:, [1]])
+        acc["markets"][f"correct_score|{comp}"] = [int(cs_pick.sum()), int((cs_pick & cs_hit).sum()), 0, 0.0]
+        results.append((params, acc))
+    return results
+
+
+# ─────────────────────────────────────────────────────────
+#  AGREGACIÓN E INFORME
+# ─────────────────────────────────────────────────────────
+
+def _merge(into: dict, acc: dict):
+    into["matches"]     += acc["matches"]
+    into["brier_sum"]   += acc["brier_sum"]
+    into["logloss_sum"] += acc["logloss_sum"]
+    into["calibration"] += acc["calibration"]
+    for comp, c in acc["by_comp"].items():
+        dst = into["by_comp"].setdefault(comp, dict(matches=0, brier_sum=0.0, logloss_sum=0.0))
+        for key, value in c.items():
+            dst[key] += value
+    for key, row in acc["markets"].items():
+        dst = into["markets"].setdefault(key, [0, 0, 0, 0.0])
+        for i, value in enumerate(row):
+            dst[i] += value
+
+
+def _report(params: dict, acc: dict) -> dict:
+    n = acc["matches"] or 1
+    pred, obs, count = acc["calibration"]
+    markets = []
+    for key, (picks, hits, staked, profit) in sorted(acc["markets"].items()):
+        market, comp = key.split("|")
+        markets.append({"market": market, "competition": comp, "picks": picks, "hits": hits,
+                        "hit_rate": round(hits / picks, 4) if picks else None,
+                        "staked": staked, "profit": round(profit, 3),
+                        "roi": round(profit / staked, 4) if staked else None})
+    staked = sum(m["staked"] for m in markets)
+    return {
+        "params":   params,
+        "matches":  acc["matches"],
+        "brier":    round(acc["brier_sum"] / n, 5),
+        "log_loss": round(acc["logloss_sum"] / n, 5),
+        "picks":    sum(m["picks"] for m in markets),
+        "roi":      round(sum(m["profit"] for m in markets) / staked, 4) if staked else None,
+        "by_competition": {comp: {"matches": c["matches"],
+                                  "brier": round(c["brier_sum"] / c["matches"], 5),
+                                  "log_loss": round(c["logloss_sum"] / c["matches"], 5)}
+                           for comp, c in sorted(acc["by_comp"].items())},
+        "calibration": [{"bin": f"{b / CALIBRATION_BINS:.1f}-{(b + 1) / CALIBRATION_BINS:.1f}",
+                         "predicted": round(pred[b] / count[b], 4), "observed": round(obs[b] / count[b], 4),
+                         "n": int(count[b])} for b in range(CALIBRATION_BINS) if count[b]],
+        "markets": markets,
+    }
+
+
+def parse_grid(specs: list) -> list:
+    """['value_edge=0.05,0.1', ...] → producto cartesiano sobre DEFAULT_PARAMS."""
+    axes = {k: [v] for k, v in DEFAULT_PARAMS.items()}
+    for spec in specs or []:
+        name, _, values = spec.partition("=")
+        if name not in DEFAULT_PARAMS:
+            raise SystemExit(f"Parámetro desconocido: {name} (válidos: {', '.join(DEFAULT_PARAMS)})")
+        axes[name] = [float(v) for v in values.split(",") if v]
+    names = list(axes)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(axes[n] for n in names))]
+
+
+def run_backtest(shards: dict, grid: list, workers: int = None, alpha: float = main.FEATURE_EWM_ALPHA,
+                 max_goals: int = 8, league_fit: bool = True) -> list:
+    """Reparte los shards en un pool de procesos y agrega un informe por punto de la rejilla."""
+    tasks = [(key, matches, grid, alpha, max_goals, league_fit)
+             for key, matches in sorted(shards.items(), key=lambda kv: -len(kv[1]))]
+    totals = [_new_accumulator() for _ in grid]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard_results in pool.map(run_shard, tasks):
+            for i, (_, acc) in enumerate(shard_results):
+                _merge(totals[i], acc)
+    return [_report(params, acc) for params, acc in zip(grid, totals)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest histórico del modelo Poisson")
+    parser.add_argument("data_dir", help="Directorio con JSON de partidos de football-data.org")
+    parser.add_argument("--grid", action="append", default=[],
+                        help="param=v1,v2,... (value_edge, confidence, fatigue_penalty); repetible")
+    parser.add_argument("--comps", default="", help="Solo estas competiciones, p. ej. PL,PD")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--alpha", type=float, default=main.FEATURE_EWM_ALPHA,
+                        help="Peso de cada partido en las medias exponenciales de las features")
+    parser.add_argument("--no-league-fit", action="store_true",
+                        help="λ solo desde las features, sin el ajuste por competición (modo team del motor)")
+    parser.add_argument("--out", help="Guardar el informe completo en JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    shards  = load_dataset(args.data_dir, set(filter(None, args.comps.split(","))))
+    grid    = parse_grid(args.grid)
+    print(f"{sum(len(m) for m in shards.values())} partidos en {len(shards)} competición-temporadas, "
+          f"{len(grid)} combinaciones de parámetros")
+    reports = run_backtest(shards, grid, args.workers, args.alpha, league_fit=not args.no_league_fit)
+
+    print(f"\n{'value_edge':>10} | {'confidence':>10} | {'fatigue':>7} | {'brier':>7} | "
+          f"{'log-loss':>8} | {'picks':>7} | {'ROI':>7}")
+    print("-" * 74)
+    for r in sorted(reports, key=lambda r: r["log_loss"]):
+        p   = r["params"]
+        roi = f"{r['roi']:.3f}" if r["roi"] is not None else "-"
+        print(f"{p['value_edge']:>10.3f} | {p['confidence']:>10.3f} | {p['fatigue_penalty']:>7.3f} | "
+              f"{r['brier']:>7.4f} | {r['log_loss']:>8.4f} | {r['picks']:>7} | {roi:>7}")
+    print(f"\nTiempo total: {time.perf_counter() - started:.2f}s")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+        print(f"Informe guardado en {args.out}")
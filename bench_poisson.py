@@ -0,0 +1,117 @@
+"""
+Benchmark del motor Poisson: ruta escalar (calculate_1x2_poisson por partido)
+frente a la ruta vectorizada (calculate_1x2_poisson_batch en un solo paso), y
+el kernel Skellam (skellam_1x2 / skellam_1x2_batch) frente a ambos.
+
+La segunda tabla mide el 1X2 de un lote tal y como lo hace el motor: con
+ONE_X_TWO_KERNEL=grid cada ScorelineMatrix reduce su 1X2; con "skellam" se
+hace un solo skellam_1x2_batch y markets() se salta esas reducciones.
+
+También imprime la precisión del kernel Skellam en el rango de λ que permite
+el clamp de compute_lambdas (0.3–5.0) contra una matriz de referencia de 60
+goles; el test que la comprueba está en tests/test_poisson.py.
+
+Uso: python bench_poisson.py
+"""
+import time
+import numpy as np
+
+from main import (calculate_1x2_poisson, calculate_1x2_poisson_batch, skellam_1x2, skellam_1x2_batch,
+                  ScorelineCache, SKELLAM_EPS)
+
+SIZES = (10, 1_000, 100_000)
+ENGINE_SIZES = (10, 50, 200, 1_000)
+REFERENCE_GOALS = 60
+
+
+def make_lambdas(n: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    # Mismo rango que el clamp de compute_lambdas
+    return rng.uniform(0.3, 5.0, n), rng.uniform(0.3, 5.0, n)
+
+
+def bench_scalar(fn, lam_h, lam_a) -> float:
+    start = time.perf_counter()
+    for lh, la in zip(lam_h.tolist(), lam_a.tolist()):
+        fn(lh, la)
+    return time.perf_counter() - start
+
+
+def bench_batch(fn, lam_h, lam_a, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(lam_h, lam_a)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_equivalence(lam_h, lam_a, sample: int = 200):
+    batch = calculate_1x2_poisson_batch(lam_h[:sample], lam_a[:sample])
+    scalar = np.array([calculate_1x2_poisson(lh, la) for lh, la in zip(lam_h[:sample], lam_a[:sample])])
+    return float(np.abs(batch - scalar).max())
+
+
+def bench_engine_lot(n: int, repeat: int = 20) -> tuple:
+    """(ms ruta matriz, ms ruta Skellam) del 1X2 de un lote con sus matrices ya calculadas."""
+    lam_h, lam_a = make_lambdas(n, seed=n)
+    matrices = ScorelineCache(maxsize=n).get_many(lam_h.tolist(), lam_a.tolist())
+    t_grid = t_skellam = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        [m.outcome_1x2() for m in matrices]
+        t_grid = min(t_grid, time.perf_counter() - start)
+        start = time.perf_counter()
+        [tuple(row) for row in skellam_1x2_batch(lam_h, lam_a)[0].tolist()]
+        t_skellam = min(t_skellam, time.perf_counter() - start)
+    return t_grid, t_skellam
+
+
+def check_skellam_accuracy(step: float = 0.05):
+    """
+    Rejilla completa de λ en [0.3, 5.0]: Skellam (escalar y batch) frente a la
+    referencia de REFERENCE_GOALS goles y frente al kernel actual de 8 goles.
+    """
+    grid = np.arange(0.3, 5.0 + 1e-9, step)
+    lam_h, lam_a = (x.ravel() for x in np.meshgrid(grid, grid))
+    reference = calculate_1x2_poisson_batch(lam_h, lam_a, max_goals=REFERENCE_GOALS)
+    batch, bound = skellam_1x2_batch(lam_h, lam_a)
+    scalar = np.array([skellam_1x2(lh, la) for lh, la in zip(lam_h.tolist(), lam_a.tolist())])
+    err_batch  = np.abs(batch - reference).max(axis=1)
+    err_scalar = np.abs(scalar[:, :3] - reference).max(axis=1)
+    grid8 = calculate_1x2_poisson_batch(lam_h, lam_a)
+    return {
+        "pares":              lam_h.size,
+        "err_skellam_batch":  float(err_batch.max()),
+        "err_skellam_scalar": float(err_scalar.max()),
+        "cota_max":           float(max(bound.max(), scalar[:, 3].max())),
+        "err_grid_8_goles":   float(np.abs(grid8 - reference).max()),
+    }
+
+
+if __name__ == "__main__":
+    print(f"{'partidos':>10} | {'escalar (ms)':>14} | {'batch (ms)':>12} | {'speedup':>8} | "
+          f"{'skellam (ms)':>13} | {'skellam batch (ms)':>18} | {'vs batch':>8}")
+    print("-" * 102)
+    for n in SIZES:
+        lam_h, lam_a = make_lambdas(n)
+        t_scalar   = bench_scalar(calculate_1x2_poisson, lam_h, lam_a)
+        t_batch    = bench_batch(calculate_1x2_poisson_batch, lam_h, lam_a)
+        t_skellam  = bench_scalar(skellam_1x2, lam_h, lam_a)
+        t_sk_batch = bench_batch(skellam_1x2_batch, lam_h, lam_a)
+        print(f"{n:>10} | {t_scalar * 1000:>14.2f} | {t_batch * 1000:>12.3f} | {t_scalar / t_batch:>7.1f}x | "
+              f"{t_skellam * 1000:>13.2f} | {t_sk_batch * 1000:>18.3f} | {t_batch / t_sk_batch:>7.2f}x")
+
+    print(f"\n1X2 de un lote en el motor (matrices ya calculadas):")
+    print(f"{'partidos':>10} | {'matriz (ms)':>12} | {'skellam (ms)':>13} | {'speedup':>8}")
+    print("-" * 53)
+    for n in ENGINE_SIZES:
+        t_grid, t_skellam = bench_engine_lot(n)
+        print(f"{n:>10} | {t_grid * 1000:>12.3f} | {t_skellam * 1000:>13.3f} | {t_grid / t_skellam:>7.2f}x")
+
+    lam_h, lam_a = make_lambdas(1_000)
+    print(f"\nMáx. diferencia escalar vs batch: {check_equivalence(lam_h, lam_a):.2e}")
+
+    print(f"\nPrecisión Skellam (eps={SKELLAM_EPS:g}) en λ ∈ [0.3, 5.0]:")
+    for key, value in check_skellam_accuracy().items():
+        print(f"  {key:>20}: {value:.2e}" if isinstance(value, float) else f"  {key:>20}: {value}")
@@ -0,0 +1,64 @@
+"""
+Benchmark de una sincronización completa (fetch_data) sin red: genera un corpus
+sintético, lo sirve con replay.ReplayServer y mide el tiempo de sync para
+distintos números de partidos, modos de historial y límites de rate.
+
+Uso: python bench_sync.py [--fixtures 10,50,200] [--rates 600,6000] [--latency 0.02]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+# El motor se instancia al importar main: que no toque los ficheros del proyecto
+# (ni migre el stats.json real)
+_TMP = tempfile.mkdtemp(prefix="fixit-bench-")
+os.chdir(_TMP)
+os.environ.setdefault("STATS_DB", os.path.join(_TMP, "import.db"))
+os.environ.setdefault("SNAPSHOT_DB", os.path.join(_TMP, "snapshot.db"))
+os.environ.setdefault("LEASE_FILE", os.path.join(_TMP, "fixit.lease"))
+
+import main  # noqa: E402
+from api_client import RateGovernor  # noqa: E402
+from replay import ReplayServer, synthesize_corpus  # noqa: E402
+
+
+def run_sync(base_url: str, mode: str, rate_per_min: float, tag: str) -> dict:
+    main.BASE_URL     = base_url
+    main.API_KEY      = "bench"
+    main.HISTORY_MODE = mode
+    main.STATS_DB     = os.path.join(_TMP, f"stats-{tag}.db")
+    engine = main.FixItPRO()
+    engine.api.governor = RateGovernor(rate_per_min, main.API_RATE_BURST)
+    start = time.perf_counter()
+    engine.fetch_data()
+    return {"seconds": time.perf_counter() - start, "picks": len(engine.cached_picks)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default="10,50,200")
+    parser.add_argument("--rates", default="600,6000", help="Peticiones por minuto del rate limiter")
+    parser.add_argument("--modes", default="bulk,team")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia por respuesta (s)")
+    parser.add_argument("--p429", type=float, default=0.0)
+    parser.add_argument("--server-quota", type=int, default=0,
+                        help="Cuota por minuto del servidor (envía cabeceras de cuota; 0 = sin límite)")
+    args = parser.parse_args()
+
+    comps = list(main.ENABLED_COMPETITIONS)[:4]
+    print(f"{'partidos':>8} | {'modo':>5} | {'req/min':>8} | {'peticiones':>10} | {'tiempo (s)':>10} | {'picks':>6}")
+    print("-" * 64)
+    for n in (int(x) for x in args.fixtures.split(",")):
+        corpus = os.path.join(_TMP, f"corpus-{n}")
+        synthesize_corpus(corpus, n, comps)
+        for mode in args.modes.split(","):
+            for rate in (float(x) for x in args.rates.split(",")):
+                server = ReplayServer(corpus, latency=args.latency, p_429=args.p429,
+                                      max_per_minute=args.server_quota).start()
+                try:
+                    result = run_sync(server.base_url, mode, rate, f"{n}-{mode}-{int(rate)}")
+                finally:
+                    server.stop()
+                print(f"{n:>8} | {mode:>5} | {int(rate):>8} | {server.requests:>10} | "
+                      f"{result['seconds']:>10.2f} | {result['picks']:>6}")
@@ -0,0 +1,155 @@
+"""
+Features por equipo mantenidas de forma incremental.
+
+Cada partido (records.MatchRow) que se ingiere actualiza, para sus dos equipos, medias
+exponenciales de goles a favor y en contra (total, como local y como
+visitante), el último kickoff y el número de partidos. El modelo lee estos
+números en O(1) sin volver a recorrer los payloads del API.
+
+Los partidos se aplican en orden cronológico. Cada equipo guarda sus filas
+(kickoff, id, local, goles): un partido repetido se ignora y uno anterior al
+último ya ingerido (otra competición que llega después, un historial por
+equipo más antiguo) se inserta en su sitio y se rehacen las medias de ese
+equipo desde sus filas ordenadas.
+"""
+import threading
+from datetime import datetime, timezone
+
+# Índices de la tabla de medias: (a favor, en contra, peso) × (total, local, visitante)
+_TOTAL, _HOME, _AWAY = 0, 3, 6
+
+
+def _order(row: tuple) -> tuple:
+    """Orden de las filas: kickoff y, a igual kickoff, id del partido."""
+    return row[0], row[1] or 0
+
+
+class TeamFeatures:
+    """Features numéricas de un equipo. `ewm` guarda sumas ponderadas y pesos (medias sin sesgo inicial)."""
+    __slots__ = ("team_id", "matches", "home_matches", "away_matches", "last_kickoff", "last_match_id", "ewm",
+                 "rows", "_seen")
+
+    def __init__(self, team_id):
+        self.team_id = team_id
+        self.rows    = []      # [(kickoff, match_id, is_home, scored, conceded)] en orden de kickoff
+        self._seen   = set()   # (kickoff, match_id) ya ingeridos
+        self._reset()
+
+    def _reset(self):
+        self.matches       = 0
+        self.home_matches  = 0
+        self.away_matches  = 0
+        self.last_kickoff  = 0.0
+        self.last_match_id = None
+        self.ewm           = [0.0] * 9
+
+    def _update(self, offset: int, scored: float, conceded: float, alpha: float):
+        decay = 1.0 - alpha
+        ewm = self.ewm
+        ewm[offset]     = decay * ewm[offset]     + alpha * scored
+        ewm[offset + 1] = decay * ewm[offset + 1] + alpha * conceded
+        ewm[offset + 2] = decay * ewm[offset + 2] + alpha
+
+    def ingest(self, match_id, kickoff: float, is_home: bool, scored: int, conceded: int, alpha: float) -> str:
+        """
+        'added' si se aplicó al final, 'inserted' si es anterior al último
+        partido (pendiente de rebuild) o 'duplicate'.
+        """
+        key = (kickoff, match_id)
+        if key in self._seen:
+            return "duplicate"
+        self._seen.add(key)
+        row = (kickoff, match_id, is_home, scored, conceded)
+        self.rows.append(row)
+        if len(self.rows) > 1 and _order(row) < _order(self.rows[-2]):
+            self.rows.sort(key=_order)
+            return "inserted"
+        self.add(match_id, kickoff, is_home, scored, conceded, alpha)
+        return "added"
+
+    def rebuild(self, alpha: float):
+        """Rehace medias y contadores aplicando las filas en orden."""
+        self._reset()
+        for kickoff, match_id, is_home, scored, conceded in self.rows:
+            self.add(match_id, kickoff, is_home, scored, conceded, alpha)
+
+    def add(self, match_id, kickoff: float, is_home: bool, scored: int, conceded: int, alpha: float):
+        self._update(_TOTAL, scored, conceded, alpha)
+        self._update(_HOME if is_home else _AWAY, scored, conceded, alpha)
+        self.matches += 1
+        if is_home:
+            self.home_matches += 1
+        else:
+            self.away_matches += 1
+        self.last_kickoff  = kickoff
+        self.last_match_id = match_id
+
+    def goals(self, side: str = None, min_matches: int = 0) -> tuple:
+        """
+        (goles a favor, goles en contra) de la media exponencial. Con `side`
+        ("home"/"away") usa ese split si tiene al menos `min_matches` partidos.
+        """
+        offset = _TOTAL
+        if side == "home" and self.home_matches >= max(min_matches, 1):
+            offset = _HOME
+        elif side == "away" and self.away_matches >= max(min_matches, 1):
+            offset = _AWAY
+        weight = self.ewm[offset + 2]
+        if weight <= 0:
+            return None
+        return self.ewm[offset] / weight, self.ewm[offset + 1] / weight
+
+    def rest_days(self, today: datetime):
+        """Días naturales entre la fecha (UTC) del último partido y `today`; None si no hay partidos."""
+        if not self.last_kickoff:
+            return None
+        last = datetime.fromtimestamp(self.last_kickoff, timezone.utc).date()
+        return (today.date() - last).days
+
+    def version(self) -> tuple:
+        """Cambia con cada partido ingerido (huella de entradas del modelo)."""
+        return (self.matches, self.last_match_id)
+
+
+class TeamFeatureStore:
+    """team_id → TeamFeatures, alimentado con partidos terminados (MatchRow)."""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha  = alpha
+        self._teams = {}
+        self._lock  = threading.Lock()
+
+    def ingest(self, matches: list) -> int:
+        """
+        Aplica en orden de kickoff los partidos nuevos para cada equipo. Los
+        equipos que reciben un partido anterior al último se rehacen una sola
+        vez al final del lote. Retorna cuántos aplicó.
+        """
+        rows = sorted(((m.kickoff, m.id, m.home_id, m.away_id, m.home_goals, m.away_goals) for m in matches),
+                      key=_order)
+
+        applied, stale = 0, {}
+        with self._lock:
+            for kickoff, match_id, home_id, away_id, home_goals, away_goals in rows:
+                for team_id, is_home, scored, conceded in ((home_id, True, home_goals, away_goals),
+                                                           (away_id, False, away_goals, home_goals)):
+                    if team_id is None:
+                        continue
+                    team = self._teams.get(team_id)
+                    if team is None:
+                        team = self._teams[team_id] = TeamFeatures(team_id)
+                    result = team.ingest(match_id, kickoff, is_home, scored, conceded, self.alpha)
+                    if result == "inserted":
+                        stale[team_id] = team
+                    if result != "duplicate":
+                        applied += 1
+            for team in stale.values():
+                team.rebuild(self.alpha)
+        return applied
+
+    def get(self, team_id):
+        with self._lock:
+            return self._teams.get(team_id)
+
+    def __len__(self) -> int:
+        return len(self._teams)
@@ -0,0 +1,380 @@
+"""
+Ledger de picks append-only en segmentos NDJSON.
+
+- Cada pick generado se escribe una sola vez (registro "pick") con sus λ,
+  probabilidad, cuota y valor; su resultado llega después como registro
+  "outcome". Nunca se reescribe una línea.
+- Al superar `segment_bytes` el segmento activo se sella y se guarda junto a
+  él un índice pequeño (.idx.json): offsets por fecha, liga y mercado, ids de
+  pick y resultados. Al arrancar se cargan los offsets de esos índices y solo
+  se escanea el segmento activo. Los ids y resultados de los segmentos
+  sellados no se guardan en memoria: se leen de su .idx.json cuando hacen
+  falta (deduplicar, buscar el resultado de cada pick en query), con una
+  LRU de pocos segmentos; en memoria solo quedan los del segmento activo.
+- Los agregados (ganadas/perdidas por liga y mercado) son una proyección de
+  los registros "outcome" (que llevan liga y mercado): se cuentan al indexar
+  cada registro, también al ponerse al día con lo que escribió otro proceso.
+  aggregates.json guarda los contadores y hasta qué posición del ledger
+  (segmento, offset) los incluyen; al arrancar se cuenta lo posterior, así
+  que un corte entre el append y el guardado no pierde resultados.
+"""
+import csv
+import glob
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+INDEXED_FIELDS = ("date", "league", "market_key")
+
+CSV_COLUMNS = ("pick_id", "ts", "fixture_id", "date", "time", "league", "teams", "market_key", "market",
+               "lam_home", "lam_away", "probability", "odds", "value", "outcome", "score", "settled_at")
+
+
+def pick_id(pick: dict) -> str:
+    """Identidad estable de un pick: partido + mercado (+ marcador en resultado exacto)."""
+    return f"{pick.get('id')}:{pick.get('market_key')}:{pick.get('selection', '')}"
+
+
+def _ledger_date(pick: dict) -> str:
+    """'DD-MM-YYYY' del pick → 'YYYY-MM-DD' del ledger."""
+    day, month, year = (pick.get("date") or "--").split("-")
+    return f"{year}-{month}-{day}"
+
+
+def _segment_number(path: str) -> int:
+    return int(os.path.basename(path)[len("picks-"):-len(".ndjson")])
+
+
+def _empty_aggregates() -> dict:
+    return {"won": 0, "lost": 0, "push": 0, "void": 0, "by_league": {}, "by_market": {}}
+
+
+def _read_lines(f, size: int, offsets=None):
+    """Líneas completas hasta `size` bytes, o solo las de `offsets` (ordenados)."""
+    if offsets is None:
+        for line in iter(f.readline, b""):
+            if f.tell() > size:
+                return
+            yield line
+        return
+    for offset in sorted(offsets):
+        f.seek(offset)
+        yield f.readline()
+
+
+class PickLedger:
+    """Un único escritor (el líder); cualquier proceso puede leer y ponerse al día."""
+
+    def __init__(self, directory: str, segment_bytes: int = 4 * 1024 * 1024, seed: dict = None,
+                 sealed_cache: int = 4):
+        self.directory     = directory
+        self.segment_bytes = segment_bytes
+        self._lock         = threading.Lock()
+        # [{"number", "path", "index": {campo: {valor: [offset]}}, "scanned": bytes, "sealed",
+        #   "ids": set | None, "outcomes": dict | None, "picks": n, "settled": n}]
+        self._segments     = []
+        self._sealed_cache = OrderedDict()   # número de segmento sellado -> (ids, outcomes)
+        self._sealed_max   = sealed_cache
+        os.makedirs(directory, exist_ok=True)
+        self._aggregates_path = os.path.join(directory, "aggregates.json")
+        self.aggregates, self._counted = self._load_aggregates(seed)
+        with self._lock:
+            self._catch_up()
+
+    # ── Agregados ─────────────────────────────────────────
+    def _load_aggregates(self, seed: dict) -> tuple:
+        """(agregados, posición (segmento, offset) hasta la que ya cuentan)."""
+        if os.path.exists(self._aggregates_path):
+            with open(self._aggregates_path, "r", encoding="utf-8") as f:
+                aggregates = json.load(f)
+            through = aggregates.pop("counted_through", None)
+            # Sin posición (versiones anteriores): los contaban todos al guardarse
+            return aggregates, tuple(through) if through else self._ledger_end()
+        # Primer arranque: se parte de los contadores que ya existían en stats; los
+        # resultados que ya hubiera en el ledger están incluidos en ellos
+        aggregates = _empty_aggregates()
+        if seed:
+            aggregates["won"]  = int(seed.get("ganadas", 0))
+            aggregates["lost"] = int(seed.get("perdidas", 0))
+            for league, won in (seed.get("ligas") or {}).items():
+                aggregates["by_league"][league] = {"won": int(won), "lost": 0}
+        return aggregates, self._ledger_end()
+
+    def _ledger_end(self) -> tuple:
+        """(segmento, tamaño) del último segmento en disco; (0, 0) si el ledger está vacío."""
+        paths = glob.glob(os.path.join(self.directory, "picks-*.ndjson"))
+        if not paths:
+            return (0, 0)
+        last = max(paths, key=_segment_number)
+        return (_segment_number(last), os.path.getsize(last))
+
+    def _save_aggregates(self):
+        """Contadores + posición del ledger que incluyen (con self._lock)."""
+        last = self._segments[-1] if self._segments else None
+        through = (last["number"], last["scanned"]) if last else (0, 0)
+        tmp = self._aggregates_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(dict(self.aggregates, counted_through=list(through)), f, sort_keys=True)
+        os.replace(tmp, self._aggregates_path)
+
+    def _count(self, record: dict):
+        """Suma un registro "outcome" a los agregados (los antiguos no llevan liga)."""
+        agg     = self.aggregates
+        outcome = record["outcome"]
+        market  = record.get("market_key") or record["pick_id"].split(":")[1]
+        agg[outcome] = agg.get(outcome, 0) + 1
+        for group, key in (("by_league", record.get("league") or "Otros"), ("by_market", market)):
+            bucket = agg[group].setdefault(key, {"won": 0, "lost": 0})
+            if outcome in bucket:
+                bucket[outcome] += 1
+
+    def summary(self) -> dict:
+        """Agregados al día con lo que haya escrito el líder."""
+        with self._lock:
+            self._catch_up()
+            return json.loads(json.dumps(self.aggregates))
+
+    def stats_view(self) -> dict:
+        """ganadas / perdidas / aciertos por liga en la forma que usa el panel de stats."""
+        with self._lock:
+            self._catch_up()
+            return {
+                "ganadas":  self.aggregates.get("won", 0),
+                "perdidas": self.aggregates.get("lost", 0),
+                "ligas":    {league: c["won"] for league, c in self.aggregates["by_league"].items() if c["won"]},
+            }
+
+    # ── Segmentos e índices ───────────────────────────────
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"picks-{number:06d}.ndjson")
+
+    def _idx_path(self, segment: dict) -> str:
+        return segment["path"][:-len(".ndjson")] + ".idx.json"
+
+    def _new_segment(self, path: str) -> dict:
+        return {"number": _segment_number(path), "path": path, "index": {f: {} for f in INDEXED_FIELDS},
+                "scanned": 0, "sealed": False, "ids": set(), "outcomes": {}, "picks": 0, "settled": 0}
+
+    def _catch_up(self):
+        """Incorpora segmentos nuevos y las líneas añadidas al activo (con self._lock)."""
+        known = {s["path"] for s in self._segments}
+        for path in sorted(glob.glob(os.path.join(self.directory, "picks-*.ndjson")), key=_segment_number):
+            if path in known:
+                continue
+            segment  = self._new_segment(path)
+            idx_path = self._idx_path(segment)
+            # Un segmento sellado con resultados aún sin contar se escanea entero
+            if os.path.exists(idx_path) and segment["number"] < self._counted[0]:
+                with open(idx_path, "r", encoding="utf-8") as f:
+                    sealed = json.load(f)
+                segment.update(index=sealed["index"], scanned=sealed["size"], sealed=True, ids=None,
+                               outcomes=None, picks=len(sealed["pick_ids"]), settled=len(sealed["outcomes"]))
+            self._segments.append(segment)
+        for segment in self._segments:
+            self._scan(segment)
+            if segment["ids"] is not None and os.path.exists(self._idx_path(segment)):
+                # Sellado por el líder después de escanearlo: sus ids pasan a leerse del .idx.json
+                segment.update(sealed=True, ids=None, outcomes=None)
+
+    def _scan(self, segment: dict):
+        """Lee desde el último offset conocido hasta el final del segmento."""
+        if os.path.getsize(segment["path"]) <= segment["scanned"]:
+            return
+        with open(segment["path"], "rb") as f:
+            f.seek(segment["scanned"])
+            offset = segment["scanned"]
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # línea a medio escribir por el líder
+                self._index_record(segment, offset, json.loads(line))
+                offset += len(line)
+            segment["scanned"] = offset
+
+    def _index_record(self, segment: dict, offset: int, record: dict):
+        if record.get("type") == "outcome":
+            segment["outcomes"][record["pick_id"]] = [record["outcome"], record.get("score"), record.get("ts")]
+            segment["settled"] += 1
+            if (segment["number"], offset) >= self._counted:
+                self._count(record)
+            return
+        segment["ids"].add(record["pick_id"])
+        segment["picks"] += 1
+        for field in INDEXED_FIELDS:
+            segment["index"][field].setdefault(str(record.get(field)), []).append(offset)
+
+    def _seal(self, segment: dict):
+        """Guarda el índice del segmento lleno para no volver a escanearlo y suelta sus ids de memoria."""
+        idx_path = self._idx_path(segment)
+        with open(idx_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"size": segment["scanned"], "index": segment["index"],
+                       "pick_ids": sorted(segment["ids"]), "outcomes": segment["outcomes"]}, f)
+        os.replace(idx_path + ".tmp", idx_path)
+        segment.update(sealed=True, ids=None, outcomes=None)
+
+    def _sealed_sets(self, segment: dict) -> tuple:
+        """(ids, resultados) de un segmento: en memoria si está activo, si no de su .idx.json (LRU)."""
+        if not segment["sealed"]:
+            return segment["ids"], segment["outcomes"]
+        number = segment["number"]
+        cached = self._sealed_cache.get(number)
+        if cached is None:
+            with open(self._idx_path(segment), "r", encoding="utf-8") as f:
+                sealed = json.load(f)
+            cached = (set(sealed["pick_ids"]), sealed["outcomes"])
+            self._sealed_cache[number] = cached
+            while len(self._sealed_cache) > self._sealed_max:
+                self._sealed_cache.popitem(last=False)
+        else:
+            self._sealed_cache.move_to_end(number)
+        return cached
+
+    def _segments_from(self, date: str) -> list:
+        """Segmentos desde el primero con picks de `date` (un pick y su resultado no pueden estar antes)."""
+        for i, segment in enumerate(self._segments):
+            if date in segment["index"]["date"]:
+                return self._segments[i:]
+        return [s for s in self._segments if not s["sealed"]]
+
+    def _has_pick(self, pid: str, date: str) -> bool:
+        return any(pid in self._sealed_sets(s)[0] for s in self._segments
+                   if not s["sealed"] or date in s["index"]["date"])
+
+    def _outcome(self, pid: str, date: str):
+        return self._outcome_in(self._segments_from(date), pid)
+
+    def _outcome_in(self, segments: list, pid: str):
+        """Resultado de `pid` en el primer segmento que lo tenga (con self._lock)."""
+        for segment in segments:
+            if not segment["settled"]:
+                continue
+            outcome = self._sealed_sets(segment)[1].get(pid)
+            if outcome is not None:
+                return outcome
+        return None
+
+    def _append(self, records: list):
+        """Añade registros al segmento activo, rotando si se llena (con self._lock)."""
+        self._catch_up()
+        if not self._segments:
+            self._segments.append(self._new_segment(self._segment_path(1)))
+        segment = self._segments[-1]
+        if segment["scanned"] >= self.segment_bytes:
+            self._seal(segment)
+            segment = self._new_segment(self._segment_path(segment["number"] + 1))
+            self._segments.append(segment)
+        with open(segment["path"], "ab") as f:
+            offset = segment["scanned"]
+            for record in records:
+                line = (json.dumps(record, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+                f.write(line)
+                self._index_record(segment, offset, record)
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+            segment["scanned"] = offset
+
+    # ── Escritura ─────────────────────────────────────────
+    def append_picks(self, picks: list) -> int:
+        """Registra los picks aún no vistos. Retorna cuántos se añadieron."""
+        now = time.time()
+        with self._lock:
+            self._catch_up()
+            records, seen = [], set()
+            for p in picks:
+                pid  = pick_id(p)
+                date = _ledger_date(p)
+                if pid in seen or self._has_pick(pid, date):
+                    continue
+                seen.add(pid)
+                records.append({
+                    "type": "pick", "pick_id": pid, "ts": now, "fixture_id": p.get("id"),
+                    "date": date, "time": p.get("time"),
+                    "league": p.get("league"), "teams": p.get("teams"),
+                    "market_key": p.get("market_key"), "market": p.get("market"),
+                    "lam_home": p.get("lam_home"), "lam_away": p.get("lam_away"),
+                    "probability": p.get("probability"), "odds": p.get("odds"), "value": p.get("value"),
+                })
+            if records:
+                self._append(records)
+        return len(records)
+
+    def record_outcomes(self, graded: list) -> int:
+        """
+        Añade el resultado de picks liquidados: [(pick, outcome, "2-1")]. Los
+        agregados se actualizan al indexar cada registro y se guardan después.
+        """
+        now = time.time()
+        with self._lock:
+            self._catch_up()
+            records, seen = [], set()
+            for pick, outcome, score in graded:
+                pid = pick_id(pick)
+                if pid in seen or self._outcome(pid, _ledger_date(pick)) is not None:
+                    continue
+                seen.add(pid)
+                records.append({"type": "outcome", "pick_id": pid, "outcome": outcome, "score": score, "ts": now,
+                                "league": pick.get("league"), "market_key": pick.get("market_key")})
+            if records:
+                self._append(records)
+                self._save_aggregates()
+        return len(records)
+
+    # ── Lectura ───────────────────────────────────────────
+    def query(self, date_from: str = None, date_to: str = None, league: str = None, market: str = None):
+        """Generador de picks (con su resultado, si lo hay) que cumplen los filtros."""
+        with self._lock:
+            self._catch_up()
+            segments = list(self._segments)
+        for i, segment in enumerate(segments):
+            path, size, index = segment["path"], segment["scanned"], segment["index"]
+            offsets = None
+            if league is not None:
+                offsets = set(index["league"].get(league, ()))
+            if market is not None:
+                found   = set(index["market_key"].get(market, ()))
+                offsets = found if offsets is None else offsets & found
+            if date_from is not None or date_to is not None:
+                found = set()
+                for day, day_offsets in index["date"].items():
+                    if (date_from is None or day >= date_from) and (date_to is None or day <= date_to):
+                        found.update(day_offsets)
+                offsets = found if offsets is None else offsets & found
+            if offsets is not None and not offsets:
+                continue
+            # El resultado de un pick está en su segmento o en uno posterior: se busca al
+            # vuelo en los .idx.json (LRU) en vez de juntar antes todos los resultados
+            later = segments[i:]
+            with open(path, "rb") as f:
+                for line in _read_lines(f, size, offsets):
+                    record = json.loads(line)
+                    if record.get("type") != "pick":
+                        continue
+                    with self._lock:
+                        outcome = self._outcome_in(later, record["pick_id"])
+                    record["outcome"], record["score"], record["settled_at"] = outcome or (None, None, None)
+                    yield record
+
+    def export_ndjson(self, **filters):
+        for record in self.query(**filters):
+            yield json.dumps(record, default=str) + "\n"
+
+    def export_csv(self, **filters):
+        buf    = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(CSV_COLUMNS)
+        for record in self.query(**filters):
+            writer.writerow([record.get(c) for c in CSV_COLUMNS])
+            if buf.tell() > 64 * 1024:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    def counters(self) -> dict:
+        with self._lock:
+            return {"segments": len(self._segments), "picks": sum(s["picks"] for s in self._segments),
+                    "settled": sum(s["settled"] for s in self._segments),
+                    "sealed_cached": len(self._sealed_cache)}
@@ -1,39 +1,115 @@
 import os
 import json
 import math
-import requests
+import functools
+import hashlib
+import sqlite3
 import threading
 import time
+import numpy as np
+from types import MappingProxyType
+from typing import NamedTuple, Mapping
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from store import StatsStore, empty_stats
+from snapshot import LeaderLease, SharedSnapshot
+import metrics
+from api_client import ApiClient, CircuitOpenError
+from sync_jobs import SyncCoordinator, WorkQueue
+from scheduler import Scheduler
+from settlement import PendingPicks, SettledIds, grade_pick
+from ledger import PickLedger
+from fitting import LeagueModels
+from features import TeamFeatureStore
+from odds import OddsProvider, load_aliases
+from simulator import LEAGUE_COMPETITIONS, build_inputs, simulate
+from records import MatchRow, Pick, register_markets
+from applog import LOGGER, log
 
 load_dotenv()
-LOG_BUFFER = []
-def log(msg):
-    import os
-    pid = os.getpid()
-    s = f"[{datetime.now()}][PID:{pid}] {msg}"
-    print(s, flush=True)
-    LOG_BUFFER.append(s)
-    if len(LOG_BUFFER) > 200:
-        LOG_BUFFER.pop(0)
-
 log(">>> CARGANDO MOTOR FIXIT PRO v9-FINAL-LOGS <<<")
 
 API_KEY = os.getenv("FOOTBALLDATA_API_KEY") or os.getenv("FOOTBALL_API_KEY")
 
 if not API_KEY:
-    print(f"[{datetime.now()}] WARNING: No se detectó FOOTBALLDATA_API_KEY en .env")
+    log("No se detectó FOOTBALLDATA_API_KEY en .env", "WARNING")
 else:
     API_KEY = str(API_KEY).strip()
-    print(f"[{datetime.now()}] OK: API_KEY detectada (Inicio: {API_KEY[:4]})")
+    log(f"OK: API_KEY detectada (Inicio: {API_KEY[:4]})")
 
-BASE_URL = "https://api.football-data.org/v4"
+BASE_URL = os.getenv("FOOTBALLDATA_BASE_URL", "https://api.football-data.org/v4").rstrip("/")
+# Si se define, cada respuesta del API se graba en este directorio (ver replay.py)
+RECORD_DIR = os.getenv("FOOTBALLDATA_RECORD_DIR")
 HEADERS = {
     "X-Auth-Token": API_KEY or "",
     "User-Agent": "FixItFootball/2.0"
 }
 
+# Rate limit de Football-Data.org (plan gratuito: 10 req/min). Es el ritmo de
+# partida: en cuanto el API devuelve cabeceras de cuota, ApiClient se adapta a ellas.
+# La ráfaga por defecto es 1 para no superar nunca el límite en una ventana de 60s.
+API_RATE_PER_MIN = float(os.getenv("FOOTBALLDATA_RATE_PER_MIN", "10"))
+API_RATE_BURST   = float(os.getenv("FOOTBALLDATA_RATE_BURST", "1"))
+HISTORY_WORKERS  = int(os.getenv("HISTORY_WORKERS", "4"))
+# Circuit breaker: errores de plan/auth seguidos antes de dejar de llamar a un endpoint
+API_BREAKER_THRESHOLD = int(os.getenv("API_BREAKER_THRESHOLD", "3"))
+API_BREAKER_COOLDOWN  = float(os.getenv("API_BREAKER_COOLDOWN", "1800"))
+
+# Cuotas 1X2 de The Odds API (una petición por competición, cacheada ODDS_TTL_SECONDS).
+# Sin ODDS_API_KEY los mercados sin cuota siguen en modo POISSON PURO.
+ODDS_API_KEY          = (os.getenv("ODDS_API_KEY") or "").strip()
+ODDS_BASE_URL         = os.getenv("ODDS_BASE_URL", "https://api.the-odds-api.com/v4").rstrip("/")
+ODDS_REGIONS          = os.getenv("ODDS_REGIONS", "eu")
+ODDS_TTL_SECONDS      = float(os.getenv("ODDS_TTL_SECONDS", "600"))
+ODDS_RATE_PER_MIN     = float(os.getenv("ODDS_RATE_PER_MIN", "30"))
+# Diferencia máxima de kickoff entre proveedores para dar un partido por el mismo
+ODDS_KICKOFF_TOLERANCE_MINUTES = float(os.getenv("ODDS_KICKOFF_TOLERANCE_MINUTES", "90"))
+# JSON opcional {"nombre en un proveedor": "nombre en el otro"} que amplía la tabla de alias
+ODDS_ALIASES_FILE     = os.getenv("ODDS_ALIASES_FILE")
+
+# Ingesta de historiales: "bulk" (una petición por competición) o "team" (una por equipo)
+HISTORY_MODE      = os.getenv("HISTORY_MODE", "bulk").lower()
+BULK_HISTORY_DAYS = int(os.getenv("BULK_HISTORY_DAYS", "30"))
+
+# Ajuste por competición (medias local/visitante + ataque/defensa por equipo)
+LEAGUE_FIT_WINDOW_DAYS = int(os.getenv("LEAGUE_FIT_WINDOW_DAYS", "180"))
+LEAGUE_FIT_DECAY       = float(os.getenv("LEAGUE_FIT_DECAY_PER_DAY", "0.005"))
+LEAGUE_FIT_PRIOR       = float(os.getenv("LEAGUE_FIT_PRIOR_MATCHES", "2"))
+
+# Features por equipo: peso de cada partido nuevo en las medias exponenciales y
+# partidos mínimos como local/visitante para usar ese split
+FEATURE_EWM_ALPHA         = float(os.getenv("FEATURE_EWM_ALPHA", "0.3"))
+FEATURE_MIN_SPLIT_MATCHES = int(os.getenv("FEATURE_MIN_SPLIT_MATCHES", "3"))
+
+# Cache de historiales por equipo: caducidad y tamaño máximo
+TEAM_HISTORY_TTL_HOURS  = float(os.getenv("TEAM_HISTORY_TTL_HOURS", "24"))
+TEAM_HISTORY_MAX_TEAMS  = int(os.getenv("TEAM_HISTORY_MAX_TEAMS", "400"))
+
+# Persistencia: SQLite (WAL). stats.json solo se lee una vez para migrarlo.
+STATS_DB = os.getenv("STATS_DB", "stats.db")
+# Ledger append-only de todos los picks generados y sus resultados
+LEDGER_DIR         = os.getenv("LEDGER_DIR", "ledger")
+LEDGER_SEGMENT_MB  = float(os.getenv("LEDGER_SEGMENT_MB", "4"))
+
+# Multi-worker: un líder (lease por file-lock) consulta el API y publica un snapshot
+LEASE_FILE            = os.getenv("LEASE_FILE", "fixit.lease")
+SNAPSHOT_DB           = os.getenv("SNAPSHOT_DB", "snapshot.db")
+SNAPSHOT_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", "1"))
+LEASE_RETRY_SECONDS   = float(os.getenv("LEASE_RETRY_SECONDS", "5"))
+
+# Scheduler: sincronización completa por cron (hora de Madrid) y trabajos por partido
+SCHEDULER_TZ            = os.getenv("SCHEDULER_TZ", "Europe/Madrid")
+SYNC_CRON               = os.getenv("SYNC_CRON", "0 2,12 * * *")
+SYNC_CRON_JITTER        = float(os.getenv("SYNC_CRON_JITTER_SECONDS", "60"))
+SCHEDULER_MISFIRE_GRACE = float(os.getenv("SCHEDULER_MISFIRE_GRACE_SECONDS", "21600"))
+PREKICKOFF_MINUTES      = float(os.getenv("PREKICKOFF_MINUTES", "30"))
+SETTLE_AFTER_MINUTES    = float(os.getenv("SETTLE_AFTER_MINUTES", "120"))
+SETTLE_RETRY_MINUTES    = float(os.getenv("SETTLE_RETRY_MINUTES", "20"))
+SETTLE_MAX_ATTEMPTS     = int(os.getenv("SETTLE_MAX_ATTEMPTS", "6"))
+# Liquidación: partidos por petición /matches?ids=... y días antes de dar un pick por perdido
+SETTLE_BATCH_SIZE       = int(os.getenv("SETTLE_BATCH_SIZE", "50"))
+SETTLE_EXPIRE_DAYS      = float(os.getenv("SETTLE_EXPIRE_DAYS", "4"))
+
 # Competiciones habilitadas en Football-Data.org plan gratuito
 # Código -> nombre display
 ENABLED_COMPETITIONS = {
@@ -51,12 +127,67 @@ ENABLED_COMPETITIONS = {
     "BSA": "Serie A Brasil",
 }
 
+# Proyecciones de temporada (Monte Carlo) de las ligas, en su propio hilo tras
+# cada sync con resultados nuevos. SIM_WORKERS=0 usa un hilo por CPU.
+SIM_SEASONS      = int(os.getenv("SIM_SEASONS", "100000"))
+SIM_WORKERS      = int(os.getenv("SIM_WORKERS", "0")) or None
+SIM_COMPETITIONS = [c for c in os.getenv("SIM_COMPETITIONS", ",".join(ENABLED_COMPETITIONS)).split(",")
+                    if c in ENABLED_COMPETITIONS and c in LEAGUE_COMPETITIONS]
+
 # Meta visual por tipo de pick (market_key → label, icon, color)
 MARKET_META = {
-    "home_win":  ("Victoria Local",     "fa-shield-halved",            "#10b981"),
-    "draw":      ("Empate",             "fa-equals",                   "#f59e0b"),
-    "away_win":  ("Victoria Visitante", "fa-plane",                    "#6366f1"),
+    "home_win":      ("Victoria Local",              "fa-shield-halved",     "#10b981"),
+    "draw":          ("Empate",                      "fa-equals",            "#f59e0b"),
+    "away_win":      ("Victoria Visitante",          "fa-plane",             "#6366f1"),
+    "dc_1x":         ("Doble Oportunidad 1X",        "fa-shield",            "#14b8a6"),
+    "dc_x2":         ("Doble Oportunidad X2",        "fa-shield",            "#8b5cf6"),
+    "dc_12":         ("Doble Oportunidad 12",        "fa-shield",            "#0ea5e9"),
+    "over_15":       ("Más de 1.5 Goles",            "fa-arrow-trend-up",    "#22d3ee"),
+    "over_25":       ("Más de 2.5 Goles",            "fa-arrow-trend-up",    "#06b6d4"),
+    "over_35":       ("Más de 3.5 Goles",            "fa-arrow-trend-up",    "#0891b2"),
+    "under_15":      ("Menos de 1.5 Goles",          "fa-arrow-trend-down",  "#f472b6"),
+    "under_25":      ("Menos de 2.5 Goles",          "fa-arrow-trend-down",  "#ec4899"),
+    "under_35":      ("Menos de 3.5 Goles",          "fa-arrow-trend-down",  "#db2777"),
+    "btts_yes":      ("Ambos Marcan: Sí",            "fa-futbol",            "#84cc16"),
+    "btts_no":       ("Ambos Marcan: No",            "fa-ban",               "#ef4444"),
+    "ah_home_-1.5":  ("Hándicap Asiático Local -1.5",     "fa-scale-unbalanced",       "#10b981"),
+    "ah_away_-1.5":  ("Hándicap Asiático Visitante -1.5", "fa-scale-unbalanced-flip",  "#6366f1"),
+    "ah_home_+1.5":  ("Hándicap Asiático Local +1.5",     "fa-scale-balanced",         "#10b981"),
+    "ah_away_+1.5":  ("Hándicap Asiático Visitante +1.5", "fa-scale-balanced",         "#6366f1"),
+    "correct_score": ("Resultado Exacto",            "fa-bullseye",          "#facc15"),
+}
+# Los picks guardan el índice del mercado en este catálogo, no sus textos
+register_markets(MARKET_META)
+
+# Umbral de confianza en modo POISSON PURO (sin cuota) por mercado.
+# Los mercados "fáciles" (doble oportunidad, +1.5 goles...) exigen más confianza
+# para que no inunden la tabla de picks.
+PURE_POISSON_THRESHOLDS = {
+    "home_win": 0.35, "draw": 0.35, "away_win": 0.35,
+    "dc_1x": 0.80, "dc_x2": 0.80, "dc_12": 0.80,
+    "over_15": 0.80, "over_25": 0.62, "over_35": 0.45,
+    "under_15": 0.45, "under_25": 0.62, "under_35": 0.80,
+    "btts_yes": 0.62, "btts_no": 0.62,
+    "ah_home_-1.5": 0.45, "ah_away_-1.5": 0.45,
+    "ah_home_+1.5": 0.88, "ah_away_+1.5": 0.88,
+    "correct_score": 0.14,
 }
+CORRECT_SCORE_TOP_N = 3
+
+# Kernel del 1X2: "grid" (matriz de marcadores truncada en 8 goles) o "skellam"
+# (diferencia de goles con corte por partido y error < SKELLAM_EPS). Con
+# "skellam", 1X2 y doble oportunidad salen de un batch por lote en vez de tres
+# reducciones de la matriz por partido (más barato a partir de unas decenas de
+# partidos, ver bench_poisson.py) y el error del 1X2 baja de ~2e-2 a ~1e-11.
+# La matriz se sigue usando para goles, BTTS, hándicap y resultado exacto.
+ONE_X_TWO_KERNEL = os.getenv("ONE_X_TWO_KERNEL", "grid").lower()
+SKELLAM_EPS      = float(os.getenv("SKELLAM_EPS", "1e-10"))
+
+# Value betting: margen mínimo (prob × cuota) - 1 para publicar un pick con cuota
+VALUE_EDGE_THRESHOLD = 0.10
+# Fatiga: factor sobre λ si el equipo jugó hace menos de FATIGUE_MIN_REST_DAYS días
+FATIGUE_PENALTY       = 0.95
+FATIGUE_MIN_REST_DAYS = 4
 
 # ─────────────────────────────────────────────────────────
 #  MOTOR MATEMÁTICO: DISTRIBUCIÓN DE POISSON
@@ -96,50 +227,337 @@ def calculate_1x2_poisson(lam_home: float, lam_away: float, max_goals: int = 8):
     return prob_home, prob_draw, prob_away
 
 
-def build_lambda(team_history: list, is_home_in_fixture: bool) -> tuple:
+def poisson_pmf_table(lams, max_goals: int = 8) -> np.ndarray:
+    """
+    Tabla PMF de Poisson (n, max_goals+1) para un vector de λ.
+    Usa la recurrencia P(k) = P(k-1)·λ/k para evitar factoriales y potencias.
+    """
+    lams  = np.clip(np.asarray(lams, dtype=float).reshape(-1), 0.0, None)
+    table = np.empty((lams.size, max_goals + 1))
+    table[:, 0] = 1.0
+    if max_goals > 0:
+        ratios = lams[:, None] / np.arange(1, max_goals + 1)
+        table[:, 1:] = np.cumprod(ratios, axis=1)
+    table *= np.exp(-lams)[:, None]
+    return table
+
+
+def _outcome_masks(max_goals: int) -> np.ndarray:
+    """Máscaras (3, G·G) que asignan cada marcador (i, j) a 1, X o 2."""
+    g = np.arange(max_goals + 1)
+    i, j = np.meshgrid(g, g, indexing="ij")
+    return np.stack([(i > j), (i == j), (i < j)]).reshape(3, -1).astype(float)
+
+
+def scoreline_grid_batch(lam_home, lam_away, max_goals: int = 8) -> np.ndarray:
+    """
+    Matrices de marcadores (n, G, G) para todos los partidos a la vez.
+    grid[n, i, j] = P(local marca i, visitante marca j), normalizada a 1.
+    """
+    lam_home = np.asarray(lam_home, dtype=float).reshape(-1)
+    lam_away = np.asarray(lam_away, dtype=float).reshape(-1)
+    n = lam_home.size
+
+    # Una única tabla PMF compartida para ambos equipos de todos los partidos
+    pmf = poisson_pmf_table(np.concatenate([lam_home, lam_away]), max_goals)
+    p_home, p_away = pmf[:n], pmf[n:]
+
+    # Producto exterior por partido; se renormaliza la masa truncada
+    grid  = p_home[:, :, None] * p_away[:, None, :]
+    total = grid.sum(axis=(1, 2), keepdims=True)
+    np.divide(grid, total, out=grid, where=total > 0)
+    return grid
+
+
+def calculate_1x2_poisson_batch(lam_home, lam_away, max_goals: int = 8) -> np.ndarray:
+    """
+    Versión vectorizada de calculate_1x2_poisson para todos los partidos a la vez.
+    Recibe arrays de λ_local y λ_visitante y retorna un array (n, 3) con
+    (prob_home, prob_draw, prob_away) normalizadas por fila.
+    """
+    grid = scoreline_grid_batch(lam_home, lam_away, max_goals)
+    if grid.shape[0] == 0:
+        return np.empty((0, 3))
+    return grid.reshape(grid.shape[0], -1) @ _outcome_masks(max_goals).T
+
+
+def _poisson_tail_cutoff(lam: float, eps: float) -> int:
     """
-    Calcula λ_ataque y λ_defensa de un equipo a partir de sus últimos N partidos.
-    Retorna (avg_goles_marcados, avg_goles_recibidos).
+    Menor n tal que P(X > n) < eps para X ~ Poisson(lam). Para n+2 > lam la cola
+    está acotada por la serie geométrica p(n+1) / (1 - lam/(n+2)).
     """
-    if not team_history:
-        return 1.2, 1.2  # valores neutros por defecto
+    p, n = math.exp(-lam), 0
+    while True:
+        nxt = p * lam / (n + 1)
+        ratio = lam / (n + 2)
+        if ratio < 1.0 and nxt / (1.0 - ratio) < eps:
+            return n
+        p, n = nxt, n + 1
+
 
-    scored_list  = []
-    conceded_list = []
+def skellam_1x2(lam_home: float, lam_away: float, eps: float = None) -> tuple:
+    """
+    1X2 exacto a partir de la diferencia de goles D = X - Y (Skellam):
+        P(D = 0) = e^-(a+b) · Σ (ab)^m / (m!)²     (serie de Bessel I₀)
+        P(D > 0) = Σ_i p_X(i) · F_Y(i - 1)
+    con las PMF por recurrencia y la suma cortada en cuanto la cola restante
+    de cada equipo es menor que eps/2; P(D < 0) sale por complemento. Retorna
+    (home, draw, away, cota_error): cada probabilidad difiere de la exacta en
+    menos de cota_error.
+    """
+    eps = SKELLAM_EPS if eps is None else eps
+    lam_home, lam_away = max(lam_home, 0.0), max(lam_away, 0.0)
+    n_home = _poisson_tail_cutoff(lam_home, eps / 2)
+    n_away = _poisson_tail_cutoff(lam_away, eps / 2)
+    n = max(n_home, n_away)
+    p_home, p_away = math.exp(-lam_home), math.exp(-lam_away)
+    cdf_home = cdf_away = home = draw = 0.0
+    for i in range(n + 1):
+        # Gana local: X = i y Y < i ; empate: X = Y = i
+        home += p_home * cdf_away
+        draw += p_home * p_away
+        cdf_away += p_away
+        cdf_home += p_home
+        p_home *= lam_home / (i + 1)
+        p_away *= lam_away / (i + 1)
+    # La masa no sumada de cada equipo acota lo que falta en cada resultado; el
+    # visitante por complemento se queda con la del cuadrado (n+1)², que es
+    # 1 - M_home·M_away ≤ (1 - M_home) + (1 - M_away)
+    bound = (1.0 - cdf_home) + (1.0 - cdf_away)
+    return home, draw, 1.0 - home - draw, max(bound, 0.0)
+
+
+# Corte por partido del batch Skellam: cada λ se redondea hacia arriba a un
+# múltiplo de SKELLAM_LAMBDA_STEP (el corte crece con λ), así el corte escalar
+# se calcula una vez por cubo y no por partido
+SKELLAM_LAMBDA_STEP = 0.25
+
+
+@functools.lru_cache(maxsize=1024)
+def _bucket_cutoff(bucket: int, eps: float) -> int:
+    return _poisson_tail_cutoff(bucket * SKELLAM_LAMBDA_STEP, eps)
+
+
+def _skellam_cutoffs(lams: np.ndarray, eps: float) -> np.ndarray:
+    """Corte (≥ _poisson_tail_cutoff(λ, eps)) de cada λ."""
+    buckets, inverse = np.unique(np.ceil(lams / SKELLAM_LAMBDA_STEP).astype(int), return_inverse=True)
+    return np.array([_bucket_cutoff(int(b), eps) for b in buckets])[inverse.reshape(-1)]
+
+
+def skellam_1x2_batch(lam_home, lam_away, eps: float = None) -> tuple:
+    """
+    Versión vectorizada de skellam_1x2 con corte por partido. Las filas se
+    ordenan por corte descendente y la recurrencia de las PMF avanza gol a
+    gol solo sobre el prefijo de filas que aún no llegaron a su corte: cada
+    partido hace el trabajo que pide su λ, no el del λ más alto del lote.
+    Retorna (array (n, 3), cotas de error (n,)).
+    """
+    eps = SKELLAM_EPS if eps is None else eps
+    lam_home = np.clip(np.asarray(lam_home, dtype=float).reshape(-1), 0.0, None)
+    lam_away = np.clip(np.asarray(lam_away, dtype=float).reshape(-1), 0.0, None)
+    n = lam_home.size
+    if n == 0:
+        return np.empty((0, 3)), np.empty(0)
+    cutoffs = _skellam_cutoffs(np.concatenate([lam_home, lam_away]), eps / 2).reshape(2, n).max(axis=0)
+    order   = np.argsort(-cutoffs, kind="stable")
+    # active[k]: cuántas filas (prefijo del orden) tienen corte ≥ k
+    active  = np.searchsorted(-cutoffs[order], -np.arange(int(cutoffs.max()) + 1), side="right")
+
+    lams = np.stack([lam_home[order], lam_away[order]])   # (2, n): local, visitante
+    pmf  = np.exp(-lams)                                  # p(k) de cada equipo
+    cdf  = np.zeros_like(pmf)                             # F(k - 1) de cada equipo
+    home, draw, tmp = np.zeros(n), np.zeros(n), np.empty(n)
+    for k, rows in enumerate(active.tolist()):
+        p_home, p_away, t = pmf[0, :rows], pmf[1, :rows], tmp[:rows]
+        # Gana local: X = k y Y < k ; empate: X = Y = k
+        home[:rows] += np.multiply(p_home, cdf[1, :rows], out=t)
+        draw[:rows] += np.multiply(p_home, p_away, out=t)
+        cdf[:, :rows] += pmf[:, :rows]
+        pmf[:, :rows] *= lams[:, :rows] / (k + 1)
+
+    out = np.empty((n, 3))
+    out[order, 0] = home
+    out[order, 1] = draw
+    # Visitante por complemento, como en skellam_1x2
+    out[:, 2] = 1.0 - out[:, 0] - out[:, 1]
+    bound = np.empty(n)
+    bound[order] = np.maximum(2.0 - cdf[0] - cdf[1], 0.0)
+    return out, bound
+
+
+def outcome_1x2_batch(lam_home, lam_away) -> np.ndarray:
+    """1X2 (n, 3) con el kernel elegido en ONE_X_TWO_KERNEL ("grid" o "skellam")."""
+    if ONE_X_TWO_KERNEL == "skellam":
+        return skellam_1x2_batch(lam_home, lam_away)[0]
+    return calculate_1x2_poisson_batch(lam_home, lam_away)
+
+
+class ScorelineMatrix:
+    """
+    Distribución conjunta de marcadores de un partido. Se calcula una sola vez
+    y todos los mercados se derivan de ella con reducciones baratas.
+    """
+    __slots__ = ("lam_home", "lam_away", "grid", "_diff", "_total")
+
+    def __init__(self, lam_home: float, lam_away: float, grid: np.ndarray):
+        self.lam_home = lam_home
+        self.lam_away = lam_away
+        self.grid     = grid
+        self.grid.flags.writeable = False
+        g = np.arange(grid.shape[0])
+        self._diff  = g[:, None] - g[None, :]   # goles local - goles visitante
+        self._total = g[:, None] + g[None, :]   # goles totales
+
+    def outcome_1x2(self) -> tuple:
+        """(prob_home, prob_draw, prob_away)."""
+        return (float(self.grid[self._diff > 0].sum()),
+                float(np.trace(self.grid)),
+                float(self.grid[self._diff < 0].sum()))
+
+    def over(self, line: float) -> float:
+        """P(goles totales > line)."""
+        return float(self.grid[self._total > line].sum())
+
+    def under(self, line: float) -> float:
+        """P(goles totales < line)."""
+        return float(self.grid[self._total < line].sum())
+
+    def btts(self) -> float:
+        """P(ambos equipos marcan)."""
+        return float(self.grid[1:, 1:].sum())
+
+    def double_chance(self) -> tuple:
+        """(1X, X2, 12)."""
+        h, d, a = self.outcome_1x2()
+        return h + d, d + a, h + a
+
+    def asian_handicap(self, line: float, side: str = "home") -> tuple:
+        """
+        Hándicap asiático (línea entera o media) aplicado al equipo `side`.
+        Retorna (p_gana, p_push, p_pierde).
+        """
+        diff = self._diff if side == "home" else -self._diff
+        adjusted = diff + line
+        return (float(self.grid[adjusted > 0].sum()),
+                float(self.grid[adjusted == 0].sum()),
+                float(self.grid[adjusted < 0].sum()))
+
+    def correct_scores(self, top_n: int = CORRECT_SCORE_TOP_N) -> list:
+        """Top-N marcadores exactos más probables: [((goles_local, goles_visit), prob)]."""
+        flat  = self.grid.ravel()
+        top_n = min(top_n, flat.size)
+        idx   = np.argpartition(flat, -top_n)[-top_n:]
+        idx   = idx[np.argsort(flat[idx])[::-1]]
+        cols  = self.grid.shape[1]
+        return [((int(i // cols), int(i % cols)), float(flat[i])) for i in idx]
+
+    def markets(self, outcome: tuple = None) -> dict:
+        """
+        Probabilidad de cada mercado de MARKET_META (excepto resultado exacto).
+        `outcome` (home, draw, away) sustituye al 1X2 de la matriz truncada:
+        con él, 1X2 y doble oportunidad no se reducen desde la matriz.
+        """
+        h, d, a = outcome if outcome is not None else self.outcome_1x2()
+        return {
+            "home_win": h, "draw": d, "away_win": a,
+            "dc_1x": h + d, "dc_x2": d + a, "dc_12": h + a,
+            "over_15":  self.over(1.5),  "over_25":  self.over(2.5),  "over_35":  self.over(3.5),
+            "under_15": self.under(1.5), "under_25": self.under(2.5), "under_35": self.under(3.5),
+            "btts_yes": self.btts(), "btts_no": 1.0 - self.btts(),
+            "ah_home_-1.5": self.asian_handicap(-1.5, "home")[0],
+            "ah_away_-1.5": self.asian_handicap(-1.5, "away")[0],
+            "ah_home_+1.5": self.asian_handicap(+1.5, "home")[0],
+            "ah_away_+1.5": self.asian_handicap(+1.5, "away")[0],
+        }
 
-    for match in team_history:
-        home_team_id = match.get("homeTeam", {}).get("id")
-        home_score   = match.get("score", {}).get("fullTime", {}).get("home")
-        away_score   = match.get("score", {}).get("fullTime", {}).get("away")
 
-        if home_score is None or away_score is None:
-            continue  # partido sin resultado
+class ScorelineCache:
+    """
+    LRU de ScorelineMatrix indexada por (λ_home, λ_away) cuantizados.
+    Los pares que faltan se calculan juntos con scoreline_grid_batch.
+    """
 
-        if match.get("homeTeam", {}).get("id") == home_team_id:
-            # El equipo jugó como local
-            scored_list.append(home_score)
-            conceded_list.append(away_score)
+    def __init__(self, maxsize: int = 4096, quantum: float = 0.01, max_goals: int = 8):
+        from collections import OrderedDict
+        self.maxsize   = maxsize
+        self.quantum   = quantum
+        self.max_goals = max_goals
+        self.hits      = 0
+        self.misses    = 0
+        self._data     = OrderedDict()
+        self._lock     = threading.Lock()
+
+    def _key(self, lam_home: float, lam_away: float) -> tuple:
+        return (int(round(lam_home / self.quantum)), int(round(lam_away / self.quantum)))
+
+    def get_many(self, lam_home: list, lam_away: list) -> list:
+        """Retorna una ScorelineMatrix por cada par (λ_home, λ_away)."""
+        keys = [self._key(lh, la) for lh, la in zip(lam_home, lam_away)]
+        with self._lock:
+            missing = [k for k in dict.fromkeys(keys) if k not in self._data]
+            self.hits   += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            lh = np.array([k[0] for k in missing]) * self.quantum
+            la = np.array([k[1] for k in missing]) * self.quantum
+            grids = scoreline_grid_batch(lh, la, self.max_goals)
+            fresh = {k: ScorelineMatrix(float(lh[i]), float(la[i]), grids[i])
+                     for i, k in enumerate(missing)}
         else:
-            scored_list.append(away_score)
-            conceded_list.append(home_score)
+            fresh = {}
+
+        out = []
+        with self._lock:
+            self._data.update(fresh)
+            for k in keys:
+                matrix = self._data.get(k) or fresh[k]
+                self._data[k] = matrix
+                self._data.move_to_end(k)
+                out.append(matrix)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return out
+
+    def get(self, lam_home: float, lam_away: float) -> ScorelineMatrix:
+        return self.get_many([lam_home], [lam_away])[0]
 
-    if not scored_list:
-        return 1.2, 1.2
 
-    avg_scored   = sum(scored_list)   / len(scored_list)
-    avg_conceded = sum(conceded_list) / len(conceded_list)
-    return avg_scored, avg_conceded
+SCORELINE_CACHE = ScorelineCache()
+LEAGUE_MODELS   = LeagueModels(LEAGUE_FIT_DECAY, LEAGUE_FIT_PRIOR)
 
 
-def compute_lambdas(home_history: list, away_history: list,
+def team_goals(features, side: str) -> tuple:
+    """
+    (goles a favor, goles en contra) de un equipo desde su TeamFeatures,
+    usando el split local/visitante si tiene FEATURE_MIN_SPLIT_MATCHES partidos.
+    """
+    goals = features.goals(side, FEATURE_MIN_SPLIT_MATCHES) if features is not None else None
+    return goals if goals is not None else (1.2, 1.2)  # valores neutros por defecto
+
+
+def compute_lambdas(home_features, away_features,
                     league_avg_home: float = 1.45,
-                    league_avg_away: float = 1.05) -> tuple:
+                    league_avg_away: float = 1.05,
+                    comp: str = None, home_id=None, away_id=None, models: LeagueModels = None) -> tuple:
     """
     Calcula los parámetros de Poisson (λ_home, λ_away) según el modelo de
-    fuerza de ataque/defensa relativa (simplificado Dixon-Coles).
+    fuerza de ataque/defensa relativa (simplificado Dixon-Coles) a partir de
+    las TeamFeatures de ambos equipos (None = sin partidos).
+    Con `comp` usa el ajuste de `models` (por defecto LEAGUE_MODELS): las
+    fuerzas ajustadas de ambos equipos si las tiene o, si no, las medias de
+    esa competición.
     """
-    home_avg_scored,  home_avg_conceded = build_lambda(home_history, True)
-    away_avg_scored,  away_avg_conceded = build_lambda(away_history, False)
+    models = LEAGUE_MODELS if models is None else models
+    fit = models.get(comp) if comp else None
+    if fit is not None:
+        fitted = fit.lambdas(home_id, away_id)
+        if fitted is not None:
+            return max(0.3, min(fitted[0], 5.0)), max(0.3, min(fitted[1], 5.0))
+        league_avg_home, league_avg_away = fit.home_avg, fit.away_avg
+
+    home_avg_scored,  home_avg_conceded = team_goals(home_features, "home")
+    away_avg_scored,  away_avg_conceded = team_goals(away_features, "away")
 
     # Fuerza de ataque = promedio marcado del equipo / media de la liga
     home_attack  = home_avg_scored   / league_avg_home if league_avg_home > 0 else 1.0
@@ -159,33 +577,269 @@ def compute_lambdas(home_history: list, away_history: list,
     return lam_home, lam_away
 
 
-def apply_fatigue(prob: float, last_match_date_str: str, today: datetime) -> float:
+def apply_fatigue(prob: float, rest_days, penalty: float = None, min_rest_days: int = None) -> float:
+    """
+    Multiplica por FATIGUE_PENALTY (-5%) si el equipo jugó hace menos de
+    FATIGUE_MIN_REST_DAYS días (rest_days=None: sin partidos conocidos).
+    """
+    penalty       = FATIGUE_PENALTY if penalty is None else penalty
+    min_rest_days = FATIGUE_MIN_REST_DAYS if min_rest_days is None else min_rest_days
+    if rest_days is not None and rest_days < min_rest_days:
+        prob *= penalty
+    return prob
+
+
+# Versión del modelo: cambiarla invalida todas las huellas de partidos guardadas
+MODEL_VERSION = "poisson-markets-2"
+
+
+def fixture_fingerprint(fx: dict, home_features, away_features, today: datetime) -> str:
     """
-    Resta un 5% de probabilidad si el equipo jugó hace menos de 4 días.
-    last_match_date_str formato: 'YYYY-MM-DD' o ISO.
+    Huella de las entradas de un partido: id, kickoff, cuotas, el ajuste de su
+    competición y la versión de las features de ambos equipos. El día de
+    análisis entra por la fatiga.
     """
-    if not last_match_date_str:
-        return prob
+    payload = [
+        MODEL_VERSION,
+        ONE_X_TWO_KERNEL,
+        fx["id"],
+        fx["spain_dt"].isoformat(),
+        list(fx["odds"]),
+        today.strftime("%Y-%m-%d"),
+        LEAGUE_MODELS.fit_id(fx.get("comp")),
+        home_features.version() if home_features else None,
+        away_features.version() if away_features else None,
+    ]
+    return hashlib.sha1(json.dumps(payload, default=str).encode()).hexdigest()
+
+
+# ─────────────────────────────────────────────────────────
+#  CACHE DE HISTORIALES POR EQUIPO (TTL + LRU)
+# ─────────────────────────────────────────────────────────
+
+def _utc_timestamp(date_str: str) -> float:
+    """'2024-05-01T18:00:00Z' → timestamp UTC (0.0 si no se puede leer)."""
     try:
-        last = datetime.fromisoformat(last_match_date_str[:10])
-        days_rest = (today.date() - last.date()).days
-        if days_rest < 4:
-            prob *= 0.95
+        dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
     except Exception:
-        pass
-    return prob
+        return 0.0
 
 
-def last_match_date(history: list) -> str:
-    """Devuelve la fecha del partido más reciente en el historial."""
-    dates = []
-    for m in history:
-        d = m.get("utcDate", "")
-        if d:
-            dates.append(d[:10])
-    if not dates:
-        return ""
-    return sorted(dates, reverse=True)[0]
+class TeamHistoryCache:
+    """
+    Cache de historiales por equipo con fecha de descarga, TTL, invalidación
+    "ha jugado desde entonces" y expulsión LRU a partir de max_teams equipos.
+    """
+
+    def __init__(self, ttl_seconds: float, max_teams: int):
+        from collections import OrderedDict
+        self.ttl       = ttl_seconds
+        self.max_teams = max_teams
+        self.hits      = 0
+        self.misses    = 0
+        self.stale     = 0
+        self._entries  = OrderedDict()   # team_id -> {"fetched_at": ts, "matches": [MatchRow]}
+        self._played   = {}              # team_id -> último kickoff conocido (ts)
+        self._lock     = threading.Lock()
+
+    def load(self, data: dict):
+        """
+        Carga el formato persistido (filas de MatchRow). Las entradas antiguas
+        (lista sin fecha) nacen caducadas; los payloads completos del API se proyectan.
+        """
+        with self._lock:
+            for team_id, entry in (data or {}).items():
+                if isinstance(entry, list):
+                    entry = {"fetched_at": 0.0, "matches": entry}
+                if isinstance(entry, dict) and isinstance(entry.get("matches"), list):
+                    rows = [r for r in map(MatchRow.load, entry["matches"]) if r is not None]
+                    self._entries[str(team_id)] = {"fetched_at": entry.get("fetched_at", 0.0), "matches": rows}
+            self._evict()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return dict(self._entries)
+
+    def mark_played(self, team_id, kickoff_ts: float):
+        """Registra que el equipo jugó (o empezó a jugar) en kickoff_ts."""
+        key = str(team_id)
+        with self._lock:
+            if kickoff_ts > self._played.get(key, 0.0):
+                self._played[key] = kickoff_ts
+
+    def get(self, team_id, limit: int, as_of: datetime = None):
+        """
+        Retorna los últimos `limit` partidos o None si no hay entrada válida.
+        Caduca por TTL o si el equipo jugó entre la descarga y `as_of`
+        (la fecha del partido que se va a analizar).
+        """
+        key = str(team_id)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or len(entry["matches"]) < limit:
+                self.misses += 1
+                return None
+            fetched_at = entry.get("fetched_at", 0.0)
+            horizon    = as_of.timestamp() if as_of else now
+            played     = self._played.get(key, 0.0)
+            if now - fetched_at > self.ttl or fetched_at < played < horizon:
+                self.stale += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["matches"][:limit]
+
+    def put(self, team_id, matches: list):
+        with self._lock:
+            key = str(team_id)
+            self._entries[key] = {"fetched_at": time.time(), "matches": matches}
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_teams:
+            self._entries.popitem(last=False)
+
+    def counters(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                "teams":     len(self._entries),
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "stale":     self.stale,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+# ─────────────────────────────────────────────────────────
+#  ÍNDICE DE HISTORIALES POR COMPETICIÓN
+# ─────────────────────────────────────────────────────────
+
+class CompetitionHistoryIndex:
+    """
+    Índice en memoria team_id → partidos FINISHED recientes (MatchRow, más reciente
+    primero), construido a partir de los listados de partidos de cada competición.
+    Se refresca de forma incremental por ventana de fechas.
+    """
+
+    def __init__(self, max_per_team: int = 20):
+        self.max_per_team = max_per_team
+        self._by_team   = {}   # team_id -> {match_id: MatchRow}
+        self._sorted    = {}   # team_id -> [MatchRow] ordenado por kickoff desc
+        self._refreshed = {}   # comp_code -> última fecha "YYYY-MM-DD" incluida
+        self._by_comp   = {}   # comp_code -> {match_id: MatchRow} (ajuste por competición)
+        self._lock      = threading.Lock()
+
+    def window_for(self, comp_code: str, today: datetime) -> tuple:
+        """(date_from, date_to) a pedir para `comp_code`: solo lo nuevo desde el último refresco."""
+        date_to = today.strftime("%Y-%m-%d")
+        with self._lock:
+            last = self._refreshed.get(comp_code)
+        if last:
+            # Solapamos un día: partidos que terminaron después del último refresco
+            start = datetime.fromisoformat(last) - timedelta(days=1)
+        else:
+            start = today - timedelta(days=BULK_HISTORY_DAYS)
+        return start.strftime("%Y-%m-%d"), date_to
+
+    def merge(self, comp_code: str, matches: list, refreshed_until: str) -> int:
+        """Incorpora partidos terminados (MatchRow). Retorna cuántos eran nuevos."""
+        added   = 0
+        touched = set()
+        with self._lock:
+            comp_matches = self._by_comp.setdefault(comp_code, {})
+            for m in matches:
+                comp_matches[m.id] = m
+                for team_id in (m.home_id, m.away_id):
+                    if team_id is None:
+                        continue
+                    bucket = self._by_team.setdefault(team_id, {})
+                    if m.id not in bucket:
+                        bucket[m.id] = m
+                        touched.add(team_id)
+                        added += 1
+            for team_id in touched:
+                ordered = sorted(self._by_team[team_id].values(),
+                                 key=lambda x: x.kickoff, reverse=True)[:self.max_per_team]
+                self._by_team[team_id] = {m.id: m for m in ordered}
+                self._sorted[team_id]  = ordered
+            self._refreshed[comp_code] = refreshed_until
+            # La ventana del ajuste acota la memoria del histórico por competición
+            cutoff = (datetime.fromisoformat(refreshed_until).replace(tzinfo=timezone.utc)
+                      - timedelta(days=LEAGUE_FIT_WINDOW_DAYS)).timestamp()
+            for match_id in [k for k, m in comp_matches.items() if m.kickoff < cutoff]:
+                del comp_matches[match_id]
+        return added
+
+    def competition_matches(self, comp_code: str) -> list:
+        """Partidos FINISHED de la competición dentro de LEAGUE_FIT_WINDOW_DAYS."""
+        with self._lock:
+            return list(self._by_comp.get(comp_code, {}).values())
+
+    def recent(self, team_id: int, limit: int = 5) -> list:
+        with self._lock:
+            return list(self._sorted.get(team_id, [])[:limit])
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+
+# ─────────────────────────────────────────────────────────
+#  SNAPSHOTS INMUTABLES PARA LECTORES
+# ─────────────────────────────────────────────────────────
+
+class EngineSnapshot(NamedTuple):
+    """
+    Estado publicado del motor. Los lectores (rutas Flask) lo leen sin lock;
+    el escritor construye uno nuevo y lo publica con una sola asignación.
+    """
+    version:       int
+    picks:         tuple
+    sidebar:       Mapping
+    stats:         Mapping
+    top_leagues:   tuple
+    matches_count: int
+    last_updated:  str
+    is_fetching:   bool
+    published_at:  float
+
+
+def _group_sidebar(picks: tuple) -> Mapping:
+    """Partidos con pronóstico agrupados por liga (uno por partido) para el sidebar."""
+    output = {}
+    seen   = set()
+    for p in picks:
+        if p.get("id") in seen:
+            continue
+        seen.add(p.get("id"))
+        output.setdefault(p.get("league", "Otros"), []).append(MappingProxyType({
+            "id":     p.get("id"),
+            "teams":  p.get("teams"),
+            "time":   p.get("time"),
+            "status": "PND",
+            "score":  "-"
+        }))
+    return MappingProxyType({league: tuple(rows) for league, rows in output.items()})
+
+
+def _freeze_stats(stats: dict) -> Mapping:
+    """Copia de solo lectura de lo que muestra el panel de stats."""
+    return MappingProxyType({
+        "ganadas":   stats.get("ganadas", 0),
+        "perdidas":  stats.get("perdidas", 0),
+        "ligas":     MappingProxyType(dict(stats.get("ligas", {}))),
+        "historial": tuple(MappingProxyType(dict(h)) for h in stats.get("historial", [])),
+    })
+
+
+def _top_leagues(stats: dict) -> tuple:
+    """Las 3 mejores ligas por aciertos."""
+    return tuple(sorted(stats.get("ligas", {}).items(), key=lambda x: x[1], reverse=True)[:3])
 
 
 # ─────────────────────────────────────────────────────────
@@ -196,48 +850,246 @@ class FixItPRO:
         log("FixItPRO: Iniciando constructor...")
         self.matches: list          = []
         self.cached_picks: list     = []
-        self.team_history_cache: dict = {}  # {team_id: [matches]}
-        self.last_updated: str      = "Sincronizando Motor PRO..."
+        self.history_cache          = TeamHistoryCache(TEAM_HISTORY_TTL_HOURS * 3600, TEAM_HISTORY_MAX_TEAMS)
+        self.history_index          = CompetitionHistoryIndex()
+        self._last_updated: str     = "Sincronizando Motor PRO..."
         self.is_fetching: bool      = False
         self._lock                  = threading.RLock()
-        self.session                = requests.Session()
-        self.session.headers.update(HEADERS)
+        self.snapshot: EngineSnapshot = None
+        recorder                    = None
+        if RECORD_DIR:
+            from replay import Recorder
+            recorder = Recorder(RECORD_DIR)
+        self.api                    = ApiClient(API_KEY, API_RATE_PER_MIN, API_RATE_BURST,
+                                                user_agent=HEADERS["User-Agent"],
+                                                pool_size=HISTORY_WORKERS + 2,
+                                                breaker_threshold=API_BREAKER_THRESHOLD,
+                                                breaker_cooldown=API_BREAKER_COOLDOWN,
+                                                recorder=recorder, log=log)
+        self.odds                   = None
+        if ODDS_API_KEY:
+            odds_client = ApiClient(None, ODDS_RATE_PER_MIN, user_agent=HEADERS["User-Agent"], pool_size=2,
+                                    breaker_threshold=API_BREAKER_THRESHOLD,
+                                    breaker_cooldown=API_BREAKER_COOLDOWN, log=log)
+            self.odds = OddsProvider(odds_client, ODDS_API_KEY, ODDS_BASE_URL, ODDS_REGIONS, ODDS_TTL_SECONDS,
+                                     ODDS_KICKOFF_TOLERANCE_MINUTES * 60, load_aliases(ODDS_ALIASES_FILE), log=log)
         self.stats_file             = "stats.json"
-        self.stats                  = self.load_stats()
-        self.cached_picks           = self.stats.get("cached_picks", [])
-        # Sanidad de stats
-        if not isinstance(self.stats, dict):
-            self.stats = {"ganadas": 0, "perdidas": 0, "ligas": {}, "processed_fixtures": [], "historial": [], "cached_picks": [], "team_histories": {}}
-        for key in ("ligas", "processed_fixtures", "historial", "cached_picks", "team_histories"):
-            if key not in self.stats:
-                self.stats[key] = {} if key in ("ligas", "team_histories") else []
+        self.store                  = StatsStore(STATS_DB)
+        # Features por equipo: se alimentan de cada partido FINISHED que llega
+        self.features               = TeamFeatureStore(FEATURE_EWM_ALPHA)
+        self._load_state()
+        # El panel de stats sale de los agregados del ledger
+        self.ledger   = PickLedger(LEDGER_DIR, int(LEDGER_SEGMENT_MB * 1024 * 1024), seed=self.stats)
+        self.stats.update(self.ledger.stats_view())
+        # Multi-worker
+        self.role                   = "pending"   # "leader" | "follower"
+        self.lease                  = LeaderLease(LEASE_FILE)
+        self.shared                 = SharedSnapshot(SNAPSHOT_DB)
+        self._snapshot_generation   = 0
+        self._snapshot_checked      = 0.0
+        self.leader_job             = None        # progreso de la sync del líder (followers)
+        # Sincronizaciones single-flight con progreso estructurado
+        self.sync                   = SyncCoordinator(self._run_sync_job, on_finish=self._on_sync_finished)
+        # Trabajo lento fuera del hilo del scheduler: liquidación (HTTP con reintentos)
+        # y proyecciones de temporada (HTTP + Monte Carlo), cada una en su cola
+        self.settle_queue           = WorkQueue("settlement", log=log, on_run=lambda key, result:
+                                                metrics.BACKGROUND_RUNS.inc(queue="settlement", result=result))
+        self.projection_queue       = WorkQueue("projections", log=log, on_run=lambda key, result:
+                                                metrics.BACKGROUND_RUNS.inc(queue="projections", result=result))
+        # Cron de sincronización + refrescos antes del kickoff y liquidación tras el final
+        self.scheduler              = Scheduler(state=self.store, misfire_grace=SCHEDULER_MISFIRE_GRACE,
+                                                log=log, on_run=lambda job, result:
+                                                metrics.SCHEDULER_RUNS.inc(kind=job.kind, result=result))
+        self._job                   = None
+        self._swap_snapshot(picks=True, stats=True)
+
+    # ── Snapshot local (lectores sin lock) ────────────────
+    @property
+    def last_updated(self) -> str:
+        return self._last_updated
+
+    @last_updated.setter
+    def last_updated(self, value: str):
+        with self._lock:
+            self._last_updated = value
+            self._swap_snapshot()
+
+    def _swap_snapshot(self, picks: bool = False, stats: bool = False):
+        """
+        Publica un EngineSnapshot nuevo con una sola asignación de referencia.
+        Solo se reconstruyen picks/sidebar o stats/ranking si cambiaron.
+        """
+        with self._lock:
+            prev = self.snapshot
+            if picks or prev is None:
+                snap_picks = tuple(self.cached_picks)
+                sidebar    = _group_sidebar(snap_picks)
+            else:
+                snap_picks, sidebar = prev.picks, prev.sidebar
+            if stats or prev is None:
+                snap_stats = _freeze_stats(self.stats)
+                top        = _top_leagues(self.stats)
+            else:
+                snap_stats, top = prev.stats, prev.top_leagues
+            self.snapshot = EngineSnapshot(
+                version=(prev.version + 1) if prev else 1,
+                picks=snap_picks,
+                sidebar=sidebar,
+                stats=snap_stats,
+                top_leagues=top,
+                matches_count=len(self.matches),
+                last_updated=self._last_updated,
+                is_fetching=self.is_fetching,
+                published_at=time.time(),
+            )
+
+    # ── Snapshot compartido (multi-worker) ────────────────
+    def publish_snapshot(self):
+        """Líder: publica picks, partidos y stats para el resto de workers."""
+        if self.role != "leader":
+            return
+        job = self.sync.current()
+        with self._lock:
+            payload = {
+                "picks":        [p.to_row() for p in self.cached_picks],
+                "matches":      list(self.matches),
+                "stats":        {k: v for k, v in self.stats.items() if k not in ("team_histories", "fixture_picks",
+                                                                            "pending_picks", "processed_fixtures",
+                                                                            "cached_picks")},
+                "last_updated": self.last_updated,
+                "is_fetching":  self.is_fetching,
+                "sync_job":     job.to_dict() if job else None,
+            }
+        try:
+            self._snapshot_generation = self.shared.publish(payload)
+        except Exception as e:
+            log(f"publish_snapshot: Error {e}", "ERROR")
+
+    def refresh_from_snapshot(self):
+        """Follower: recarga el snapshot solo si cambió su generación (consulta barata)."""
+        if self.role != "follower":
+            return
+        now = time.monotonic()
+        if now - self._snapshot_checked < SNAPSHOT_POLL_SECONDS:
+            return
+        self._snapshot_checked = now
+        try:
+            if self.shared.generation() == self._snapshot_generation:
+                return
+            generation, payload = self.shared.read()
+        except Exception as e:
+            log(f"refresh_from_snapshot: Error {e}", "ERROR")
+            return
+        if not payload:
+            return
+        with self._lock:
+            self.cached_picks = Pick.load_many(payload.get("picks"))
+            self.matches      = payload.get("matches", [])
+            # Solo las claves publicadas: pendientes, liquidados e historiales
+            # siguen siendo los de StatsStore por si este worker pasa a líder
+            self.stats.update(payload.get("stats") or {})
+            self._last_updated = payload.get("last_updated", self._last_updated)
+            self.is_fetching  = payload.get("is_fetching", False)
+            self.leader_job   = payload.get("sync_job")
+            self._snapshot_generation = generation
+            self._swap_snapshot(picks=True, stats=True)
+
+    def become_leader(self):
+        """Toma el rol de líder: sincronización inicial + scheduler + peticiones de followers."""
+        if self.role == "follower":
+            # Sus stats venían del snapshot: se recarga todo lo que guardó el líder anterior
+            self._load_state()
+            self.stats.update(self.ledger.stats_view())
+            self._swap_snapshot(picks=True, stats=True)
+        self.role = "leader"
+        log("become_leader: Lease adquirido, este proceso consulta el API.")
+        self.sync.submit()
+        self.start_scheduler()
+
+        def serve_requests():
+            while True:
+                time.sleep(LEASE_RETRY_SECONDS)
+                try:
+                    for comps in self.shared.take_sync_requests():
+                        log(f"become_leader: Sincronización pedida por un follower ({comps or 'todas'}).")
+                        self.sync.submit(comps)
+                except Exception as e:
+                    log(f"become_leader: Error atendiendo peticiones {e}", "ERROR")
+
+        threading.Thread(target=serve_requests, daemon=True).start()
+
+    def watch_lease(self):
+        """Follower: reintenta el lease por si el líder muere."""
+        def run():
+            while self.role == "follower":
+                time.sleep(LEASE_RETRY_SECONDS)
+                if self.lease.try_acquire():
+                    self.become_leader()
+                    return
+
+        threading.Thread(target=run, daemon=True).start()
 
     # ── Persistencia ──────────────────────────────────────
+    def _load_state(self):
+        """
+        Estado completo desde StatsStore: stats, picks, historiales, picks
+        pendientes e ids liquidados. Al arrancar y al pasar de follower a líder
+        (el snapshot compartido no lleva las claves privadas del líder).
+        """
+        stats = self.load_stats()
+        # Sanidad de stats
+        if not isinstance(stats, dict):
+            stats = empty_stats()
+        mapping_keys = ("ligas", "team_histories", "fixture_picks", "pending_picks")
+        for key in ("processed_fixtures", "historial", "cached_picks") + mapping_keys:
+            if key not in stats:
+                stats[key] = {} if key in mapping_keys else []
+        # Picks como registros compactos (filas persistidas o dicts de versiones anteriores)
+        stats["cached_picks"] = Pick.load_many(stats["cached_picks"])
+        for key in ("fixture_picks", "pending_picks"):
+            for entry in stats[key].values():
+                entry["picks"] = Pick.load_many(entry.get("picks"))
+        with self._lock:
+            self.stats        = stats
+            self.cached_picks = stats["cached_picks"]
+            self.history_cache.load(stats.get("team_histories"))
+            self.features.ingest([m for entry in self.history_cache.to_dict().values() for m in entry["matches"]])
+            # Liquidación: picks pendientes por partido + ids ya liquidados
+            self.pending = PendingPicks(stats["pending_picks"])
+            self.settled = SettledIds(stats["processed_fixtures"])
+            stats["processed_fixtures"] = self.settled
+
     def load_stats(self) -> dict:
+        # La migración es una transacción: con varios workers solo uno la hace
+        try:
+            if self.store.migrate_from_json(self.stats_file, log=log):
+                log(f"load_stats: {self.stats_file} migrado a {STATS_DB}")
+        except (OSError, sqlite3.Error) as e:
+            log(f"load_stats: No se pudo migrar {self.stats_file} ({e})", "ERROR")
         try:
-            if os.path.exists(self.stats_file):
-                with open(self.stats_file, "r") as f:
-                    content = f.read().strip()
-                    if content:
-                        return json.loads(content)
+            return self.store.load()
         except Exception as e:
-            print(f"[{datetime.now()}] Warning: No se pudo cargar stats.json ({e})")
-        return {"ganadas": 0, "perdidas": 0, "ligas": {}, "processed_fixtures": [], "historial": [], "cached_picks": [], "team_histories": {}}
+            log(f"No se pudo cargar {STATS_DB} ({e})", "ERROR")
+        return empty_stats()
 
     def save_stats(self):
-        with open(self.stats_file, "w") as f:
-            json.dump(self.stats, f, indent=4)
+        """Guarda en SQLite solo las filas que cambiaron (una transacción)."""
+        with self._lock:
+            self.stats["team_histories"] = self.history_cache.to_dict()
+            written = self.store.save(self.stats)
+        log(f"save_stats: {written} filas actualizadas")
 
     # ── API: Partidos del día ──────────────────────────────
-    def fetch_matches_for_dates(self, date_from: str, date_to: str) -> list:
-        """Consulta /v4/matches para un rango de fechas."""
+    def fetch_matches_for_dates(self, date_from: str, date_to: str, comp_codes=None) -> list:
+        """Consulta /v4/matches para un rango de fechas (opcionalmente solo `comp_codes`)."""
         url = f"{BASE_URL}/matches?dateFrom={date_from}&dateTo={date_to}"
+        if comp_codes:
+            url += f"&competitions={','.join(sorted(comp_codes))}"
         log(f"API DEBUG: Llamando a {url}")
         try:
-            log("API DEBUG: Ejecutando requests.get (v10)...")
-            # Headers mínimos + sin proxies para evitar cuelgues en Render
-            h = {"X-Auth-Token": str(API_KEY)}
-            r = requests.get(url, headers=h, timeout=(5, 10), proxies={'http': None, 'https': None})
+            log("API DEBUG: Ejecutando GET con ApiClient (v11)...")
+            # La sesión compartida ignora proxies del entorno para evitar cuelgues en Render
+            r = self.api.get(url, "matches", timeout=(5, 10))
             log(f"API DEBUG: Respuesta recibida. Status {r.status_code}")
             if r.status_code == 200:
                 data = r.json()
@@ -245,68 +1097,143 @@ class FixItPRO:
                 log(f"API DEBUG: Recibidos {len(matches)} partidos")
                 return matches
             else:
-                log(f"API ERROR: {r.status_code} - {r.text[:100]}")
+                log(f"API ERROR: {r.status_code} - {r.text[:100]}", "ERROR")
         except Exception as e:
-            log(f"API EXCEPTION: {e}")
+            log(f"API EXCEPTION: {e}", "ERROR")
         return []
 
+    def _mark_teams_played(self, matches: list):
+        """Avisa a la cache de historiales de los partidos ya empezados o terminados."""
+        for m in matches:
+            if m.get("status") in ("SCHEDULED", "TIMED", "POSTPONED", "CANCELLED"):
+                continue
+            kickoff = _utc_timestamp(m.get("utcDate", ""))
+            for side in ("homeTeam", "awayTeam"):
+                team_id = m.get(side, {}).get("id")
+                if team_id is not None:
+                    self.history_cache.mark_played(team_id, kickoff)
+
+    # ── API: Historiales por competición (modo bulk) ───────
+    def refresh_history_index(self, today: datetime, comp_codes=None):
+        """
+        Una petición por competición a /competitions/{code}/matches con los partidos
+        FINISHED de la ventana pendiente, fusionados en self.history_index. Las
+        features se alimentan una vez al final con las filas de todas las
+        competiciones, en orden de kickoff.
+        """
+        fresh = []
+        for comp_code in (comp_codes or ENABLED_COMPETITIONS):
+            date_from, date_to = self.history_index.window_for(comp_code, today)
+            url = (f"{BASE_URL}/competitions/{comp_code}/matches"
+                   f"?status=FINISHED&dateFrom={date_from}&dateTo={date_to}")
+            try:
+                resp = self.api.get(url, "competition_matches", circuit_key=f"competition:{comp_code}", timeout=15)
+                if resp.status_code == 200:
+                    finished = resp.json().get("matches", [])
+                    self._mark_teams_played(finished)
+                    rows  = MatchRow.project(finished)
+                    added = self.history_index.merge(comp_code, rows, date_to)
+                    fresh.extend(rows)
+                    log(f"refresh_history_index: {comp_code} {date_from}→{date_to}, {added} partidos nuevos")
+                else:
+                    log(f"refresh_history_index: API Error {resp.status_code} en {comp_code} - {resp.text[:100]}",
+                        "WARNING")
+            except CircuitOpenError:
+                log(f"refresh_history_index: {comp_code} omitida (circuito abierto por errores de plan)", "WARNING")
+            except Exception as e:
+                log(f"refresh_history_index: Excepción en {comp_code}: {e}", "ERROR")
+        self.features.ingest(fresh)
+
+    def fit_league_models(self, comp_codes):
+        """Reajusta (arrancando del ajuste previo) las competiciones cuyos partidos cambiaron."""
+        now = time.time()
+        refit = [c for c in comp_codes
+                 if LEAGUE_MODELS.refit(c, self.history_index.competition_matches(c), now)]
+        if refit:
+            log(f"fit_league_models: Reajustadas {', '.join(refit)}")
+
     # ── API: Historial de un equipo ────────────────────────
-    def fetch_team_history(self, team_id: int, limit: int = 5) -> list:
-        """Obtiene últimos N resultados de un equipo (con cache en stats.json)."""
+    def fetch_team_history(self, team_id: int, limit: int = 5, as_of: datetime = None) -> list:
+        """
+        Obtiene últimos N resultados (MatchRow) de un equipo (índice bulk → cache con TTL → API).
+        `as_of` es la fecha del partido a analizar: si el equipo jugó después de la
+        descarga cacheada, el historial se considera caducado.
+        """
+        # 0. Índice por competición (modo bulk)
+        if HISTORY_MODE == "bulk":
+            indexed = self.history_index.recent(team_id, limit)
+            if len(indexed) >= limit:
+                return indexed
+
         # 1. Verificar Cache
-        cache_key = str(team_id)
-        if cache_key in self.stats.get("team_histories", {}):
-            cached_data = self.stats["team_histories"][cache_key]
-            # Validar que tenga suficientes partidos y sea reciente (opcional para simplicidad)
-            if len(cached_data) >= limit:
-                return cached_data[:limit]
-
-        # 2. Si no hay cache, consultar API
+        cached_data = self.history_cache.get(team_id, limit, as_of)
+        if cached_data is not None:
+            return cached_data
+
+        # 2. Si no hay cache válida, consultar API
         url = f"{BASE_URL}/teams/{team_id}/matches?status=FINISHED&limit={limit}"
         try:
-            print(f"[{datetime.now()}] API: Consultando historial equipo {team_id}...")
-            # Respetar rate limit (10 req/min -> 1 cada 6.1s)
-            time.sleep(6.1)
-            resp = self.session.get(url, timeout=15)
+            log(f"API: Consultando historial equipo {team_id}...", "DEBUG")
+            # Solo el líder (lease) llama al API: su ApiClient reparte la cuota entre sus hilos
+            resp = self.api.get(url, "team_matches", timeout=15)
             if resp.status_code == 200:
-                data = resp.json().get("matches", [])
-                # Guardar en cache persistentemente
-                with self._lock:
-                    if "team_histories" not in self.stats:
-                        self.stats["team_histories"] = {}
-                    self.stats["team_histories"][cache_key] = data
-                return data
+                rows = MatchRow.project(resp.json().get("matches", []))
+                self.history_cache.put(team_id, rows)
+                self.features.ingest(rows)
+                return rows
             else:
-                print(f"[{datetime.now()}] API Error {resp.status_code} en historial {team_id}")
+                log(f"API Error {resp.status_code} en historial {team_id}", "WARNING")
         except Exception as e:
-            print(f"[{datetime.now()}] Excepción fetch_team_history: {e}")
+            log(f"Excepción fetch_team_history: {e}", "ERROR")
         return []
 
     # ── Coordinador principal ──────────────────────────────
-    def fetch_data(self):
-        """Coordinador: partidos → historiales → Poisson → picks con valor."""
+    def _run_sync_job(self, job) -> str:
+        return self.fetch_data(job.comps, job)
+
+    def _progress(self, **fields):
+        """
+        Actualiza el progreso estructurado de la sync en curso (si la lanzó el
+        coordinador). Una nueva `phase` pasa también a ser la fase de los logs del hilo.
+        """
+        if "phase" in fields:
+            LOGGER.set_phase(fields["phase"])
+        if self._job is not None:
+            self._job.update(**fields)
+
+    def fetch_data(self, comps=None, job=None) -> str:
+        """
+        Coordinador: partidos → historiales → Poisson → picks con valor.
+        Con `comps` solo se refrescan esas competiciones y sus picks se fusionan
+        con los del resto. Retorna el resultado ("ok", "no_matches"...).
+        """
         log("fetch_data: Intentando entrar...")
         with self._lock:
             if self.is_fetching:
                 log("fetch_data: Ya hay un fetch en curso, abortando.")
-                return
+                return "busy"
             self.is_fetching = True
+            self._job = job
+            self._swap_snapshot()
         log("fetch_data: Lock adquirido y bandera is_fetching marcada.")
+        self.publish_snapshot()
+        result = "error"
 
         try:
             log("fetch_data: Iniciando try block...")
-            print(f"[{datetime.now()}] >>> INICIANDO FETCH_DATA v5 <<<", flush=True)
+            log(">>> INICIANDO FETCH_DATA v5 <<<")
             if not API_KEY:
                 with self._lock:
                     self.last_updated = "Error: Falta API_KEY"
-                return
+                result = "no_api_key"
+                return result
 
             log("fetch_data: Preparando fechas (v7)...")
             try:
                 from zoneinfo import ZoneInfo
                 tz_spain = ZoneInfo("Europe/Madrid")
             except Exception:
-                log("fetch_data: ZoneInfo no disponible o error, usando offset fijo UTC+1")
+                log("fetch_data: ZoneInfo no disponible o error, usando offset fijo UTC+1", "WARNING")
                 tz_spain = timezone(timedelta(hours=1))
 
             now_spain  = datetime.now(tz_spain)
@@ -316,68 +1243,121 @@ class FixItPRO:
 
             with self._lock:
                 self.last_updated = "Paso 1/3: Obteniendo partidos..."
+            self._progress(phase="matches", step=1, steps=4)
             log("fetch_data: Estado actualizado a Paso 1/3")
 
             # ── Fase 1: Partidos ──────────────────────────
-            all_matches = self.fetch_matches_for_dates(hoy_str, manana_str)
-            log(f"fetch_data: Recibidos {len(all_matches)} partidos")
-            print(f"[{datetime.now()}] Partidos recibidos del API: {len(all_matches)}")
             enabled_comp_codes = set(ENABLED_COMPETITIONS.keys())
+            if comps is not None:
+                enabled_comp_codes &= set(comps)
+            with metrics.SYNC_PHASE_SECONDS.time(phase="match_fetch"):
+                all_matches = self.fetch_matches_for_dates(hoy_str, manana_str,
+                                                           enabled_comp_codes if comps is not None else None)
+            self._mark_teams_played(all_matches)
+            log(f"fetch_data: Recibidos {len(all_matches)} partidos")
+            log(f"Partidos recibidos del API: {len(all_matches)}")
             filtered = [
                 m for m in all_matches
                 if m.get("competition", {}).get("code") in enabled_comp_codes
                 and m.get("status") in ("SCHEDULED", "TIMED")
             ]
             log(f"fetch_data: Filtrados {len(filtered)} partidos")
-            print(f"[{datetime.now()}] Partidos filtrados por liga/estado: {len(filtered)}")
+            log(f"Partidos filtrados por liga/estado: {len(filtered)}")
 
             with self._lock:
-                self.matches = filtered  # Solo los que analizamos para mayor agilidad
+                if comps is None:
+                    self.matches = filtered  # Solo los que analizamos para mayor agilidad
+                else:
+                    # Refresco parcial: se sustituyen solo los partidos de esas competiciones
+                    self.matches = [m for m in self.matches
+                                    if m.get("competition", {}).get("code") not in enabled_comp_codes] + filtered
                 self.last_updated = f"Paso 2/3: Analizando {len(filtered)} partidos..."
             log(f"fetch_data: matches actualizado, estado -> Paso 2/3")
 
-            if not filtered:
+            if not filtered and comps is None:
                 with self._lock:
                     self.last_updated = "Sin partidos PRO programados"
                 log("fetch_data: No hay partidos, terminando.")
-                return
+                result = "no_matches"
+                return result
+
+            # ── Fase 1b: Historiales en bloque por competición ──
+            self._progress(phase="history", step=2)
+            if HISTORY_MODE == "bulk" and filtered:
+                # Competiciones con partidos en la ventana (`comps` sigue indicando si la sync es completa)
+                history_comps = sorted({m.get("competition", {}).get("code") for m in filtered})
+                with metrics.SYNC_PHASE_SECONDS.time(phase="history_bulk"):
+                    self.refresh_history_index(now_spain, history_comps)
+                log(f"fetch_data: Índice de historiales con {len(self.history_index)} equipos")
+                with metrics.SYNC_PHASE_SECONDS.time(phase="fit"):
+                    self.fit_league_models(history_comps)
 
             # ── Fase 2: Análisis Poisson ──────────────────
             log("fetch_data: Iniciando análisis Poisson...")
-            self.cached_picks = [] # Limpìar para nueva carga progresiva
-            picks = self._build_poisson_picks(filtered, now_spain)
-            
+            self._progress(phase="model", step=3)
+            with self._lock:
+                if comps is None:
+                    kept = []
+                else:
+                    refreshed = {ENABLED_COMPETITIONS[c] for c in enabled_comp_codes}
+                    kept = [p for p in self.cached_picks if p.get("league") not in refreshed]
+                self.cached_picks = list(kept) # Limpiar para nueva carga progresiva
+                self._swap_snapshot(picks=True)
+            picks = self._build_poisson_picks(filtered, now_spain, enabled_comp_codes if comps is not None else None)
+            if kept:
+                picks = sorted(kept + picks, key=lambda x: x.get("value", 0), reverse=True)
+
             # ── Fase 3: Resultados ayer ───────────────────
+            self._progress(phase="persist", step=4, picks=len(picks))
             with self._lock:
                 self.cached_picks = picks
                 self.stats["cached_picks"] = picks
+                self._register_pending(picks)
+                self._swap_snapshot(picks=True)
                 self.last_updated = now_spain.strftime("%H:%M")
+            self.ledger.append_picks(picks)
             log(f"fetch_data: Paso 3/3 terminado, {len(picks)} picks.")
 
-            self.update_stats_from_results()
-            self.save_stats()
+            with metrics.SYNC_PHASE_SECONDS.time(phase="settlement"):
+                self.settle_pending()
+            with metrics.SYNC_PHASE_SECONDS.time(phase="persist"):
+                self.save_stats()
+            result = "ok"
             log("fetch_data: Stats guardadas, fetch completo.")
-            print(f"[{datetime.now()}] >>> FETCH OK: {len(picks)} value-picks <<<")
+            log(f">>> FETCH OK: {len(picks)} value-picks <<<")
 
         except Exception as e:
-            log(f"fetch_data: CRITICAL ERROR: {e}")
+            log(f"fetch_data: CRITICAL ERROR: {e}", "ERROR")
             with self._lock:
                 self.last_updated = f"Error Motor: {str(e)[:20]}"
         finally:
             with self._lock:
                 self.is_fetching = False
+                self._swap_snapshot()
+            self.publish_snapshot()
+            metrics.SYNC_TOTAL.inc(result=result)
             log("fetch_data: Salida (is_fetching = False)")
+            LOGGER.set_phase(None)
+            with self._lock:
+                self._job = None
+        return result
 
     # ── Motor Poisson + Value Betting ──────────────────────
-    def _build_poisson_picks(self, matches: list, now_spain: datetime) -> list:
+    def _build_poisson_picks(self, matches: list, now_spain: datetime, comp_codes=None) -> list:
         """
-        Para cada partido:
-          1. Obtiene historial de ambos equipos (últimos 10)
-          2. Calcula λ con modelo de fuerza relativa
-          3. Aplica ajuste de fatiga
-          4. Calcula probabilidades 1X2 con Poisson
-          5. Filtra por valor: (prob × cuota) - 1 > 0.10
+        1. Selecciona los partidos de hoy/mañana y extrae cuotas; las que
+           football-data.org no da se cruzan desde The Odds API.
+        2. Precarga en paralelo el historial de cada equipo único (últimos 5),
+           compartiendo el rate limiter del proceso entre los hilos de precarga.
+        3. En cuanto un partido tiene ambos historiales:
+           calcula λ desde las features de cada equipo (fuerza relativa + fatiga),
+           obtiene la matriz de marcadores y deriva los mercados de MARKET_META filtrando por valor:
+           (prob × cuota) - 1 > 0.10, o por umbral de confianza sin cuota.
+        Con `comp_codes` (refresco parcial) solo se olvidan los partidos guardados
+        de esas competiciones.
         """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
         picks_found = []
         today      = now_spain
         tomorrow   = (now_spain + timedelta(days=1))
@@ -389,12 +1369,11 @@ class FixItPRO:
         import pytz
         tz_spain = pytz.timezone("Europe/Madrid")
 
+        # ── Fase A: datos de cada partido (sin llamadas al API) ──
+        fixtures = []
         for m in matches:
+            fixture_id = m.get("id")
             try:
-                # ── Datos del partido ──
-                fixture_id  = m.get("id")
-                home_id     = m.get("homeTeam", {}).get("id")
-                away_id     = m.get("awayTeam", {}).get("id")
                 home_name   = m.get("homeTeam", {}).get("shortName") or m.get("homeTeam", {}).get("name", "?")
                 away_name   = m.get("awayTeam", {}).get("shortName") or m.get("awayTeam", {}).get("name", "?")
                 comp_code   = m.get("competition", {}).get("code", "")
@@ -404,130 +1383,414 @@ class FixItPRO:
                 # ── Fecha / hora en España ──
                 utc_dt   = datetime.fromisoformat(utc_date_str.replace("Z", "+00:00"))
                 spain_dt = utc_dt.astimezone(tz_spain)
-                match_date_str = spain_dt.strftime("%Y-%m-%d")
-                time_str = spain_dt.strftime("%H:%M")
-
-                if match_date_str not in valid_dates:
+                if spain_dt.strftime("%Y-%m-%d") not in valid_dates:
                     continue
 
                 # ── Odds del partido (opcionales: plan gratuito no las incluye) ──
                 odds_block = m.get("odds", {})
                 # La API gratuita devuelve {"message": "...premium..."} en lugar de cuotas reales
                 if isinstance(odds_block, dict) and "message" in odds_block:
-                    odd_home = odd_draw = odd_away = None
+                    odds = (None, None, None)
                 else:
-                    odd_home = odds_block.get("homeWin")
-                    odd_draw = odds_block.get("draw")
-                    odd_away = odds_block.get("awayWin")
+                    odds = (odds_block.get("homeWin"), odds_block.get("draw"), odds_block.get("awayWin"))
+
+                fixtures.append({
+                    "id":       fixture_id,
+                    "comp":     comp_code,
+                    "home_id":  m.get("homeTeam", {}).get("id"),
+                    "away_id":  m.get("awayTeam", {}).get("id"),
+                    "teams":    f"{home_name} vs {away_name}",
+                    "league":   league_name,
+                    "spain_dt": spain_dt,
+                    "kickoff":  utc_dt.timestamp(),
+                    "home_names": (m.get("homeTeam", {}).get("name"), m.get("homeTeam", {}).get("shortName")),
+                    "away_names": (m.get("awayTeam", {}).get("name"), m.get("awayTeam", {}).get("shortName")),
+                    "odds":     odds,
+                })
+            except Exception as e:
+                import traceback
+                log(f"Error procesando partido {fixture_id}: {e}\n{traceback.format_exc()}", "ERROR",
+                    fixture_id=fixture_id)
 
-                has_odds = any(isinstance(o, (int, float)) for o in [odd_home, odd_draw, odd_away])
+        # ── Cuotas externas: una petición por competición, cruce por índice de nombres ──
+        if self.odds is not None and fixtures:
+            with metrics.SYNC_PHASE_SECONDS.time(phase="odds"):
+                matched = self.odds.attach(fixtures)
+            log(f"_build_poisson_picks: Cuotas cruzadas para {matched}/{len(fixtures)} partidos")
 
-                # ── Historial de equipos ──
-                with self._lock:
-                    self.last_updated = f"Analizando: {home_name[:12]} vs {away_name[:12]}"
-
-                home_hist = self.fetch_team_history(home_id, limit=5)
-                away_hist = self.fetch_team_history(away_id, limit=5)
-
-                # ── Lambdas Poisson ──
-                lam_home, lam_away = compute_lambdas(home_hist, away_hist)
-
-                # ── Ajuste de fatiga ──
-                last_home = last_match_date(home_hist)
-                last_away = last_match_date(away_hist)
-                lam_home = apply_fatigue(lam_home, last_home, today)
-                lam_away = apply_fatigue(lam_away, last_away, today)
-
-                # ── Probabilidades 1X2 ──
-                prob_h, prob_d, prob_a = calculate_1x2_poisson(lam_home, lam_away)
-
-                # ── Value Betting por mercado ──
-                markets_data = [
-                    ("home_win", prob_h, odd_home),
-                    ("draw",     prob_d, odd_draw),
-                    ("away_win", prob_a, odd_away),
-                ]
-
-                for market_key, prob, odd in markets_data:
-                    market_name, icon, color = MARKET_META[market_key]
-
-                    if has_odds and isinstance(odd, (int, float)) and odd > 1.0:
-                        # ── Modo VALUE BETTING: cuota disponible ──
-                        value = (prob * float(odd)) - 1.0
-                        if value <= 0.10:
-                            continue
-                        desc = f"λ Local={lam_home:.2f} | λ Visit={lam_away:.2f} | Valor={value:.3f}"
-                        odds_val = float(odd)
-                    else:
-                        # ── Modo POISSON PURO: sin cuota (plan gratuito) ──
-                        # Bajamos umbral a 35% para que la app siempre tenga picks relevantes
-                        if prob <= 0.35:
-                            continue
-                        value = prob - 0.35
-                        desc  = f"λ Local={lam_home:.2f} | λ Visit={lam_away:.2f} | Confianza Poisson={int(prob*100)}%"
-                        odds_val = "PRO"
-
-                    p = {
-                        "id":          fixture_id,
-                        "teams":       f"{home_name} vs {away_name}",
-                        "league":      league_name,
-                        "market":      market_name,
-                        "description": desc,
-                        "prob":        int(prob * 100),
-                        "odds":        odds_val,
-                        "value":       value,
-                        "date":        spain_dt.strftime("%d-%m-%Y"),
-                        "time":        time_str,
-                        "icon":        icon,
-                        "color":       color
-                    }
-                    picks_found.append(p)
-                    # Actualización progresiva para que el usuario vea picks mientras se calculan
+        # Olvidar los partidos guardados que ya no están en la ventana
+        in_window = {str(fx["id"]) for fx in fixtures}
+        with self._lock:
+            saved = self.stats.setdefault("fixture_picks", {})
+            for fixture_id in [k for k, v in saved.items() if k not in in_window
+                               and (comp_codes is None or v.get("comp") in comp_codes)]:
+                del saved[fixture_id]
+        self._progress(fixtures_total=len(fixtures))
+
+        if not fixtures:
+            log("Análisis terminado. 0 picks generados.")
+            return picks_found
+
+        # ── Fase B: precarga deduplicada de historiales ──
+        waiting = {}   # team_id -> índices de partidos que lo esperan
+        as_of   = {}   # team_id -> kickoff más temprano (frescura de la cache)
+        for idx, fx in enumerate(fixtures):
+            for team_id in (fx["home_id"], fx["away_id"]):
+                waiting.setdefault(team_id, []).append(idx)
+                as_of[team_id] = min(as_of.get(team_id, fx["spain_dt"]), fx["spain_dt"])
+        missing = [len({fx["home_id"], fx["away_id"]}) for fx in fixtures]
+        log(f"_build_poisson_picks: {len(fixtures)} partidos, {len(waiting)} equipos únicos")
+
+        started    = time.perf_counter()
+        model_time = 0.0
+        with ThreadPoolExecutor(max_workers=HISTORY_WORKERS, thread_name_prefix="history") as pool:
+            pending = {pool.submit(self.fetch_team_history, team_id, 5, as_of[team_id]): team_id for team_id in waiting}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                ready = []
+                for fut in done:
+                    team_id = pending.pop(fut)
+                    try:
+                        fut.result()   # el historial ya quedó ingerido en self.features
+                    except Exception as e:
+                        log(f"Excepción historial {team_id}: {e}", "ERROR")
+                    for idx in waiting[team_id]:
+                        missing[idx] -= 1
+                        if missing[idx] == 0:
+                            ready.append(fixtures[idx])
+
+                # ── Fase C: modelo para los partidos que ya tienen ambos historiales ──
+                if ready:
                     with self._lock:
-                        self.cached_picks.append(p)
-                    print(f"[{datetime.now()}] Pick Generado: {home_name} vs {away_name} -> {market_name} ({int(prob*100)}%)")
+                        self.last_updated = f"Analizando: {ready[-1]['teams'][:26]}"
+                    model_start = time.perf_counter()
+                    picks_found.extend(self._score_fixtures(ready, today))
+                    model_time += time.perf_counter() - model_start
 
-            except Exception as e:
-                import traceback
-                print(f"[{datetime.now()}] Error procesando partido {fixture_id}: {e}\n{traceback.format_exc()}")
-                continue
+        # Historiales y modelo se solapan: "history" es el tiempo de pared sin el modelo
+        metrics.SYNC_PHASE_SECONDS.observe(model_time, phase="model")
+        metrics.SYNC_PHASE_SECONDS.observe(time.perf_counter() - started - model_time, phase="history")
 
         # Ordenar por valor descendente (los mejores primero)
         picks_found.sort(key=lambda x: x.get("value", 0), reverse=True)
-        print(f"[{datetime.now()}] Análisis terminado. {len(picks_found)} picks generados.")
+        log(f"Análisis terminado. {len(picks_found)} picks generados.")
+        return picks_found
+
+    def _score_fixtures(self, fixtures: list, today: datetime) -> list:
+        """
+        Reutiliza los picks guardados de los partidos cuya huella de entradas no
+        cambió y solo recalcula (λ + mercados) los demás.
+        """
+        picks_found = []
+        changed     = []
+        with self._lock:
+            saved = self.stats.setdefault("fixture_picks", {})
+            for fx in fixtures:
+                fx["fingerprint"] = fixture_fingerprint(
+                    fx, self.features.get(fx["home_id"]), self.features.get(fx["away_id"]), today)
+                entry = saved.get(str(fx["id"]))
+                if entry and entry.get("fp") == fx["fingerprint"]:
+                    picks_found.extend(entry["picks"])
+                else:
+                    changed.append(fx)
+        metrics.FIXTURES_SCORED.inc(len(fixtures) - len(changed), mode="reused")
+        metrics.FIXTURES_SCORED.inc(len(changed), mode="computed")
+
+        if changed:
+            fresh = self._evaluate_fixtures(changed, today)
+            by_fixture = {str(fx["id"]): [] for fx in changed}
+            for p in fresh:
+                by_fixture[str(p["id"])].append(p)
+            with self._lock:
+                for fx in changed:
+                    saved[str(fx["id"])] = {"fp": fx["fingerprint"], "comp": fx["comp"],
+                                            "picks": by_fixture[str(fx["id"])]}
+            picks_found.extend(fresh)
+
+        # Actualización progresiva para que el usuario vea picks mientras se calculan
+        with self._lock:
+            self.cached_picks.extend(picks_found)
+            self._swap_snapshot(picks=True)
+            if self._job is not None:
+                self._job.advance(fixtures=len(fixtures), picks=len(picks_found))
+        return picks_found
+
+    def _evaluate_fixtures(self, fixtures: list, today: datetime) -> list:
+        """λ + fatiga + matriz de marcadores + value betting para un lote de partidos."""
+        picks_found = []
+        for fx in fixtures:
+            home_f = self.features.get(fx["home_id"])
+            away_f = self.features.get(fx["away_id"])
+
+            # ── Lambdas Poisson ──
+            lam_home, lam_away = compute_lambdas(home_f, away_f, comp=fx["comp"],
+                                                 home_id=fx["home_id"], away_id=fx["away_id"])
+
+            # ── Ajuste de fatiga ──
+            fx["lam_home"] = apply_fatigue(lam_home, home_f.rest_days(today) if home_f else None)
+            fx["lam_away"] = apply_fatigue(lam_away, away_f.rest_days(today) if away_f else None)
+
+        # ── Matrices de marcadores del lote (LRU + batch) ──
+        matrices = SCORELINE_CACHE.get_many(
+            [f["lam_home"] for f in fixtures],
+            [f["lam_away"] for f in fixtures],
+        )
+
+        # ── 1X2 del kernel Skellam (si está elegido): sustituye a las
+        # reducciones 1X2 de cada matriz en markets() ──
+        outcomes = [None] * len(fixtures)
+        if ONE_X_TWO_KERNEL == "skellam":
+            outcomes = [tuple(row) for row in outcome_1x2_batch(
+                [f["lam_home"] for f in fixtures], [f["lam_away"] for f in fixtures]).tolist()]
+
+        # ── Value Betting por mercado ──
+        for fx, matrix, outcome in zip(fixtures, matrices, outcomes):
+            lam_home, lam_away = fx["lam_home"], fx["lam_away"]
+            odd_home, odd_draw, odd_away = fx["odds"]
+            has_odds = any(isinstance(o, (int, float)) for o in fx["odds"])
+            market_odds = {"home_win": odd_home, "draw": odd_draw, "away_win": odd_away}
+
+            markets_data = [(k, prob, market_odds.get(k), None) for k, prob in matrix.markets(outcome).items()]
+            for (hg, ag), prob in matrix.correct_scores():
+                markets_data.append(("correct_score", prob, None, f"{hg}-{ag}"))
+
+            for market_key, prob, odd, selection in markets_data:
+
+                if has_odds and isinstance(odd, (int, float)) and odd > 1.0:
+                    # ── Modo VALUE BETTING: cuota disponible ──
+                    value = (prob * float(odd)) - 1.0
+                    if value <= VALUE_EDGE_THRESHOLD:
+                        continue
+                    odds_val = float(odd)
+                else:
+                    # ── Modo POISSON PURO: sin cuota (plan gratuito) ──
+                    # 1X2 con umbral 35% para que la app siempre tenga picks relevantes;
+                    # el resto de mercados usa su propio umbral
+                    threshold = PURE_POISSON_THRESHOLDS.get(market_key, 0.35)
+                    if prob <= threshold:
+                        continue
+                    value = prob - threshold
+                    odds_val = "PRO"
+
+                # Etiqueta, icono, color y descripción se derivan de MARKET_META al leer el pick
+                p = Pick(fx["id"], fx["teams"], fx["league"], market_key, round(prob, 4), odds_val, value,
+                         round(lam_home, 3), round(lam_away, 3),
+                         fx["spain_dt"].strftime("%d-%m-%Y"), fx["spain_dt"].strftime("%H:%M"),
+                         selection=selection, prob=int(prob * 100))
+                picks_found.append(p)
+                metrics.PICKS_TOTAL.inc(league=fx["league"], market=market_key)
+                log(f"Pick Generado: {fx['teams']} -> {p.market} ({p.prob}%)", "DEBUG", fixture_id=fx["id"])
+
         return picks_found
 
     # ── Scheduler ─────────────────────────────────────────
     def start_scheduler(self):
-        """Hilo en segundo plano: actualiza a las 02:00 y 12:00 (hora local)."""
-        def run_loop():
-            print("Scheduler PRO v2: Iniciado")
-            while True:
-                now = datetime.now()
-                if (now.hour == 2 and now.minute == 0) or (now.hour == 12 and now.minute == 0):
-                    self.fetch_data()
-                    time.sleep(61)
-                time.sleep(30)
-
-        thread = threading.Thread(target=run_loop, daemon=True)
-        thread.start()
-
-    # ── Stats: actualizar desde resultados ────────────────
-    def update_stats_from_results(self):
-        """Analiza partidos FINISHED para actualizar W/L y el historial."""
-        cambios = False
+        """
+        Arranca el scheduler: sincronización completa según SYNC_CRON en hora de
+        SCHEDULER_TZ (con jitter y recuperación si el proceso estaba caído a esa hora).
+        """
+        try:
+            from zoneinfo import ZoneInfo
+            tz = ZoneInfo(SCHEDULER_TZ)
+        except Exception:
+            log(f"start_scheduler: Zona {SCHEDULER_TZ} no disponible, usando offset fijo UTC+1", "WARNING")
+            tz = timezone(timedelta(hours=1))
+        self.scheduler.add_cron("sync", SYNC_CRON, tz, self._scheduled_sync, jitter=SYNC_CRON_JITTER)
+        self.scheduler.start()
+        log(f"start_scheduler: Cron '{SYNC_CRON}' ({SCHEDULER_TZ}), "
+            f"{len(self.scheduler.pending())} trabajos programados")
+
+    def _scheduled_sync(self) -> str:
+        # No bloquea: si hay una sync en curso se une a ella o queda pendiente
+        _, coalesced = self.sync.submit()
+        return "coalesced" if coalesced else "ok"
+
+    def _on_sync_finished(self, job):
+        self.publish_snapshot()
+        if self.role == "leader":
+            self.schedule_fixture_jobs()
+            if job.result == "ok":
+                for comp_code in (c for c in SIM_COMPETITIONS if job.comps is None or c in job.comps):
+                    self.projection_queue.submit(f"projections:{comp_code}",
+                                                 lambda comp=comp_code: self.refresh_projection(comp))
+
+    def schedule_fixture_jobs(self):
+        """
+        Por cada partido programado: un refresco de su competición (cuotas +
+        re-evaluación) PREKICKOFF_MINUTES antes del inicio y una liquidación
+        SETTLE_AFTER_MINUTES después. Si el kickoff cambia, se reprograman.
+        """
+        now = time.time()
         with self._lock:
-            if "processed_fixtures" not in self.stats:
-                self.stats["processed_fixtures"] = []
-            if "historial" not in self.stats:
-                self.stats["historial"] = []
+            matches = list(self.matches)
+        for m in matches:
+            fixture_id = m.get("id")
+            comp_code  = m.get("competition", {}).get("code")
+            kickoff    = _utc_timestamp(m.get("utcDate", ""))
+            if fixture_id is None or not kickoff:
+                continue
+            prekickoff = kickoff - PREKICKOFF_MINUTES * 60
+            if prekickoff > now:
+                self.scheduler.add_at(f"prekickoff:{fixture_id}", prekickoff,
+                                      lambda comp=comp_code: self._prekickoff_refresh(comp), kind="prekickoff")
+            self.scheduler.add_at(f"settle:{fixture_id}", kickoff + SETTLE_AFTER_MINUTES * 60,
+                                  lambda fid=fixture_id: self._queue_settlement(fid), kind="settle")
+
+    # ── Proyecciones de temporada ─────────────────────────
+    def fetch_season_matches(self, comp_code: str) -> list:
+        """Todos los partidos de la temporada en curso de `comp_code` (una petición)."""
+        url = f"{BASE_URL}/competitions/{comp_code}/matches"
+        try:
+            resp = self.api.get(url, "competition_matches", circuit_key=f"competition:{comp_code}", timeout=15)
+            if resp.status_code == 200:
+                return resp.json().get("matches", [])
+            log(f"fetch_season_matches: API Error {resp.status_code} en {comp_code} - {resp.text[:100]}",
+                "WARNING", phase="projections")
+        except CircuitOpenError:
+            log(f"fetch_season_matches: {comp_code} omitida (circuito abierto por errores de plan)",
+                "WARNING", phase="projections")
+        except Exception as e:
+            log(f"fetch_season_matches: Excepción en {comp_code}: {e}", "ERROR", phase="projections")
+        return []
 
-            processed_ids = set(self.stats["processed_fixtures"])
+    def refresh_projection(self, comp_code: str) -> str:
+        """
+        Simula SIM_SEASONS veces el resto de temporada de `comp_code` con las λ
+        de compute_lambdas. Corre en projection_queue, nunca en el scheduler.
+        Sin resultados nuevos (misma huella del ajuste de liga, que cambia con
+        cada partido terminado y una vez al día) no se consulta el API; si la
+        clasificación, el calendario y las λ no han cambiado, se conserva la
+        simulación guardada.
+        """
+        if comp_code not in LEAGUE_COMPETITIONS:
+            return "not_league"
+        inputs_key = "|".join((LEAGUE_MODELS.fit_id(comp_code) or datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+                               MODEL_VERSION, str(SIM_SEASONS)))
+        previous   = self.get_projection(comp_code)
+        if previous is not None and previous.get("inputs_key") == inputs_key:
+            return "unchanged"
+        matches = self.fetch_season_matches(comp_code)
+        inputs  = build_inputs(comp_code, matches, lambda home_id, away_id: compute_lambdas(
+            self.features.get(home_id), self.features.get(away_id),
+            comp=comp_code, home_id=home_id, away_id=away_id))
+        if inputs is None:
+            return "no_matches"
+        signature = inputs.signature(SIM_SEASONS, MODEL_VERSION)
+        if previous is not None and previous.get("signature") == signature:
+            previous["inputs_key"] = inputs_key
+            self.store.set_meta(f"projections:{comp_code}", json.dumps(previous))
+            return "cached"
+        started = time.perf_counter()
+        with metrics.SYNC_PHASE_SECONDS.time(phase="projections"):
+            result = simulate(inputs, SIM_SEASONS, SIM_WORKERS)
+        result.update(league=ENABLED_COMPETITIONS[comp_code], signature=signature, inputs_key=inputs_key,
+                      simulated_at=time.time())
+        self.store.set_meta(f"projections:{comp_code}", json.dumps(result))
+        log(f"refresh_projection: {comp_code} {SIM_SEASONS} temporadas, {result['remaining_matches']} partidos "
+            f"pendientes en {time.perf_counter() - started:.1f}s", phase="projections")
+        return "ok"
+
+    def get_projection(self, comp_code: str):
+        """Última proyección guardada de `comp_code` (compartida entre workers vía SQLite) o None."""
+        raw = self.store.get_meta(f"projections:{comp_code}")
+        return json.loads(raw) if raw else None
+
+    def _prekickoff_refresh(self, comp_code: str) -> str:
+        _, coalesced = self.sync.submit([comp_code] if comp_code in ENABLED_COMPETITIONS else None)
+        return "coalesced" if coalesced else "ok"
+
+    def _queue_settlement(self, fixture_id: int, attempt: int = 1) -> str:
+        """Trabajo del scheduler: solo encola settle_fixture en settle_queue y vuelve."""
+        queued = self.settle_queue.submit(f"settle:{fixture_id}",
+                                          lambda: self.settle_fixture(fixture_id, attempt))
+        return "queued" if queued else "coalesced"
+
+    def settle_fixture(self, fixture_id: int, attempt: int = 1) -> str:
+        """
+        Tras el final de un partido (en settle_queue): liquida en bloque todo lo
+        pendiente que ya debería haber terminado. Si este partido sigue sin
+        resultado se reintenta cada SETTLE_RETRY_MINUTES hasta SETTLE_MAX_ATTEMPTS.
+        """
+        self.settle_pending()
+        if fixture_id not in self.pending:
+            return "settled"
+        if attempt >= SETTLE_MAX_ATTEMPTS:
+            log(f"settle_fixture: Partido {fixture_id} sin resultado tras {attempt} intentos", "WARNING",
+                fixture_id=fixture_id, phase="settlement")
+            return "gave_up"
+        self.scheduler.add_at(f"settle:{fixture_id}", time.time() + SETTLE_RETRY_MINUTES * 60,
+                              lambda: self._queue_settlement(fixture_id, attempt + 1), kind="settle")
+        return "retry"
+
+    # ── Liquidación de picks ──────────────────────────────
+    def _register_pending(self, picks: list):
+        """Indexa por partido los picks publicados de los partidos aún sin empezar (con self._lock)."""
+        by_fixture = {}
+        for p in picks:
+            by_fixture.setdefault(p.get("id"), []).append(p)
+        for m in self.matches:
+            fixture_id = m.get("id")
+            if fixture_id is None or fixture_id in self.settled:
+                continue
+            self.pending.register(fixture_id, m.get("utcDate", ""), m.get("competition", {}).get("code"),
+                                  by_fixture.get(fixture_id, []))
+
+    def fetch_results(self, fixture_ids: list) -> list:
+        """Partidos de `fixture_ids` en bloque: /matches?ids=... en lotes de SETTLE_BATCH_SIZE."""
+        results = []
+        for start in range(0, len(fixture_ids), SETTLE_BATCH_SIZE):
+            batch = fixture_ids[start:start + SETTLE_BATCH_SIZE]
+            url   = f"{BASE_URL}/matches?ids={','.join(str(i) for i in batch)}"
+            try:
+                resp = self.api.get(url, "matches_by_id", timeout=(5, 10))
+                if resp.status_code == 200:
+                    results.extend(resp.json().get("matches", []))
+                else:
+                    log(f"fetch_results: API Error {resp.status_code} - {resp.text[:100]}",
+                        "WARNING", phase="settlement")
+            except Exception as e:
+                log(f"fetch_results: Excepción {e}", "ERROR", phase="settlement")
+        return results
 
-            for m in self.matches:
-                f_id   = m.get("id")
-                status = m.get("status", "")
-                if status != "FINISHED" or f_id in processed_ids:
+    def settle_pending(self) -> int:
+        """
+        Liquida los picks pendientes cuyos partidos ya deberían haber terminado.
+        Solo se consulta el API por esos ids. Retorna los partidos liquidados.
+        """
+        now = time.time()
+        with self._lock:
+            due = self.pending.due(now, SETTLE_AFTER_MINUTES * 60)
+        if not due:
+            return 0
+        results = self.fetch_results(due)
+        settled = self.update_stats_from_results(results)
+
+        # Partidos anulados o que nunca devolvieron resultado: se dejan de esperar
+        void = {m.get("id") for m in results if m.get("status") in ("POSTPONED", "CANCELLED", "SUSPENDED")}
+        with self._lock:
+            for fixture_id in due:
+                expired = now - self.pending.kickoff(fixture_id) > SETTLE_EXPIRE_DAYS * 86400
+                if fixture_id in self.pending and (fixture_id in void or expired):
+                    self.pending.pop(fixture_id)
+                    log(f"settle_pending: Partido {fixture_id} sin resultado válido, picks anulados", "WARNING",
+                        fixture_id=fixture_id, phase="settlement")
+        log(f"settle_pending: {len(due)} partidos consultados, {settled} liquidados, "
+            f"{len(self.pending)} pendientes", phase="settlement")
+        return settled
+
+    def update_stats_from_results(self, matches: list) -> int:
+        """
+        Gradúa contra su mercado cada pick pendiente de los partidos FINISHED
+        recibidos, registra los resultados en el ledger (que mantiene ganadas,
+        perdidas y aciertos por liga) y actualiza el historial.
+        Retorna cuántos partidos se liquidaron.
+        """
+        settled = 0
+        graded  = []
+        with self._lock:
+            for m in matches:
+                f_id = m.get("id")
+                if m.get("status") != "FINISHED" or f_id is None or f_id in self.settled:
                     continue
 
                 home_goals = m.get("score", {}).get("fullTime", {}).get("home")
@@ -535,44 +1798,38 @@ class FixItPRO:
                 if home_goals is None or away_goals is None:
                     continue
 
-                comp_code   = m.get("competition", {}).get("code", "")
-                league_name = ENABLED_COMPETITIONS.get(comp_code, comp_code)
-                home_name   = m.get("homeTeam", {}).get("name", "?")
-                away_name   = m.get("awayTeam", {}).get("name", "?")
-                teams_str   = f"{home_name} vs {away_name}"
-                date_str    = m.get("utcDate", "")[:10]
-
-                if home_goals > away_goals:
-                    self.stats["ganadas"] = self.stats.get("ganadas", 0) + 1
-                    ligas = self.stats.get("ligas", {})
-                    ligas[league_name] = ligas.get(league_name, 0) + 1
-                    self.stats["ligas"] = ligas
-                    self.stats["historial"].insert(0, {
-                        "fecha":     date_str,
-                        "equipos":   teams_str,
-                        "liga":      league_name,
-                        "resultado": f"{home_goals}-{away_goals}",
-                        "timestamp": time.time(),
-                    })
-                    self.stats["historial"] = self.stats["historial"][:50]
-                else:
-                    self.stats["perdidas"] = self.stats.get("perdidas", 0) + 1
-
-                self.stats["processed_fixtures"].append(f_id)
-                processed_ids.add(f_id)
-                if len(self.stats["processed_fixtures"]) > 500:
-                    self.stats["processed_fixtures"] = self.stats["processed_fixtures"][-500:]
-                cambios = True
-
-        if cambios:
+                date_str = m.get("utcDate", "")[:10]
+                score = f"{home_goals}-{away_goals}"
+                for pick in self.pending.pop(f_id):
+                    outcome = grade_pick(pick, home_goals, away_goals)
+                    graded.append((pick, outcome, score))
+                    if outcome == "won":
+                        self.stats["historial"].insert(0, {
+                            "fecha":     date_str,
+                            "equipos":   pick.get("teams", "?"),
+                            "liga":      pick.get("league", "Otros"),
+                            "mercado":   pick.get("market", ""),
+                            "resultado": score,
+                            "timestamp": time.time(),
+                        })
+                self.stats["historial"] = self.stats["historial"][:50]
+
+                self.settled.add(f_id)
+                settled += 1
+
+            if settled:
+                self.ledger.record_outcomes(graded)
+                self.stats.update(self.ledger.stats_view())
+                self._swap_snapshot(stats=True)
+
+        if settled:
             self.save_stats()
+        return settled
 
     # ── Helpers de consulta ───────────────────────────────
     def get_top_leagues(self) -> list:
         """Retorna las 3 mejores ligas por aciertos."""
-        with self._lock:
-            sorted_ligas = sorted(self.stats.get("ligas", {}).items(), key=lambda x: x[1], reverse=True)
-            return sorted_ligas[:3]
+        return list(self.snapshot.top_leagues)
 
 
 # ─────────────────────────────────────────────────────────
@@ -582,65 +1839,69 @@ class FixItPRO:
 engine = FixItPRO()
 
 
+def _collect_cache_metrics():
+    counters = engine.history_cache.counters()
+    for result in ("hits", "misses", "stale"):
+        metrics.HISTORY_CACHE_EVENTS.set(counters[result], result=result)
+    metrics.HISTORY_CACHE_HIT_RATIO.set(counters["hit_ratio"])
+    lookups = SCORELINE_CACHE.hits + SCORELINE_CACHE.misses
+    metrics.SCORELINE_CACHE_HIT_RATIO.set(round(SCORELINE_CACHE.hits / lookups, 3) if lookups else 0.0)
+
+
+metrics.REGISTRY.add_collector(_collect_cache_metrics)
+
+
 def init_engine():
-    """Inicialización única por worker de Gunicorn."""
-    print(f"[{datetime.now()}] Intento init_engine...", flush=True)
+    """
+    Inicialización única por worker de Gunicorn. Solo el worker que obtiene el
+    lease consulta el API; el resto sirve el snapshot compartido.
+    """
+    log("Intento init_engine...")
     with engine._lock:
         if getattr(engine, "_thread_started", False):
-            print(f"[{datetime.now()}] init_engine: Ya iniciado en este proceso.", flush=True)
+            log("init_engine: Ya iniciado en este proceso.")
             return
         engine._thread_started = True
 
-        if not engine.matches and "Sincronizando" in engine.last_updated:
-            print(f"[{datetime.now()}] >>> LANZANDO MOTOR DE FONDO <<<", flush=True)
-            t = threading.Thread(target=engine.fetch_data, daemon=True)
-            t.start()
-            engine.start_scheduler()
-            print(f"[{datetime.now()}] init_engine: Hilo secundario lanzado.", flush=True)
+        if engine.lease.try_acquire():
+            log(">>> LANZANDO MOTOR DE FONDO (líder) <<<")
+            engine.become_leader()
+            log("init_engine: Hilo secundario lanzado.")
+        else:
+            log("init_engine: Modo follower, sirviendo snapshot compartido.")
+            engine.role = "follower"
+            engine.refresh_from_snapshot()
+            engine.watch_lease()
 
 
 # ─────────────────────────────────────────────────────────
 #  API PÚBLICA (usada por app.py sin cambios)
 # ─────────────────────────────────────────────────────────
 
-def get_stats() -> dict:
-    return engine.stats
+def get_snapshot() -> EngineSnapshot:
+    """Snapshot inmutable actual. Leerlo una vez por petición garantiza coherencia."""
+    return engine.snapshot
 
 
-def get_top_leagues_rank() -> list:
-    return engine.get_top_leagues()
+def get_stats() -> Mapping:
+    return engine.snapshot.stats
 
 
-def get_all_money_machine_picks() -> list:
-    """Devuelve inmediatamente la caché de picks calculados."""
-    return engine.cached_picks
+def get_top_leagues_rank() -> tuple:
+    return engine.snapshot.top_leagues
 
 
-def get_daily_leagues_matches() -> dict:
+def get_all_money_machine_picks() -> tuple:
+    """Devuelve inmediatamente la caché de picks calculados (tupla inmutable)."""
+    return engine.snapshot.picks
+
+
+def get_daily_leagues_matches() -> Mapping:
     """
     Retorna solo los partidos que ya tienen pronósticos PRO para el sidebar.
-    Esto hace el proceso mucho más ágil.
+    La agrupación por liga se precalcula al publicar cada snapshot.
     """
-    output     = {}
-    with engine._lock:
-        picks = list(engine.cached_picks)
-
-    if not picks:
-        return {}
-
-    for p in picks:
-        league = p.get("league", "Otros")
-        if league not in output:
-            output[league] = []
-        
-        output[league].append({
-            "id":     p.get("id"),
-            "teams":  p.get("teams"),
-            "time":   p.get("time"),
-            "status": "PND", 
-            "score":  "-"
-        })
-    return output
+    return engine.snapshot.sidebar
 
 
 # ─────────────────────────────────────────────────────────
@@ -648,8 +1909,9 @@ def get_daily_leagues_matches() -> dict:
 # ─────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
-    print(f"[{datetime.now()}] Motor corriendo en modo manual.")
+    log("Motor corriendo en modo manual.")
     engine.fetch_data()
+    LOGGER.sink.flush()
     picks = engine.cached_picks
     print(f"\n=== {len(picks)} VALUE-PICKS GENERADOS ===")
     for p in picks:
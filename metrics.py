@@ -0,0 +1,170 @@
+"""
+Métricas en memoria con exposición en formato de texto de Prometheus.
+
+Counter / Gauge / Histogram mínimos, seguros entre hilos y con coste de
+registro de una búsqueda en dict + bisect bajo un lock por métrica.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name       = name
+        self.help       = help_text
+        self.labelnames = tuple(labelnames)
+        self._values    = {}
+        self._lock      = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value) -> list:
+        return [f"{self.name}{_label_str(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][idx] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_sample(self, key, value) -> list:
+        counts, total, n = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            labels = _label_str(self.labelnames, key, ['le="%s"' % le])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {total}")
+        lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics    = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labelnames=()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def add_collector(self, fn):
+        """fn() se ejecuta justo antes de cada exposición (para gauges derivados)."""
+        self._collectors.append(fn)
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception:
+                pass
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ── Métricas del motor ────────────────────────────────────
+SYNC_PHASE_SECONDS = REGISTRY.histogram(
+    "fixit_sync_phase_seconds", "Duración de cada fase de fetch_data", ("phase",))
+SYNC_TOTAL = REGISTRY.counter(
+    "fixit_sync_total", "Sincronizaciones completadas por resultado", ("result",))
+API_REQUEST_SECONDS = REGISTRY.histogram(
+    "fixit_api_request_seconds", "Latencia HTTP del API por endpoint y status", ("endpoint", "status"))
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram(
+    "fixit_rate_limit_wait_seconds", "Espera en el rate limiter antes de cada petición", ("endpoint",),
+    buckets=(0.0, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+HISTORY_CACHE_EVENTS = REGISTRY.gauge(
+    "fixit_history_cache_lookups", "Consultas a la cache de historiales por resultado", ("result",))
+HISTORY_CACHE_HIT_RATIO = REGISTRY.gauge(
+    "fixit_history_cache_hit_ratio", "Proporción de aciertos de la cache de historiales")
+SCORELINE_CACHE_HIT_RATIO = REGISTRY.gauge(
+    "fixit_scoreline_cache_hit_ratio", "Proporción de aciertos de la LRU de matrices de marcadores")
+FIXTURES_SCORED = REGISTRY.counter(
+    "fixit_fixtures_scored_total", "Partidos evaluados: reutilizados por huella o recalculados", ("mode",))
+SCHEDULER_RUNS = REGISTRY.counter(
+    "fixit_scheduler_runs_total", "Ejecuciones del scheduler por tipo de trabajo y resultado", ("kind", "result"))
+BACKGROUND_RUNS = REGISTRY.counter(
+    "fixit_background_runs_total", "Trabajos de las colas en segundo plano por cola y resultado", ("queue", "result"))
+PICKS_TOTAL = REGISTRY.counter(
+    "fixit_picks_total", "Picks generados por competición y mercado", ("league", "market"))
+
+# ── Métricas de Flask ─────────────────────────────────────
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "fixit_http_request_seconds", "Latencia de las rutas Flask", ("route", "method", "status"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
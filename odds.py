@@ -0,0 +1,232 @@
+"""
+Cuotas 1X2 desde The Odds API (api.the-odds-api.com).
+
+- Una petición h2h por sport key (una por competición), no por partido. Cada
+  respuesta se guarda en memoria `ttl` segundos: varias syncs seguidas cuestan
+  lo mismo que una.
+- El cruce con los partidos de football-data.org se hace con un índice hash:
+  nombre normalizado (sin acentos, sufijos tipo "FC", con tabla de alias) →
+  eventos con su kickoff. Cada partido se resuelve con búsquedas O(1): el
+  cruce completo es O(n + m) en vez de comparar todos contra todos.
+- Por cada resultado (local / empate / visitante) se usa la mediana de las
+  casas, más robusta que la mejor cuota frente a una línea desfasada.
+"""
+import json
+import re
+import statistics
+import threading
+import time
+import unicodedata
+from datetime import datetime, timezone
+
+# Código de football-data.org → sport key de The Odds API
+SPORT_KEYS = {
+    "PL":  "soccer_epl",
+    "PD":  "soccer_spain_la_liga",
+    "BL1": "soccer_germany_bundesliga",
+    "SA":  "soccer_italy_serie_a",
+    "FL1": "soccer_france_ligue_one",
+    "PPL": "soccer_portugal_primeira_liga",
+    "DED": "soccer_netherlands_eredivisie",
+    "CL":  "soccer_uefa_champs_league",
+    "EL":  "soccer_uefa_europa_league",
+    "ELC": "soccer_efl_champ",
+    "CLI": "soccer_conmebol_copa_libertadores",
+    "BSA": "soccer_brazil_campeonato",
+}
+
+# Palabras que no distinguen equipos ("FC", "Club", "de"...) y se descartan al normalizar
+_NOISE = {"fc", "cf", "afc", "sc", "ac", "as", "ssc", "cd", "ud", "sd", "rc", "rcd", "ca", "club", "clube",
+          "de", "del", "da", "do", "the", "and", "1", "fsv", "sv", "vfl", "tsg", "calcio", "football"}
+
+# Nombre normalizado → nombre canónico, para los equipos que cada proveedor llama distinto
+TEAM_ALIASES = {
+    "internazionale milano":     "inter milan",
+    "inter":                     "inter milan",
+    "milan":                     "ac milan",
+    "bayern munchen":            "bayern munich",
+    "bayer 04 leverkusen":       "bayer leverkusen",
+    "athletic bilbao":           "athletic",
+    "deportivo alaves":          "alaves",
+    "real betis balompie":       "real betis",
+    "celta vigo":                "celta",
+    "wolverhampton wanderers":   "wolves",
+    "brighton hove albion":      "brighton",
+    "tottenham hotspur":         "tottenham",
+    "west ham united":           "west ham",
+    "newcastle united":          "newcastle",
+    "manchester united":         "man united",
+    "manchester city":           "man city",
+    "nottingham forest":         "nottingham",
+    "paris saint germain":       "psg",
+    "psv eindhoven":             "psv",
+    "sporting portugal":         "sporting lisbon",
+    "sporting cp":               "sporting lisbon",
+    "borussia monchengladbach":  "gladbach",
+}
+
+
+def _kickoff_ts(utc_date: str) -> float:
+    try:
+        return datetime.fromisoformat(utc_date.replace("Z", "+00:00")).astimezone(timezone.utc).timestamp()
+    except Exception:
+        return 0.0
+
+
+def normalize_team(name: str, aliases: dict = None) -> str:
+    """'Club Atlético de Madrid' → 'atletico madrid' (sin acentos, ruido ni puntuación; con alias)."""
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode().lower()
+    text = " ".join(t for t in re.split(r"[^a-z0-9]+", text.replace("&", " and ")) if t and t not in _NOISE)
+    aliases = TEAM_ALIASES if aliases is None else aliases
+    return aliases.get(text, text)
+
+
+def load_aliases(path: str = None) -> dict:
+    """TEAM_ALIASES + un JSON opcional {"nombre": "canónico"} (ambos lados se normalizan)."""
+    aliases = dict(TEAM_ALIASES)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            extra = json.load(f)
+        for raw, canonical in extra.items():
+            aliases[normalize_team(raw, {})] = normalize_team(canonical, {})
+    return aliases
+
+
+def consensus_1x2(event: dict) -> tuple:
+    """(local, empate, visitante) como mediana de las casas del evento; None donde no hay precio."""
+    prices = {"home": [], "draw": [], "away": []}
+    sides  = {event.get("home_team"): "home", event.get("away_team"): "away", "Draw": "draw"}
+    for bookmaker in event.get("bookmakers", []):
+        for market in bookmaker.get("markets", []):
+            if market.get("key") != "h2h":
+                continue
+            for outcome in market.get("outcomes", []):
+                side  = sides.get(outcome.get("name"))
+                price = outcome.get("price")
+                if side and isinstance(price, (int, float)) and price > 1.0:
+                    prices[side].append(float(price))
+    return tuple(round(statistics.median(prices[s]), 3) if prices[s] else None for s in ("home", "draw", "away"))
+
+
+class OddsIndex:
+    """Eventos de cuotas indexados por (local, visitante) y por equipo, con su kickoff."""
+
+    def __init__(self, events: list, aliases: dict, tolerance_seconds: float):
+        self.aliases   = aliases
+        self.tolerance = tolerance_seconds
+        self._pairs    = {}   # (local, visitante) normalizados -> [(kickoff, evento, local)]
+        self._teams    = {}   # equipo normalizado -> [(kickoff, evento, local)]
+        for event in events:
+            home = normalize_team(event.get("home_team"), aliases)
+            away = normalize_team(event.get("away_team"), aliases)
+            entry = (_kickoff_ts(event.get("commence_time", "")), event, home)
+            self._pairs.setdefault((home, away), []).append(entry)
+            self._teams.setdefault(home, []).append(entry)
+            self._teams.setdefault(away, []).append(entry)
+
+    def _closest(self, entries, kickoff: float):
+        best = min(entries, key=lambda e: abs(e[0] - kickoff), default=None)
+        if best is not None and abs(best[0] - kickoff) <= self.tolerance:
+            return best
+        return None
+
+    def find(self, home_names, away_names, kickoff: float) -> tuple:
+        """
+        (evento, invertido) del partido o (None, False). Primero por la pareja
+        de nombres; si un proveedor escribe distinto a un equipo, basta con que
+        el otro coincida a la misma hora. `invertido` indica que el evento
+        tiene local y visitante al revés (campo neutral).
+        """
+        homes = {normalize_team(n, self.aliases) for n in home_names if n}
+        aways = {normalize_team(n, self.aliases) for n in away_names if n}
+        for home in homes:
+            for away in aways:
+                for pair, swapped in (((home, away), False), ((away, home), True)):
+                    entry = self._closest(self._pairs.get(pair, ()), kickoff)
+                    if entry is not None:
+                        return entry[1], swapped
+        for team in homes | aways:
+            entry = self._closest(self._teams.get(team, ()), kickoff)
+            if entry is not None:
+                return entry[1], (entry[2] == team) != (team in homes)
+        return None, False
+
+
+class OddsProvider:
+    """Cuotas h2h por competición con cache TTL; el cliente HTTP es el ApiClient del motor."""
+
+    def __init__(self, client, api_key: str, base_url: str = "https://api.the-odds-api.com/v4",
+                 regions: str = "eu", ttl_seconds: float = 600.0, tolerance_seconds: float = 5400.0,
+                 aliases: dict = None, log=None):
+        self.client    = client
+        self.api_key   = api_key
+        self.base_url  = base_url.rstrip("/")
+        self.regions   = regions
+        self.ttl       = ttl_seconds
+        self.tolerance = tolerance_seconds
+        self.aliases   = TEAM_ALIASES if aliases is None else aliases
+        self.requests  = 0
+        self.remaining = None   # créditos restantes según x-requests-remaining
+        self._cache    = {}     # sport key -> (fetched_at, eventos)
+        self._lock     = threading.Lock()
+        self._log      = log or (lambda msg, level=None: None)
+
+    def events(self, sport_key: str) -> list:
+        """Eventos con cuotas h2h de `sport_key` (cache de `ttl` segundos). [] si el API falla."""
+        with self._lock:
+            cached = self._cache.get(sport_key)
+        if cached is not None and time.time() - cached[0] < self.ttl:
+            return cached[1]
+        url    = f"{self.base_url}/sports/{sport_key}/odds/"
+        params = {"apiKey": self.api_key, "regions": self.regions, "markets": "h2h",
+                  "oddsFormat": "decimal", "dateFormat": "iso"}
+        try:
+            resp = self.client.get(url, endpoint="odds", circuit_key=f"odds:{sport_key}", params=params)
+        except Exception as e:
+            # El mensaje de requests incluye la URL completa con apiKey: solo se loguea el tipo
+            self._log(f"OddsProvider: {sport_key} no disponible ({type(e).__name__})", "WARNING")
+            return cached[1] if cached else []
+        self.requests += 1
+        remaining = resp.headers.get("x-requests-remaining")
+        if remaining is not None:
+            try:
+                self.remaining = int(float(remaining))
+            except ValueError:
+                pass
+        if resp.status_code != 200:
+            self._log(f"OddsProvider: {sport_key} status {resp.status_code}", "WARNING")
+            return cached[1] if cached else []
+        events = resp.json()
+        with self._lock:
+            self._cache[sport_key] = (time.time(), events)
+        return events
+
+    def attach(self, fixtures: list) -> int:
+        """
+        Rellena fx["odds"] de los partidos sin cuotas. Cada fixture necesita
+        "comp", "kickoff" (ts UTC), "home_names" y "away_names". Retorna cuántos cruzó.
+        """
+        by_sport = {}
+        for fx in fixtures:
+            sport_key = SPORT_KEYS.get(fx.get("comp"))
+            if sport_key and not any(isinstance(o, (int, float)) for o in fx.get("odds") or ()):
+                by_sport.setdefault(sport_key, []).append(fx)
+
+        matched = 0
+        for sport_key, group in by_sport.items():
+            index = OddsIndex(self.events(sport_key), self.aliases, self.tolerance)
+            for fx in group:
+                event, swapped = index.find(fx["home_names"], fx["away_names"], fx["kickoff"])
+                if event is None:
+                    continue
+                odds = consensus_1x2(event)
+                if swapped:
+                    odds = odds[::-1]
+                if any(o is not None for o in odds):
+                    fx["odds"] = odds
+                    matched += 1
+        return matched
+
+    def counters(self) -> dict:
+        with self._lock:
+            return {"sports_cached": len(self._cache), "requests": self.requests, "remaining": self.remaining}
@@ -0,0 +1,201 @@
+"""
+Representaciones compactas de partidos históricos y picks.
+
+- MatchRow: partido FINISHED proyectado en la ingesta a lo que lee el modelo
+  (id, kickoff, equipos, marcador final y competición). El resto del payload
+  de football-data.org (árbitros, área, temporada, escudos, mensajes de
+  cuotas...) no se guarda ni en memoria ni en disco.
+- Pick: pick con __slots__. Equipos, liga, fecha y hora se internan (se
+  repiten en todos los mercados de un partido); el mercado es un índice al
+  catálogo registrado desde MARKET_META, y etiqueta, icono, color y
+  descripción se derivan al leerlos.
+- Adaptadores en los bordes: to_row / from_row (filas JSON para SQLite y el
+  snapshot compartido; los picks guardan el market_key, no el índice) y
+  get / [] / to_dict para plantillas, ledger y liquidación, que siguen
+  leyendo los picks como dicts.
+"""
+import sys
+from datetime import datetime, timezone
+
+# Catálogo de mercados: índice ↔ market_key ↔ (label, icon, color)
+_MARKET_KEYS  = []
+_MARKET_META  = []
+_MARKET_INDEX = {}
+
+
+def register_markets(meta: dict):
+    """Fija el catálogo (MARKET_META del motor) al que apuntan los picks por índice."""
+    _MARKET_KEYS[:] = list(meta)
+    _MARKET_META[:] = [tuple(v) for v in meta.values()]
+    _MARKET_INDEX.clear()
+    _MARKET_INDEX.update({k: i for i, k in enumerate(_MARKET_KEYS)})
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _kickoff_ts(utc_date: str) -> float:
+    try:
+        return datetime.fromisoformat(utc_date.replace("Z", "+00:00")).astimezone(timezone.utc).timestamp()
+    except Exception:
+        return 0.0
+
+
+class MatchRow:
+    """Partido terminado: solo los campos que usan features, ajuste e índice de historiales."""
+    __slots__ = ("id", "kickoff", "home_id", "away_id", "home_goals", "away_goals", "comp")
+
+    def __init__(self, match_id, kickoff: float, home_id, away_id, home_goals: int, away_goals: int, comp=None):
+        self.id         = match_id
+        self.kickoff    = kickoff
+        self.home_id    = home_id
+        self.away_id    = away_id
+        self.home_goals = home_goals
+        self.away_goals = away_goals
+        self.comp       = _intern(comp)
+
+    @classmethod
+    def from_api(cls, m: dict):
+        """Proyección de un partido de football-data.org; None si no está FINISHED con marcador."""
+        if m.get("status", "FINISHED") != "FINISHED":
+            return None
+        full_time = (m.get("score") or {}).get("fullTime") or {}
+        home_id, away_id = (m.get("homeTeam") or {}).get("id"), (m.get("awayTeam") or {}).get("id")
+        kickoff = _kickoff_ts(m.get("utcDate", ""))
+        if full_time.get("home") is None or full_time.get("away") is None or not kickoff:
+            return None
+        return cls(m.get("id"), kickoff, home_id, away_id, full_time["home"], full_time["away"],
+                   (m.get("competition") or {}).get("code"))
+
+    @classmethod
+    def project(cls, matches) -> list:
+        """from_api de cada partido, descartando los que no sirven."""
+        return [row for row in map(cls.from_api, matches) if row is not None]
+
+    @classmethod
+    def load(cls, value):
+        """Fila persistida (lista) o, en datos antiguos, el payload completo del API."""
+        if isinstance(value, dict):
+            return cls.from_api(value)
+        return cls(*value)
+
+    def to_row(self) -> list:
+        return [self.id, int(self.kickoff), self.home_id, self.away_id, self.home_goals, self.away_goals, self.comp]
+
+    @property
+    def utc_date(self) -> str:
+        return datetime.fromtimestamp(self.kickoff, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def __repr__(self) -> str:
+        return (f"MatchRow({self.id}, {self.utc_date}, {self.home_id}-{self.away_id} "
+                f"{self.home_goals}-{self.away_goals})")
+
+
+# Claves que ven plantillas, ledger y JSON (las de los antiguos dicts de pick)
+PICK_KEYS = ("id", "teams", "league", "market", "market_key", "description", "prob", "odds", "value",
+             "probability", "lam_home", "lam_away", "date", "time", "icon", "color")
+
+
+class Pick:
+    """Pick generado por el motor. Se lee como un dict de solo lectura (get / [] / keys)."""
+    __slots__ = ("id", "teams", "league", "market_idx", "selection", "prob", "probability", "odds", "value",
+                 "lam_home", "lam_away", "date", "time")
+
+    def __init__(self, fixture_id, teams: str, league: str, market_key: str, probability: float, odds,
+                 value: float, lam_home: float, lam_away: float, date: str, time: str, selection: str = None,
+                 prob: int = None):
+        self.id          = fixture_id
+        self.teams       = _intern(teams)
+        self.league      = _intern(league)
+        self.market_idx  = _MARKET_INDEX[market_key]
+        self.selection   = _intern(selection)
+        self.probability = probability
+        self.prob        = prob if prob is not None else int(probability * 100)
+        self.odds        = odds
+        self.value       = value
+        self.lam_home    = lam_home
+        self.lam_away    = lam_away
+        self.date        = _intern(date)
+        self.time        = _intern(time)
+
+    # ── Campos derivados del catálogo ─────────────────────
+    @property
+    def market_key(self) -> str:
+        return _MARKET_KEYS[self.market_idx]
+
+    @property
+    def market(self) -> str:
+        label = _MARKET_META[self.market_idx][0]
+        return f"{label} {self.selection}" if self.selection else label
+
+    @property
+    def icon(self) -> str:
+        return _MARKET_META[self.market_idx][1]
+
+    @property
+    def color(self) -> str:
+        return _MARKET_META[self.market_idx][2]
+
+    @property
+    def description(self) -> str:
+        lambdas = f"λ Local={self.lam_home:.2f} | λ Visit={self.lam_away:.2f}"
+        if isinstance(self.odds, (int, float)):
+            return f"{lambdas} | Valor={self.value:.3f}"
+        return f"{lambdas} | Confianza Poisson={self.prob}%"
+
+    # ── Lectura como dict ─────────────────────────────────
+    def get(self, key: str, default=None):
+        if key not in PICK_KEYS and key != "selection":
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        if key not in PICK_KEYS and not (key == "selection" and self.selection):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in PICK_KEYS or (key == "selection" and self.selection is not None)
+
+    def keys(self):
+        return PICK_KEYS + (("selection",) if self.selection else ())
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.keys()}
+
+    # ── Filas persistidas ─────────────────────────────────
+    def to_row(self) -> list:
+        return [self.id, self.teams, self.league, self.market_key, self.selection, self.prob, self.probability,
+                self.odds, round(self.value, 6), self.lam_home, self.lam_away, self.date, self.time]
+
+    @classmethod
+    def from_row(cls, row: list) -> "Pick":
+        fixture_id, teams, league, market_key, selection, prob, probability, odds, value, lam_h, lam_a, date, time = row
+        return cls(fixture_id, teams, league, market_key, probability, odds, value, lam_h, lam_a, date, time,
+                   selection, prob)
+
+    @classmethod
+    def load(cls, value):
+        """Fila persistida o dict de pick de versiones anteriores (None si su mercado ya no existe)."""
+        if not isinstance(value, dict):
+            return cls.from_row(value) if value[3] in _MARKET_INDEX else None
+        if value.get("market_key") not in _MARKET_INDEX:
+            return None
+        selection = value.get("selection")
+        if value.get("market_key") == "correct_score" and not selection:
+            selection = str(value.get("market", "")).rsplit(" ", 1)[-1]
+        probability = value.get("probability")
+        prob        = value.get("prob", 0)
+        return cls(value.get("id"), value.get("teams"), value.get("league"), value["market_key"],
+                   probability if probability is not None else prob / 100, value.get("odds"),
+                   value.get("value") or 0.0, value.get("lam_home") or 0.0, value.get("lam_away") or 0.0,
+                   value.get("date"), value.get("time"), selection, prob)
+
+    @classmethod
+    def load_many(cls, values) -> list:
+        return [p for p in map(cls.load, values or []) if p is not None]
+
+    def __repr__(self) -> str:
+        return f"Pick({self.id}, {self.teams!r}, {self.market!r}, prob={self.prob}, odds={self.odds!r})"
@@ -0,0 +1,270 @@
+"""
+Grabación y reproducción offline de football-data.org.
+
+- Recorder: guarda cada respuesta del API en un corpus local (un JSON por URL).
+- ReplayServer: servidor HTTP local que sirve ese corpus imitando al API, con
+  latencia, 429 y errores de plan configurables.
+- synthesize_corpus: genera un corpus sintético de N partidos para benchmarks.
+
+Uso:
+  FOOTBALLDATA_RECORD_DIR=corpus python main.py          # grabar una sync real
+  python replay.py serve --corpus corpus --port 8099     # servirla offline
+  FOOTBALLDATA_BASE_URL=http://127.0.0.1:8099/v4 python main.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# Parámetros (fechas, filtro de competiciones) que se ignoran al buscar una
+# respuesta aproximada; el motor vuelve a filtrar por competición en local
+_VOLATILE_PARAMS = ("dateFrom", "dateTo", "competitions")
+
+# Cabeceras del API que merece la pena conservar
+_KEPT_HEADERS = ("Content-Type", "X-Requests-Available-Minute", "X-RequestCounter-Reset",
+                 "Retry-After", "X-API-Version")
+
+
+def corpus_key(url: str, exact: bool = True) -> str:
+    """Clave estable de una URL: ruta + query ordenada (sin fechas si exact=False)."""
+    parts = urlsplit(url)
+    query = sorted(parse_qsl(parts.query))
+    if not exact:
+        query = [(k, v) for k, v in query if k not in _VOLATILE_PARAMS]
+    path = parts.path
+    if "/v4/" in path:
+        path = path[path.index("/v4/") + 3:]
+    return f"{path}?{urlencode(query)}" if query else path
+
+
+def _key_file(key: str) -> str:
+    return hashlib.sha1(key.encode()).hexdigest()[:16] + ".json"
+
+
+# ─────────────────────────────────────────────────────────
+#  GRABACIÓN
+# ─────────────────────────────────────────────────────────
+
+class Recorder:
+    """Guarda respuestas del API en `corpus_dir` con clave exacta y aproximada."""
+
+    def __init__(self, corpus_dir: str):
+        self.corpus_dir = corpus_dir
+        self._lock = threading.Lock()
+        os.makedirs(corpus_dir, exist_ok=True)
+
+    def record(self, url: str, resp):
+        entry = {
+            "url":     corpus_key(url),
+            "status":  resp.status_code,
+            "headers": {h: resp.headers[h] for h in _KEPT_HEADERS if h in resp.headers},
+            "body":    resp.text,
+        }
+        with self._lock:
+            for exact in (True, False):
+                path = os.path.join(self.corpus_dir, _key_file(corpus_key(url, exact)))
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(entry, f, ensure_ascii=False)
+
+
+def load_entry(corpus_dir: str, url: str):
+    """Respuesta grabada para `url`: coincidencia exacta o, si no, ignorando fechas."""
+    for exact in (True, False):
+        path = os.path.join(corpus_dir, _key_file(corpus_key(url, exact)))
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    return None
+
+
+# ─────────────────────────────────────────────────────────
+#  SERVIDOR DE REPRODUCCIÓN
+# ─────────────────────────────────────────────────────────
+
+class ReplayServer:
+    """
+    Servidor HTTP local que imita a football-data.org a partir de un corpus.
+
+    latency:       segundos añadidos a cada respuesta
+    p_429:         probabilidad de responder 429 con Retry-After
+    plan_errors:   prefijos de ruta que responden 403 "Free plans do not have access"
+    max_per_minute: cuota del servidor (0 = sin límite); al superarla responde 429
+    """
+
+    def __init__(self, corpus_dir: str, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, p_429: float = 0.0, plan_errors=(),
+                 max_per_minute: int = 0, seed: int = 7):
+        self.corpus_dir     = corpus_dir
+        self.latency        = latency
+        self.p_429          = p_429
+        self.plan_errors    = tuple(plan_errors)
+        self.max_per_minute = max_per_minute
+        self.requests       = 0
+        self._rng           = random.Random(seed)
+        self._window        = []
+        self._lock          = threading.Lock()
+        self._httpd         = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread        = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v4"
+
+    def _decide(self, path: str):
+        """(status, headers, body) para una petición según las reglas de inyección."""
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 60]
+            remaining = self.max_per_minute - len(self._window) if self.max_per_minute else None
+            if remaining is not None and remaining <= 0:
+                retry = int(60 - (now - self._window[0])) + 1
+                return 429, {"Retry-After": str(retry), "X-Requests-Available-Minute": "0"}, \
+                    json.dumps({"message": "You reached your request limit.", "errorCode": 429})
+            self._window.append(now)
+            if self.p_429 and self._rng.random() < self.p_429:
+                return 429, {"Retry-After": "1"}, \
+                    json.dumps({"message": "You reached your request limit.", "errorCode": 429})
+            quota = {} if remaining is None else {"X-Requests-Available-Minute": str(remaining - 1),
+                                                  "X-RequestCounter-Reset": "60"}
+
+        key = corpus_key(path)
+        if any(key.startswith(prefix) for prefix in self.plan_errors):
+            return 403, quota, json.dumps({"message": "The resource you are looking for is restricted. "
+                                                      "Free plans do not have access to this resource.",
+                                           "errorCode": 403})
+        entry = load_entry(self.corpus_dir, path)
+        if entry is None:
+            return 404, quota, json.dumps({"message": f"Sin grabación para {key}", "errorCode": 404})
+        headers = dict(entry.get("headers", {}))
+        headers.update(quota)
+        return entry.get("status", 200), headers, entry.get("body", "")
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                status, headers, body = server._decide(self.path)
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", headers.pop("Content-Type", "application/json"))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+# ─────────────────────────────────────────────────────────
+#  CORPUS SINTÉTICO
+# ─────────────────────────────────────────────────────────
+
+def _write(corpus_dir: str, path: str, payload: dict):
+    entry = {"url": corpus_key(path), "status": 200,
+             "headers": {"Content-Type": "application/json"}, "body": json.dumps(payload)}
+    for exact in (True, False):
+        with open(os.path.join(corpus_dir, _key_file(corpus_key(path, exact))), "w") as f:
+            json.dump(entry, f)
+
+
+def synthesize_corpus(corpus_dir: str, n_fixtures: int, comp_codes, history_limit: int = 5,
+                      kickoff_day: datetime = None, seed: int = 11) -> dict:
+    """
+    Genera un corpus con `n_fixtures` partidos TIMED en `kickoff_day` (hoy por
+    defecto), el listado FINISHED de cada competición y el historial de cada equipo.
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    rng   = random.Random(seed)
+    comps = list(comp_codes)
+    day   = (kickoff_day or datetime.now(timezone.utc)).replace(hour=20, minute=0, second=0, microsecond=0)
+
+    fixtures, finished_by_comp, team_matches = [], {c: [] for c in comps}, {}
+    match_id = 1_000_000
+    for i in range(n_fixtures):
+        comp = comps[i % len(comps)]
+        home, away = 10_000 + 2 * i, 10_000 + 2 * i + 1
+        fixtures.append({
+            "id": i + 1, "utcDate": day.strftime("%Y-%m-%dT%H:%M:%SZ"), "status": "TIMED",
+            "competition": {"code": comp, "name": comp},
+            "homeTeam": {"id": home, "name": f"Local {i}", "shortName": f"Local {i}"},
+            "awayTeam": {"id": away, "name": f"Visitante {i}", "shortName": f"Visitante {i}"},
+            "odds": {"msg": "Activate Odds-Package in User-Panel to retrieve odds."},
+            "score": {"fullTime": {"home": None, "away": None}},
+        })
+        for team in (home, away):
+            history = []
+            for k in range(history_limit):
+                match_id += 1
+                played = day - timedelta(days=4 + 7 * k)
+                m = {
+                    "id": match_id, "utcDate": played.strftime("%Y-%m-%dT%H:%M:%SZ"), "status": "FINISHED",
+                    "competition": {"code": comp},
+                    "homeTeam": {"id": team}, "awayTeam": {"id": 90_000 + k},
+                    "score": {"fullTime": {"home": rng.randint(0, 4), "away": rng.randint(0, 3)}},
+                }
+                history.append(m)
+                finished_by_comp[comp].append(m)
+            team_matches[team] = history
+
+    _write(corpus_dir, "/v4/matches", {"matches": fixtures})
+    for comp, matches in finished_by_comp.items():
+        _write(corpus_dir, f"/v4/competitions/{comp}/matches?status=FINISHED", {"matches": matches})
+    for team, matches in team_matches.items():
+        _write(corpus_dir, f"/v4/teams/{team}/matches?limit={history_limit}&status=FINISHED",
+               {"matches": matches})
+    return {"fixtures": len(fixtures), "teams": len(team_matches)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local de reproducción de football-data.org")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    serve = sub.add_parser("serve")
+    serve.add_argument("--corpus", required=True)
+    serve.add_argument("--port", type=int, default=8099)
+    serve.add_argument("--latency", type=float, default=0.0)
+    serve.add_argument("--p429", type=float, default=0.0)
+    serve.add_argument("--plan-error", action="append", default=[],
+                       help="Prefijo de ruta que responde error de plan, p.ej. /competitions/CLI")
+    serve.add_argument("--max-per-minute", type=int, default=0)
+    synth = sub.add_parser("synth")
+    synth.add_argument("--corpus", required=True)
+    synth.add_argument("--fixtures", type=int, default=30)
+    synth.add_argument("--comps", default="PL,PD,SA,BL1")
+    args = parser.parse_args()
+
+    if args.cmd == "synth":
+        print(synthesize_corpus(args.corpus, args.fixtures, args.comps.split(",")))
+    else:
+        srv = ReplayServer(args.corpus, port=args.port, latency=args.latency, p_429=args.p429,
+                           plan_errors=args.plan_error, max_per_minute=args.max_per_minute).start()
+        print(f"Sirviendo {args.corpus} en {srv.base_url} (Ctrl+C para salir)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            srv.stop()
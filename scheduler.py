@@ -0,0 +1,264 @@
+"""
+Scheduler basado en un heap de trabajos ordenados por hora de vencimiento.
+
+- Trabajos cron (5 campos: minuto hora día-mes mes día-semana) evaluados en una
+  zona horaria concreta, con jitter y recuperación de ejecuciones perdidas: si
+  el proceso estaba caído (o despierta tarde) y la última ejecución pendiente
+  está dentro del margen `misfire_grace`, se ejecuta una sola vez al arrancar.
+- Trabajos puntuales con clave (p. ej. "prekickoff:123"): volver a añadir la
+  misma clave con otra hora reprograma el trabajo; con la misma hora no hace nada.
+- El hilo duerme hasta el próximo vencimiento (o hasta que se añade un trabajo
+  más temprano) en lugar de consultar el reloj cada pocos segundos.
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Tope de cada espera: cubre saltos del reloj de pared o suspensiones del host
+MAX_SLEEP_SECONDS = 300.0
+
+
+def _parse_field(field: str, low: int, high: int) -> frozenset:
+    """'*', '5', '1-5', '*/15', '0,30', '8-20/2' → conjunto de valores."""
+    values = set()
+    for part in field.split(","):
+        base, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            start, end = (int(x) for x in base.split("-", 1))
+        else:
+            start = end = int(base)
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(f"Campo cron fuera de rango: {field!r}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """Expresión cron de 5 campos evaluada en la zona horaria `tz`."""
+
+    def __init__(self, expr: str, tz):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expresión cron inválida: {expr!r}")
+        self.expr    = expr
+        self.tz      = tz
+        self.minutes = sorted(_parse_field(fields[0], 0, 59))
+        self.hours   = sorted(_parse_field(fields[1], 0, 23))
+        self.days    = _parse_field(fields[2], 1, 31)
+        self.months  = _parse_field(fields[3], 1, 12)
+        # 0 y 7 son domingo, como en cron
+        self.weekdays = frozenset(d % 7 for d in _parse_field(fields[4], 0, 7))
+        self._any_day     = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day) -> bool:
+        if day.month not in self.months:
+            return False
+        dom = day.day in self.days
+        dow = (day.isoweekday() % 7) in self.weekdays
+        # Semántica cron: si se restringen ambos campos basta con que cumpla uno
+        if not self._any_day and not self._any_weekday:
+            return dom or dow
+        return dom and dow
+
+    def next_after(self, ts: float) -> float:
+        """Primer instante (timestamp) estrictamente posterior a `ts` que cumple la expresión."""
+        local = datetime.fromtimestamp(ts, self.tz).replace(tzinfo=None, second=0, microsecond=0)
+        local += timedelta(minutes=1)
+        day = local.date()
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        naive = datetime(day.year, day.month, day.day, hour, minute)
+                        if naive < local:
+                            continue
+                        candidate = naive.replace(tzinfo=self.tz).timestamp()
+                        if candidate > ts:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"La expresión cron {self.expr!r} nunca se cumple")
+
+
+class ScheduledJob:
+    """Entrada del heap. `due` incluye el jitter; `nominal` es la hora teórica."""
+    __slots__ = ("key", "kind", "fn", "due", "nominal", "cron", "jitter", "grace", "cancelled")
+
+    def __init__(self, key: str, kind: str, fn, nominal: float, cron: CronSchedule = None,
+                 jitter: float = 0.0, grace: float = None):
+        self.key       = key
+        self.kind      = kind
+        self.fn        = fn
+        self.nominal   = nominal
+        self.due       = nominal + (random.uniform(0, jitter) if jitter else 0.0)
+        self.cron      = cron
+        self.jitter    = jitter
+        self.grace     = grace
+        self.cancelled = False
+
+    def to_dict(self) -> dict:
+        return {"key": self.key, "kind": self.kind, "due": round(self.due, 3),
+                "nominal": self.nominal, "cron": self.cron.expr if self.cron else None}
+
+
+class Scheduler:
+    """
+    Ejecuta los trabajos en su propio hilo, uno detrás de otro: los callbacks
+    deben ser cortos (p. ej. encolar una sincronización en SyncCoordinator).
+    `state` (opcional) guarda la última ejecución de cada cron con
+    get_meta/set_meta, como StatsStore, para detectar ejecuciones perdidas.
+    `on_run(job, result)` se llama tras cada ejecución (métricas).
+    """
+
+    def __init__(self, state=None, misfire_grace: float = 3600.0, log=print, on_run=None):
+        self.state         = state
+        self.misfire_grace = misfire_grace
+        self._log          = log
+        self._on_run       = on_run
+        self._heap         = []
+        self._jobs         = {}    # key -> ScheduledJob vivo
+        self._seq          = itertools.count()
+        self._cond         = threading.Condition()
+        self._thread       = None
+
+    # ── Alta de trabajos ──────────────────────────────────
+    def add_cron(self, key: str, expr: str, tz, fn, jitter: float = 0.0,
+                 misfire_grace: float = None) -> ScheduledJob:
+        """
+        Trabajo recurrente. Si la última ejecución guardada en `state` dejó
+        pendiente una hora dentro del margen de misfire, vence inmediatamente.
+        """
+        cron  = CronSchedule(expr, tz)
+        grace = self.misfire_grace if misfire_grace is None else misfire_grace
+        now   = time.time()
+        nominal = cron.next_after(now)
+        last = self._last_run(key)
+        if last is not None and cron.next_after(last) <= now:
+            # Las ejecuciones perdidas se agrupan en una: la más reciente dentro del margen
+            missed = cron.next_after(max(last, now - grace - 1))
+            if missed <= now:
+                while cron.next_after(missed) <= now:
+                    missed = cron.next_after(missed)
+                self._log(f"Scheduler: {key} perdió la ejecución de las "
+                          f"{datetime.fromtimestamp(missed, tz):%Y-%m-%d %H:%M}, recuperándola")
+                nominal = missed
+            else:
+                self._log(f"Scheduler: {key} perdió ejecuciones fuera del margen, se omiten")
+        job = ScheduledJob(key, "cron", fn, nominal, cron, jitter, grace)
+        if nominal <= now:
+            job.due = now
+        return self._push(job)
+
+    def add_at(self, key: str, when: float, fn, kind: str = "once") -> ScheduledJob:
+        """Trabajo puntual con clave. Reprograma si ya existía con otra hora."""
+        with self._cond:
+            current = self._jobs.get(key)
+            if current is not None and current.nominal == when:
+                return current
+        return self._push(ScheduledJob(key, kind, fn, when))
+
+    def cancel(self, key: str) -> bool:
+        with self._cond:
+            job = self._jobs.pop(key, None)
+            if job is not None:
+                job.cancelled = True
+            return job is not None
+
+    def _push(self, job: ScheduledJob) -> ScheduledJob:
+        with self._cond:
+            previous = self._jobs.get(job.key)
+            if previous is not None:
+                previous.cancelled = True   # se descarta al salir del heap
+            self._jobs[job.key] = job
+            heapq.heappush(self._heap, (job.due, next(self._seq), job))
+            self._cond.notify()
+        return job
+
+    # ── Bucle ─────────────────────────────────────────────
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def _next_due(self):
+        """Saca el próximo trabajo vencido o retorna los segundos a esperar."""
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None, MAX_SLEEP_SECONDS
+        due, _, job = self._heap[0]
+        delay = due - time.time()
+        if delay > 0:
+            return None, min(delay, MAX_SLEEP_SECONDS)
+        heapq.heappop(self._heap)
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+        return job, 0.0
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                job, delay = self._next_due()
+                if job is None:
+                    self._cond.wait(delay)
+                    continue
+            self._fire(job)
+
+    def _fire(self, job: ScheduledJob):
+        now = time.time()
+        if job.cron is not None:
+            # Hora de la siguiente ejecución calculada antes de correr el trabajo
+            self._push(ScheduledJob(job.key, job.kind, job.fn, job.cron.next_after(max(now, job.nominal)),
+                                    job.cron, job.jitter, job.grace))
+            if now - job.nominal > job.grace:
+                self._log(f"Scheduler: {job.key} despertó {now - job.nominal:.0f}s tarde, se omite")
+                self._record(job, "misfire")
+                return
+        try:
+            result = job.fn()
+            outcome = result if isinstance(result, str) else "ok"
+        except Exception as e:
+            self._log(f"Scheduler: Error en {job.key}: {e}")
+            outcome = "error"
+        if job.cron is not None:
+            self._set_last_run(job.key, job.nominal)
+        self._record(job, outcome)
+
+    def _record(self, job: ScheduledJob, outcome: str):
+        if self._on_run is not None:
+            try:
+                self._on_run(job, outcome)
+            except Exception:
+                pass
+
+    # ── Estado persistido ─────────────────────────────────
+    def _last_run(self, key: str):
+        if self.state is None:
+            return None
+        try:
+            value = self.state.get_meta(f"scheduler:{key}")
+            return float(value) if value is not None else None
+        except Exception:
+            return None
+
+    def _set_last_run(self, key: str, ts: float):
+        if self.state is None:
+            return
+        try:
+            self.state.set_meta(f"scheduler:{key}", ts)
+        except Exception as e:
+            self._log(f"Scheduler: No se pudo guardar la última ejecución de {key}: {e}")
+
+    def pending(self) -> list:
+        """Trabajos programados ordenados por vencimiento (para /debug)."""
+        with self._cond:
+            jobs = sorted(self._jobs.values(), key=lambda j: j.due)
+        return [j.to_dict() for j in jobs]
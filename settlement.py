@@ -0,0 +1,137 @@
+"""
+Liquidación de picks contra resultados finales.
+
+- PendingPicks: índice fixture_id → picks publicados pendientes de resultado,
+  con su kickoff para saber cuáles ya deberían haber terminado.
+- SettledIds: ids de partidos ya liquidados con pertenencia O(1); solo los
+  añadidos desde el último guardado se escriben en disco.
+- grade_pick: gana / pierde / nula de cada pick según su propio mercado.
+"""
+from datetime import datetime, timezone
+
+
+def _kickoff_ts(utc_date: str) -> float:
+    try:
+        return datetime.fromisoformat(utc_date.replace("Z", "+00:00")).astimezone(timezone.utc).timestamp()
+    except Exception:
+        return 0.0
+
+
+def _selection(pick: dict) -> tuple:
+    """Marcador elegido de un pick de resultado exacto ("2-1" → (2, 1))."""
+    raw = pick.get("selection") or str(pick.get("market", "")).rsplit(" ", 1)[-1]
+    home, _, away = raw.partition("-")
+    return int(home), int(away)
+
+
+def grade_pick(pick: dict, home_goals: int, away_goals: int) -> str:
+    """'won', 'lost', 'push' (hándicap devuelto) o 'void' (mercado desconocido)."""
+    key   = pick.get("market_key", "")
+    diff  = home_goals - away_goals
+    total = home_goals + away_goals
+    if key == "home_win":
+        won = diff > 0
+    elif key == "draw":
+        won = diff == 0
+    elif key == "away_win":
+        won = diff < 0
+    elif key == "dc_1x":
+        won = diff >= 0
+    elif key == "dc_x2":
+        won = diff <= 0
+    elif key == "dc_12":
+        won = diff != 0
+    elif key.startswith(("over_", "under_")):
+        side, _, digits = key.partition("_")
+        line = int(digits) / 10
+        won = total > line if side == "over" else total < line
+    elif key == "btts_yes":
+        won = home_goals > 0 and away_goals > 0
+    elif key == "btts_no":
+        won = home_goals == 0 or away_goals == 0
+    elif key.startswith("ah_"):
+        _, side, line = key.split("_", 2)
+        adjusted = (diff if side == "home" else -diff) + float(line)
+        if adjusted == 0:
+            return "push"
+        won = adjusted > 0
+    elif key == "correct_score":
+        try:
+            won = _selection(pick) == (home_goals, away_goals)
+        except ValueError:
+            return "void"
+    else:
+        return "void"
+    return "won" if won else "lost"
+
+
+class PendingPicks:
+    """
+    Índice de picks pendientes sobre el mapping persistido stats["pending_picks"]:
+    {fixture_id: {"kickoff": utcDate, "comp": code, "picks": [...]}}.
+    """
+
+    def __init__(self, data: dict):
+        self._data = data
+
+    def register(self, fixture_id, kickoff: str, comp: str, picks: list):
+        """Guarda (o sustituye) los picks publicados de un partido aún sin empezar."""
+        key = str(fixture_id)
+        if picks:
+            self._data[key] = {"kickoff": kickoff, "comp": comp, "picks": list(picks)}
+        else:
+            self._data.pop(key, None)
+
+    def due(self, now: float, after_seconds: float) -> list:
+        """Ids (int) de los partidos que deberían haber terminado, por kickoff."""
+        ready = [(_kickoff_ts(e.get("kickoff", "")), k) for k, e in self._data.items()]
+        return [int(k) for ts, k in sorted(ready) if ts and ts + after_seconds <= now]
+
+    def kickoff(self, fixture_id) -> float:
+        entry = self._data.get(str(fixture_id))
+        return _kickoff_ts(entry.get("kickoff", "")) if entry else 0.0
+
+    def pop(self, fixture_id) -> list:
+        entry = self._data.pop(str(fixture_id), None)
+        return entry["picks"] if entry else []
+
+    def __contains__(self, fixture_id) -> bool:
+        return str(fixture_id) in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SettledIds:
+    """Conjunto de ids liquidados. take_unsaved() entrega los nuevos para StatsStore.save."""
+    __slots__ = ("_ids", "_unsaved")
+
+    def __init__(self, ids=()):
+        self._ids     = {int(i) for i in ids if i is not None}
+        self._unsaved = set()
+
+    def add(self, fixture_id):
+        fixture_id = int(fixture_id)
+        if fixture_id not in self._ids:
+            self._ids.add(fixture_id)
+            self._unsaved.add(fixture_id)
+
+    def take_unsaved(self) -> list:
+        ids, self._unsaved = sorted(self._unsaved), set()
+        return ids
+
+    def restore_unsaved(self, ids):
+        """Devuelve ids a la cola de escritura si la transacción falló."""
+        self._unsaved.update(ids)
+
+    def __contains__(self, fixture_id) -> bool:
+        try:
+            return int(fixture_id) in self._ids
+        except (TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
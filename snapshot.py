@@ -0,0 +1,118 @@
+"""
+Modo multi-worker: un único proceso líder (lease por file-lock) consulta el API
+y publica picks/partidos/stats en un snapshot SQLite compartido. El resto de
+workers de gunicorn solo leen ese snapshot cuando cambia su generación.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lease, cada proceso se comporta como líder
+    fcntl = None
+
+
+class LeaderLease:
+    """Lease exclusivo entre procesos basado en flock. El SO lo libera si el líder muere."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd  = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            self._fd = -1
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd not in (None, -1):
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
+
+
+class SharedSnapshot:
+    """Snapshot compartido en SQLite: una fila con contador de generación y payload JSON."""
+
+    def __init__(self, path: str):
+        self.path  = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS snapshot ("
+                           "id INTEGER PRIMARY KEY CHECK (id = 1), generation INTEGER NOT NULL, "
+                           "published_at REAL NOT NULL, payload TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sync_requests ("
+                           "id INTEGER PRIMARY KEY AUTOINCREMENT, comps TEXT, requested_at REAL NOT NULL)")
+
+    def publish(self, payload: dict) -> int:
+        """Sustituye el snapshot y retorna la nueva generación."""
+        data = json.dumps(payload, separators=(",", ":"), default=str)
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                row = c.execute("SELECT generation FROM snapshot WHERE id = 1").fetchone()
+                generation = (row[0] if row else 0) + 1
+                c.execute("INSERT INTO snapshot (id, generation, published_at, payload) VALUES (1, ?, ?, ?) "
+                          "ON CONFLICT(id) DO UPDATE SET generation = excluded.generation, "
+                          "published_at = excluded.published_at, payload = excluded.payload",
+                          (generation, time.time(), data))
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+        return generation
+
+    def generation(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT generation FROM snapshot WHERE id = 1").fetchone()
+        return row[0] if row else 0
+
+    def read(self):
+        """(generation, payload) o (0, None) si aún no se ha publicado nada."""
+        with self._lock:
+            row = self._conn.execute("SELECT generation, payload FROM snapshot WHERE id = 1").fetchone()
+        if not row:
+            return 0, None
+        return row[0], json.loads(row[1])
+
+    # ── Peticiones de los followers al líder ──────────────
+    def request_sync(self, comps=None):
+        """Un follower pide al líder una sincronización manual (de `comps` o completa)."""
+        with self._lock:
+            self._conn.execute("INSERT INTO sync_requests (comps, requested_at) VALUES (?, ?)",
+                               (",".join(sorted(comps)) if comps else None, time.time()))
+
+    def take_sync_requests(self) -> list:
+        """El líder consume las peticiones pendientes: lista de competiciones (None = todas)."""
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                rows = c.execute("SELECT comps FROM sync_requests ORDER BY id").fetchall()
+                c.execute("DELETE FROM sync_requests")
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+        return [row[0].split(",") if row[0] else None for row in rows]
@@ -0,0 +1,245 @@
+"""
+Almacenamiento transaccional de stats en SQLite (WAL).
+
+Mantiene la misma forma de dict que usaba stats.json, pero cada clave vive en
+su propia tabla y save() solo escribe las filas que cambiaron desde la última
+carga/guardado, dentro de una única transacción atómica.
+
+Las filas sucias se detectan por identidad: save() recuerda el objeto que
+guardó en cada fila y solo serializa las que ahora tienen otro objeto. Los
+valores guardados se tratan como inmutables (para cambiar una fila se asigna
+un objeto nuevo, como hacen PendingPicks.register o TeamHistoryCache.put).
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Claves de stats → tipo de tabla
+COUNTER_KEYS = ("ganadas", "perdidas")
+MAPPING_KEYS = ("ligas", "team_histories", "fixture_picks", "pending_picks")   # clave → valor
+LIST_KEYS    = ("historial", "cached_picks")     # posición → valor
+SET_KEYS     = ("processed_fixtures",)           # conjunto de ids (solo se añaden)
+
+
+def empty_stats() -> dict:
+    return {"ganadas": 0, "perdidas": 0, "ligas": {}, "processed_fixtures": [],
+            "historial": [], "cached_picks": [], "team_histories": {}, "fixture_picks": {},
+            "pending_picks": {}}
+
+
+def _encode(value):
+    """Registros compactos (records.Pick / MatchRow) se guardan como su fila."""
+    if hasattr(value, "to_row"):
+        return value.to_row()
+    raise TypeError(f"{type(value).__name__} no es serializable")
+
+
+def _dump(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=_encode)
+
+
+class StatsStore:
+    """Backend SQLite para FixItPRO.load_stats / save_stats."""
+
+    def __init__(self, path: str):
+        self.path  = path
+        self._lock = threading.Lock()
+        # Varios workers arrancan a la vez: esperan el lock de escritura en vez de fallar
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        self._last  = {}   # tabla -> {clave: payload serializado} ya escrito en disco
+        self._saved = {}   # tabla -> {clave: objeto} cuyo payload es el de _last
+
+    def _create_tables(self):
+        with self._transaction() as c:
+            c.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            c.execute("CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            for table in MAPPING_KEYS:
+                c.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, payload TEXT NOT NULL)")
+            for table in LIST_KEYS:
+                c.execute(f"CREATE TABLE IF NOT EXISTS {table} (pos INTEGER PRIMARY KEY, payload TEXT NOT NULL)")
+            for table in SET_KEYS:
+                c.execute(f"CREATE TABLE IF NOT EXISTS {table} (fixture_id INTEGER PRIMARY KEY)")
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE … COMMIT (ROLLBACK si falla) con self._lock."""
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                yield c
+                c.execute("COMMIT")
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+
+    # ── Meta ──────────────────────────────────────────────
+    def get_meta(self, key: str, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value):
+        with self._lock:
+            self._conn.execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                               "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, str(value)))
+
+    # ── Lectura ───────────────────────────────────────────
+    def load(self) -> dict:
+        with self._lock:
+            return self._read()
+
+    def _read(self) -> dict:
+        """Stats completas desde disco; fija _last como base del próximo diff (con self._lock)."""
+        stats = empty_stats()
+        last  = {}
+        c = self._conn
+        rows = dict(c.execute("SELECT key, value FROM counters").fetchall())
+        for key in COUNTER_KEYS:
+            stats[key] = int(rows.get(key, 0))
+        last["counters"] = {k: str(v) for k, v in rows.items()}
+
+        for table in MAPPING_KEYS:
+            rows = c.execute(f"SELECT key, payload FROM {table}").fetchall()
+            stats[table] = {k: json.loads(p) for k, p in rows}
+            last[table]  = dict(rows)
+
+        for table in LIST_KEYS:
+            rows = c.execute(f"SELECT pos, payload FROM {table} ORDER BY pos").fetchall()
+            stats[table] = [json.loads(p) for _, p in rows]
+            last[table]  = {pos: p for pos, p in rows}
+
+        for table in SET_KEYS:
+            ids = [r[0] for r in c.execute(f"SELECT fixture_id FROM {table}").fetchall()]
+            stats[table] = ids
+            last[table]  = {i: "" for i in ids}
+        self._last  = last
+        self._saved = {}
+        return stats
+
+    # ── Escritura incremental ─────────────────────────────
+    def _dump_rows(self, table: str, items) -> tuple:
+        """
+        ({clave: payload}, {clave: objeto}) de una tabla. Solo se serializan
+        las filas cuyo objeto no es el que se guardó la última vez.
+        """
+        last, saved = self._last.get(table, {}), self._saved.get(table, {})
+        payloads, objects = {}, {}
+        for key, value in items:
+            if key in last and saved.get(key) is value:
+                payloads[key] = last[key]
+            else:
+                payloads[key] = _dump(value)
+            objects[key] = value
+        return payloads, objects
+
+    def _diff(self, stats: dict) -> tuple:
+        """Filas actuales por tabla, objetos que representan y ids nuevos de SettledIds."""
+        current = {"counters": {k: str(int(stats.get(k, 0))) for k in COUNTER_KEYS}}
+        objects = {}
+        for table in MAPPING_KEYS:
+            items = ((str(k), v) for k, v in (stats.get(table) or {}).items())
+            current[table], objects[table] = self._dump_rows(table, items)
+        for table in LIST_KEYS:
+            current[table], objects[table] = self._dump_rows(table, enumerate(stats.get(table) or []))
+        appended = {}
+        for table in SET_KEYS:
+            ids = stats.get(table)
+            if hasattr(ids, "take_unsaved"):
+                # SettledIds: solo los ids añadidos desde el último guardado
+                appended[table] = (ids, ids.take_unsaved())
+            else:
+                current[table] = {int(i): "" for i in (ids or []) if i is not None}
+        return current, objects, appended
+
+    def _write(self, c, current: dict, appended: dict) -> int:
+        """Upserts y borrados contra _last dentro de la transacción abierta en `c`."""
+        written = 0
+        for table, rows in current.items():
+            old     = self._last.get(table, {})
+            changed = [(k, v) for k, v in rows.items() if old.get(k) != v]
+            removed = [(k,) for k in old.keys() - rows.keys()]
+            if table == "counters":
+                c.executemany("INSERT INTO counters (key, value) VALUES (?, ?) "
+                              "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                              [(k, int(v)) for k, v in changed])
+                c.executemany("DELETE FROM counters WHERE key = ?", removed)
+            elif table in MAPPING_KEYS:
+                c.executemany(f"INSERT INTO {table} (key, payload) VALUES (?, ?) "
+                              "ON CONFLICT(key) DO UPDATE SET payload = excluded.payload", changed)
+                c.executemany(f"DELETE FROM {table} WHERE key = ?", removed)
+            elif table in LIST_KEYS:
+                c.executemany(f"INSERT INTO {table} (pos, payload) VALUES (?, ?) "
+                              "ON CONFLICT(pos) DO UPDATE SET payload = excluded.payload", changed)
+                c.executemany(f"DELETE FROM {table} WHERE pos = ?", removed)
+            else:
+                c.executemany(f"INSERT OR IGNORE INTO {table} (fixture_id) VALUES (?)",
+                              [(k,) for k, _ in changed])
+                c.executemany(f"DELETE FROM {table} WHERE fixture_id = ?", removed)
+            written += len(changed) + len(removed)
+        for table, (_, new_ids) in appended.items():
+            c.executemany(f"INSERT OR IGNORE INTO {table} (fixture_id) VALUES (?)",
+                          [(i,) for i in new_ids])
+            written += len(new_ids)
+        return written
+
+    def save(self, stats: dict) -> int:
+        """Upsert de las filas que cambiaron y borrado de las que ya no están. Retorna filas escritas."""
+        current, objects, appended = self._diff(stats)
+        try:
+            with self._transaction() as c:
+                written = self._write(c, current, appended)
+        except Exception:
+            for ids, new_ids in appended.values():
+                ids.restore_unsaved(new_ids)
+            raise
+        self._last.update(current)
+        self._saved.update(objects)
+        return written
+
+    # ── Migración única desde stats.json ──────────────────
+    def migrate_from_json(self, json_path: str, log=None) -> bool:
+        """
+        Importa stats.json una sola vez. Retorna True si migró algo. Todo ocurre
+        en una transacción BEGIN IMMEDIATE: si varios workers arrancan a la vez,
+        uno migra y los demás esperan y encuentran la marca ya puesta. Un
+        fichero corrupto o a medio escribir se renombra a <json_path>.corrupt y
+        la migración se da por hecha: los datos ya guardados en SQLite no se tocan.
+        """
+        if self.get_meta("migrated_from_json") or not os.path.exists(json_path):
+            return False
+        mark = "INSERT INTO meta (key, value) VALUES ('migrated_from_json', ?) " \
+               "ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+        with self._transaction() as c:
+            done = c.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+            if done or not os.path.exists(json_path):
+                return False
+            try:
+                with open(json_path, "r") as f:
+                    content = f.read().strip()
+                data = json.loads(content) if content else {}
+            except ValueError as e:
+                corrupt_path = json_path + ".corrupt"
+                os.replace(json_path, corrupt_path)
+                c.execute(mark, (corrupt_path,))
+                if log is not None:
+                    log(f"StatsStore: {json_path} corrupto ({e}), renombrado a {corrupt_path}", "WARNING")
+                return False
+            stats = empty_stats()
+            if isinstance(data, dict):
+                stats.update({k: v for k, v in data.items() if k in stats})
+            self._read()
+            current, _, appended = self._diff(stats)
+            self._write(c, current, appended)
+            c.execute(mark, (json_path,))
+            self._last.update(current)
+        return True
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,224 @@
+"""
+Coordinador de sincronizaciones single-flight.
+
+- Las peticiones concurrentes se unen al trabajo en curso si este ya cubre sus
+  competiciones; si no, se acumulan en un único trabajo pendiente que arranca
+  en cuanto termina el actual.
+- Cada trabajo es un handle (SyncJob) con progreso estructurado al que se puede
+  esperar con timeout.
+- WorkQueue: hilo propio para trabajos largos (HTTP, simulaciones) que el
+  Scheduler solo encola, para no retrasar el resto de su heap.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+
+class SyncJob:
+    """Handle de una sincronización: estado, fase y contadores de progreso."""
+
+    def __init__(self, job_id: int, comps=None):
+        self.id             = job_id
+        self.comps          = frozenset(comps) if comps else None   # None = todas
+        self.state          = "queued"      # queued | running | done | failed
+        self.phase          = None
+        self.step           = 0
+        self.steps          = 0
+        self.fixtures_done  = 0
+        self.fixtures_total = 0
+        self.picks          = 0
+        self.callers        = 1
+        self.result         = None
+        self.error          = None
+        self.created_at     = time.time()
+        self.started_at     = None
+        self.finished_at    = None
+        self._done          = threading.Event()
+        self._lock          = threading.Lock()
+
+    def covers(self, comps) -> bool:
+        """True si esta sincronización ya incluye las competiciones pedidas."""
+        return self.comps is None or (comps is not None and comps <= self.comps)
+
+    def extend(self, comps):
+        """Amplía un trabajo aún en cola (None = pasa a ser completo)."""
+        with self._lock:
+            self.comps = None if comps is None or self.comps is None else self.comps | comps
+
+    def update(self, **fields):
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+
+    def advance(self, fixtures: int = 0, picks: int = 0):
+        with self._lock:
+            self.fixtures_done += fixtures
+            self.picks         += picks
+
+    def wait(self, timeout: float = None) -> bool:
+        """Bloquea hasta que el trabajo termine. False si vence el timeout."""
+        return self._done.wait(timeout)
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def _start(self):
+        self.update(state="running", started_at=time.time())
+
+    def _finish(self, result: str, error: str = None):
+        self.update(state="failed" if error or result == "error" else "done",
+                    result=result, error=error, finished_at=time.time())
+        self._done.set()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "id":             self.id,
+                "comps":          sorted(self.comps) if self.comps else None,
+                "state":          self.state,
+                "phase":          self.phase,
+                "step":           self.step,
+                "steps":          self.steps,
+                "fixtures_done":  self.fixtures_done,
+                "fixtures_total": self.fixtures_total,
+                "picks":          self.picks,
+                "callers":        self.callers,
+                "result":         self.result,
+                "error":          self.error,
+                "created_at":     self.created_at,
+                "started_at":     self.started_at,
+                "finished_at":    self.finished_at,
+                "elapsed":        round(end - self.started_at, 3) if self.started_at else None,
+            }
+
+
+class SyncCoordinator:
+    """
+    Ejecuta `run(job)` (retorna un resultado en texto) en un hilo propio, un
+    trabajo a la vez, y después `on_finish(job)`. Guarda los últimos `keep`
+    trabajos para consultar su estado.
+    """
+
+    def __init__(self, run, on_finish=None, keep: int = 20):
+        self._run       = run
+        self._on_finish = on_finish
+        self._keep      = keep
+        self._seq       = itertools.count(1)
+        self._active    = None
+        self._pending   = None
+        self._jobs      = OrderedDict()
+        self._lock      = threading.Lock()
+
+    def submit(self, comps=None) -> tuple:
+        """
+        Pide una sincronización (de `comps` o completa). Retorna (job, coalesced):
+        coalesced=True si se unió a un trabajo ya existente.
+        """
+        comps = frozenset(comps) if comps else None
+        with self._lock:
+            active = self._active
+            if active is not None and not active.finished and active.covers(comps):
+                active.update(callers=active.callers + 1)
+                return active, True
+            if self._pending is not None:
+                self._pending.extend(comps)
+                self._pending.update(callers=self._pending.callers + 1)
+                return self._pending, True
+
+            job = SyncJob(next(self._seq), comps)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._keep:
+                self._jobs.popitem(last=False)
+            if active is None:
+                self._active = job
+                threading.Thread(target=self._loop, name="sync", daemon=True).start()
+            else:
+                self._pending = job
+            return job, False
+
+    def _loop(self):
+        job = self._active
+        while job is not None:
+            job._start()
+            try:
+                job._finish(self._run(job))
+            except Exception as e:
+                job._finish("error", str(e))
+            if self._on_finish is not None:
+                try:
+                    self._on_finish(job)
+                except Exception:
+                    pass
+            with self._lock:
+                job, self._pending = self._pending, None
+                self._active = job
+
+    def get(self, job_id: int):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def current(self):
+        """Trabajo en curso o, si no hay, el último terminado."""
+        with self._lock:
+            if self._active is not None:
+                return self._active
+            return next(reversed(self._jobs.values()), None)
+
+
+class WorkQueue:
+    """
+    Ejecuta en un hilo propio, de uno en uno y en orden de llegada, trabajos
+    identificados por clave. Una clave que ya está en cola no se duplica (sí
+    se vuelve a encolar si se está ejecutando: sus entradas pueden haber
+    cambiado). `on_run(key, result)` se llama tras cada trabajo (métricas).
+    """
+
+    def __init__(self, name: str, log=None, on_run=None):
+        self.name     = name
+        self._queue   = OrderedDict()   # clave -> fn
+        self._running = None
+        self._thread  = None
+        self._cond    = threading.Condition()
+        self._log     = log or (lambda msg, level=None: None)
+        self._on_run  = on_run
+
+    def submit(self, key: str, fn) -> bool:
+        """Encola `fn` bajo `key`. False si esa clave ya estaba en cola."""
+        with self._cond:
+            if key in self._queue:
+                return False
+            self._queue[key] = fn
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return True
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                key, fn = self._queue.popitem(last=False)
+                self._running = key
+            try:
+                result = fn()
+                outcome = result if isinstance(result, str) else "ok"
+            except Exception as e:
+                self._log(f"WorkQueue[{self.name}]: Error en {key}: {e}", "ERROR")
+                outcome = "error"
+            with self._cond:
+                self._running = None
+            if self._on_run is not None:
+                try:
+                    self._on_run(key, outcome)
+                except Exception:
+                    pass
+
+    def pending(self) -> list:
+        """Clave en ejecución (si hay) seguida de las que esperan."""
+        with self._cond:
+            return ([self._running] if self._running else []) + list(self._queue)
@@ -0,0 +1,32 @@
+"""
+Fixtures comunes. El motor se instancia al importar main: antes de eso los
+tests se mueven a un directorio temporal para no tocar stats.db, el ledger
+ni migrar el stats.json real del proyecto.
+"""
+import os
+import tempfile
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="fixit-tests-")
+os.environ.setdefault("STATS_DB", os.path.join(_TMP, "import.db"))
+os.environ.setdefault("SNAPSHOT_DB", os.path.join(_TMP, "snapshot.db"))
+os.environ.setdefault("LEASE_FILE", os.path.join(_TMP, "fixit.lease"))
+os.environ.setdefault("LEDGER_DIR", os.path.join(_TMP, "ledger"))
+
+
+def pytest_sessionstart(session):
+    # Después de resolver testpaths y antes de importar los módulos de test
+    os.chdir(_TMP)
+
+
+@pytest.fixture
+def engine_paths(tmp_path, monkeypatch):
+    """Rutas de un motor aislado (stats, snapshot, lease y ledger en tmp_path)."""
+    import main
+    monkeypatch.setattr(main, "STATS_DB", str(tmp_path / "stats.db"))
+    monkeypatch.setattr(main, "SNAPSHOT_DB", str(tmp_path / "snapshot.db"))
+    monkeypatch.setattr(main, "LEASE_FILE", str(tmp_path / "fixit.lease"))
+    monkeypatch.setattr(main, "LEDGER_DIR", str(tmp_path / "ledger"))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,119 @@
+"""ApiClient: token bucket, ritmo por cabeceras de cuota, 429 y circuit breaker."""
+import pytest
+
+import api_client
+from api_client import ApiClient, CircuitBreaker, CircuitOpenError, RateGovernor, TokenBucket
+
+
+class FakeClock:
+    """Sustituye al módulo time de api_client: sleep() avanza el reloj."""
+
+    def __init__(self):
+        self.now    = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    perf_counter = monotonic
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(api_client, "time", fake)
+    monkeypatch.setattr(api_client.random, "uniform", lambda a, b: 0.0)
+    return fake
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers: dict = None, text: str = ""):
+        self.status_code = status_code
+        self.headers     = headers or {}
+        self.text        = text
+
+
+class FakeSession:
+    def __init__(self, responses: list):
+        self.responses = list(responses)
+        self.calls     = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, params))
+        return self.responses.pop(0)
+
+
+def test_token_bucket_spaces_requests_at_the_configured_rate(clock):
+    bucket = TokenBucket(rate_per_min=60, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0)
+    assert bucket.reserve() == pytest.approx(2.0)
+    clock.now += 10
+    assert bucket.reserve() == 0.0
+
+
+def test_governor_spreads_remaining_quota_until_reset(clock):
+    governor = RateGovernor(rate_per_min=600)
+    governor.update({"X-Requests-Available-Minute": "4", "X-RequestCounter-Reset": "8"})
+    start = clock.now
+    waits = [governor.acquire() for _ in range(4)]
+    assert waits[0] == 0.0 and all(w >= 2.0 for w in waits[1:])
+    assert clock.now - start < 8.0
+    # Cuota agotada: nadie sale antes del reset anunciado
+    governor.acquire()
+    assert clock.now == pytest.approx(start + 8.0)
+
+
+def test_governor_falls_back_to_bucket_when_headers_go_stale(clock):
+    governor = RateGovernor(rate_per_min=60, header_ttl=120)
+    governor.update({"X-Requests-Available-Minute": "0", "X-RequestCounter-Reset": "30"})
+    assert governor.acquire() == pytest.approx(30.0)
+    clock.now += 500
+    assert governor.acquire() == 0.0
+    assert governor.acquire() == pytest.approx(1.0)
+
+
+def test_governor_ignores_malformed_headers_and_honours_retry_after(clock):
+    governor = RateGovernor(rate_per_min=6000, burst=10)
+    governor.update({"X-Requests-Available-Minute": "many", "X-RequestCounter-Reset": "8"})
+    assert governor.acquire() == 0.0
+    governor.block_for(5)
+    assert governor.acquire() == pytest.approx(5.0)
+
+
+def test_circuit_breaker_opens_and_half_opens(clock):
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    assert breaker.record_failure("competition:CL") is False
+    assert breaker.record_failure("competition:CL") is True
+    assert not breaker.allow("competition:CL") and breaker.allow("competition:PL")
+    assert breaker.open_keys() == ["competition:CL"]
+    clock.now += 61
+    assert breaker.allow("competition:CL")        # una petición de prueba
+    assert not breaker.allow("competition:CL")
+    breaker.record_success("competition:CL")
+    assert breaker.allow("competition:CL") and breaker.open_keys() == []
+
+
+def test_client_retries_429_after_retry_after(clock):
+    client = ApiClient("token", rate_per_min=6000, burst=10, max_retries=2)
+    client.session = FakeSession([FakeResponse(429, {"Retry-After": "3"}), FakeResponse(200)])
+    resp = client.get("https://api.test/matches", "matches", params={"apiKey": "secret"})
+    assert resp.status_code == 200
+    assert len(client.session.calls) == 2
+    assert client.session.calls[0] == ("https://api.test/matches", {"apiKey": "secret"})
+    assert sum(clock.sleeps) >= 3.0
+
+
+def test_client_opens_circuit_on_plan_errors(clock):
+    client = ApiClient("token", rate_per_min=6000, burst=10, breaker_threshold=2)
+    client.session = FakeSession([FakeResponse(403, text="restricted")] * 2)
+    for _ in range(2):
+        assert client.get("https://api.test/competitions/CL/matches", "competition_matches",
+                          circuit_key="competition:CL").status_code == 403
+    with pytest.raises(CircuitOpenError):
+        client.get("https://api.test/competitions/CL/matches", "competition_matches", circuit_key="competition:CL")
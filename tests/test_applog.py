@@ -0,0 +1,115 @@
+"""Logs estructurados: ring buffer, filtro de nivel, fase por hilo, paginación y escritor de fondo."""
+import io
+import threading
+
+import pytest
+
+from applog import LEVELS, LogSink, RingLog, parse_level
+
+
+def test_parse_level():
+    assert parse_level("warning") == parse_level(" WARNING ") == parse_level(30) == LEVELS["WARNING"]
+    with pytest.raises(ValueError):
+        parse_level("verbose")
+
+
+def test_ring_keeps_last_records_and_filters_at_source():
+    ring = RingLog(capacity=3, level="INFO")
+    assert ring.log("oculto", "DEBUG") is None
+    for i in range(5):
+        ring.log(f"m{i}")
+    assert [r.msg for r in ring.query()["records"]] == ["m2", "m3", "m4"]
+    assert ring.counters()["records"] == 5 and ring.counters()["buffered"] == 3
+
+
+def test_phase_is_per_thread():
+    ring = RingLog()
+    seen = {}
+
+    def other():
+        seen["other"] = ring.log("otro hilo").phase
+
+    with ring.phase("fetch"):
+        ring.log("dentro")
+        thread = threading.Thread(target=other)
+        thread.start()
+        thread.join()
+        ring.log("explícita", phase="persist")
+    ring.log("fuera")
+    assert [r.phase for r in ring.query()["records"]] == ["fetch", None, "persist", None]
+    assert seen["other"] is None
+
+
+def test_query_pages_by_cursor_with_filters():
+    ring = RingLog(capacity=100)
+    for i in range(10):
+        ring.log(f"m{i}", "WARNING" if i % 2 else "INFO", fixture_id=i % 3)
+    latest = ring.query(level="warning", limit=2)
+    assert [r.msg for r in latest["records"]] == ["m7", "m9"] and latest["next"] == 10
+
+    page = ring.query(since=0, level="WARNING", limit=2)
+    assert [r.msg for r in page["records"]] == ["m1", "m3"] and page["next"] == 4
+    page = ring.query(since=page["next"], level="WARNING", limit=2)
+    assert [r.msg for r in page["records"]] == ["m5", "m7"]
+    page = ring.query(since=page["next"], level="WARNING", limit=2)
+    assert [r.msg for r in page["records"]] == ["m9"] and page["next"] == 10
+    assert ring.query(since=page["next"])["records"] == []
+
+    assert [r.msg for r in ring.query(since=0, fixture_id="2")["records"]] == ["m2", "m5", "m8"]
+    # Cursor de otro proceso o anterior a un reinicio: no se salta los nuevos
+    assert ring.query(since=50)["next"] == 10
+    ring.log("nuevo")
+    assert [r.msg for r in ring.query(since=10)["records"]] == ["nuevo"]
+
+
+def test_query_reports_truncation_when_ring_dropped_unread_records():
+    ring = RingLog(capacity=3)
+    for i in range(6):
+        ring.log(f"m{i}")
+    page = ring.query(since=1)
+    assert page["truncated"] and [r.msg for r in page["records"]] == ["m3", "m4", "m5"]
+    assert not ring.query(since=3)["truncated"]
+
+
+def test_format_and_dict():
+    ring = RingLog()
+    record = ring.log("hola", "ERROR", phase="settle", fixture_id=42)
+    assert record.format().endswith("[ERROR][settle][fx:42] hola")
+    assert ring.log("info").format().endswith(f"[PID:{record.pid}] info")
+    assert record.to_dict()["level"] == "ERROR" and record.to_dict()["fixture_id"] == 42
+
+
+def test_sink_writes_batches_to_stream_and_file(tmp_path):
+    stream = io.StringIO()
+    path = tmp_path / "engine.log"
+    ring = RingLog(sink=LogSink(str(path), stream=stream))
+    for i in range(3):
+        ring.log(f"línea {i}")
+    ring.sink.flush()
+    ring.sink.close()
+    assert stream.getvalue().count("\n") == 3 and "línea 2" in stream.getvalue()
+    assert path.read_text(encoding="utf-8") == stream.getvalue()
+
+
+class BlockingStream:
+    def __init__(self):
+        self.release = threading.Event()
+        self.text    = []
+
+    def write(self, text):
+        self.release.wait(5)
+        self.text.append(text)
+
+    def flush(self):
+        pass
+
+
+def test_full_queue_drops_lines_but_keeps_records():
+    stream = BlockingStream()
+    ring = RingLog(sink=LogSink(maxsize=1, stream=stream))
+    for i in range(5):
+        ring.log(f"m{i}")
+    assert ring.counters()["dropped"] >= 2
+    assert len(ring.query()["records"]) == 5
+    stream.release.set()
+    ring.sink.close()
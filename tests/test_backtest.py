@@ -0,0 +1,118 @@
+"""Backtest histórico: dataset por competición-temporada, sin mirar al futuro y métricas del 1X2."""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import backtest
+import main
+
+
+def _season(comp, start, teams=6, seed=3, odds=False):
+    """Doble vuelta de `teams` equipos, una jornada por semana desde `start`."""
+    base = {"PL": 1, "PD": 2}[comp]
+    rng, matches, match_id = random.Random(seed), [], base * 1_000_000 + start.year * 100
+    ids = [base * 100 + t for t in range(teams)]
+    rounds = [(h, a) for h in ids for a in ids if h != a]
+    for n, (home, away) in enumerate(rounds):
+        match_id += 1
+        m = {"id": match_id, "status": "FINISHED", "competition": {"code": comp},
+             "utcDate": (start + timedelta(days=7 * (n // (teams // 2)))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+             "homeTeam": {"id": home}, "awayTeam": {"id": away},
+             "score": {"fullTime": {"home": rng.randint(0, 4), "away": rng.randint(0, 3)}}}
+        if odds:
+            m["odds"] = {"homeWin": round(rng.uniform(1.5, 4.0), 2), "draw": 3.4, "awayWin": 3.1}
+        matches.append(m)
+    return matches
+
+
+START = datetime(2025, 8, 16, 15, 0, tzinfo=timezone.utc)
+
+
+def test_load_dataset_dedupes_and_shards_by_competition_season(tmp_path):
+    pl, pd_ = _season("PL", START), _season("PD", START)
+    nxt = _season("PL", START.replace(year=2026), seed=4)
+    (tmp_path / "pl.json").write_text(json.dumps({"matches": pl + nxt[:3]}))
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "list.json").write_text(json.dumps(pd_ + pl[:5]))
+    # Entrada grabada por replay.Recorder, con un partido sin terminar que se descarta
+    timed = dict(pl[0], id=1, status="TIMED")
+    (tmp_path / "rec.json").write_text(json.dumps({"url": "/matches", "status": 200,
+                                                   "body": json.dumps({"matches": nxt[3:] + [timed]})}))
+    (tmp_path / "roto.json").write_text("{")
+
+    shards = backtest.load_dataset(str(tmp_path))
+    assert {k: len(v) for k, v in shards.items()} == {("PL", "2025"): len(pl), ("PD", "2025"): len(pd_),
+                                                      ("PL", "2026"): len(nxt)}
+    for matches in shards.values():
+        assert [m["utcDate"] for m in matches] == sorted(m["utcDate"] for m in matches)
+    assert set(backtest.load_dataset(str(tmp_path), {"PD"})) == {("PD", "2025")}
+
+
+def test_parse_grid_is_a_cartesian_product_over_defaults():
+    grid = backtest.parse_grid(["value_edge=0.05,0.1", "fatigue_penalty=0.9,1.0"])
+    assert len(grid) == 4
+    assert {g["confidence"] for g in grid} == {backtest.DEFAULT_PARAMS["confidence"]}
+    assert {(g["value_edge"], g["fatigue_penalty"]) for g in grid} == \
+        {(0.05, 0.9), (0.05, 1.0), (0.1, 0.9), (0.1, 1.0)}
+    assert backtest.parse_grid([]) == [backtest.DEFAULT_PARAMS]
+    with pytest.raises(SystemExit):
+        backtest.parse_grid(["umbral=1"])
+
+
+def test_replay_inputs_only_see_earlier_matches():
+    matches = _season("PL", START)
+    inputs = backtest._replay_inputs(matches, main.FEATURE_EWM_ALPHA, "PL")
+    # Primera jornada: nadie tiene historial
+    first = main.compute_lambdas(None, None)
+    assert inputs["lam_home"][0] == pytest.approx(first[0]) and inputs["lam_away"][0] == pytest.approx(first[1])
+    # Cambiar el último resultado no altera ninguna λ: no hay fuga de información
+    changed = [dict(m) for m in matches]
+    changed[-1]["score"] = {"fullTime": {"home": 9, "away": 0}}
+    again = backtest._replay_inputs(changed, main.FEATURE_EWM_ALPHA, "PL")
+    assert np.array_equal(again["lam_home"], inputs["lam_home"])
+    assert again["goals"][-1].tolist() == [9, 0]
+    # Pero sí las de los partidos posteriores a un cambio anterior
+    changed[0]["score"] = {"fullTime": {"home": 9, "away": 0}}
+    assert not np.array_equal(backtest._replay_inputs(changed, main.FEATURE_EWM_ALPHA, "PL")["lam_home"],
+                              inputs["lam_home"])
+
+
+def test_shard_metrics_match_the_scalar_model():
+    matches = _season("PL", START, odds=True)
+    params = dict(backtest.DEFAULT_PARAMS, fatigue_penalty=1.0)
+    [(_, acc)] = backtest.run_shard((("PL", "2025"), matches, [params], main.FEATURE_EWM_ALPHA, 8, True))
+    inputs = backtest._replay_inputs(matches, main.FEATURE_EWM_ALPHA, "PL")
+
+    brier = logloss = profit = 0.0
+    staked = 0
+    for m, lh, la in zip(matches, inputs["lam_home"], inputs["lam_away"]):
+        probs = main.calculate_1x2_poisson(lh, la)
+        h, a = m["score"]["fullTime"]["home"], m["score"]["fullTime"]["away"]
+        actual = 0 if h > a else 1 if h == a else 2
+        brier += sum((p - (i == actual)) ** 2 for i, p in enumerate(probs))
+        logloss -= np.log(probs[actual])
+        odd = m["odds"]["homeWin"]
+        if probs[0] * odd - 1.0 > params["value_edge"]:
+            staked += 1
+            profit += odd - 1.0 if actual == 0 else -1.0
+    assert acc["matches"] == len(matches)
+    assert acc["brier_sum"] == pytest.approx(brier, rel=1e-9)
+    assert acc["logloss_sum"] == pytest.approx(logloss, rel=1e-9)
+    _, _, staked_home, profit_home = acc["markets"]["home_win|PL"]
+    assert staked > 0 and (staked_home, profit_home) == (staked, pytest.approx(profit))
+    assert acc["calibration"][2].sum() == 3 * len(matches)
+
+
+def test_run_backtest_aggregates_shards_per_grid_point():
+    shards = {("PL", "2025"): _season("PL", START), ("PD", "2025"): _season("PD", START, seed=5)}
+    grid = backtest.parse_grid(["fatigue_penalty=0.9,1.0"])
+    reports = backtest.run_backtest(shards, grid, workers=2)
+    assert [r["params"] for r in reports] == grid
+    for report in reports:
+        assert report["matches"] == 60 and set(report["by_competition"]) == {"PD", "PL"}
+        assert sum(b["n"] for b in report["calibration"]) == 3 * 60
+        assert report["roi"] is None           # sin cuotas no hay apuestas con valor
+        assert 0.0 < report["brier"] < 2.0 and report["log_loss"] > 0.0
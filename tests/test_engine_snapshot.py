@@ -0,0 +1,77 @@
+"""Lectura sin lock: EngineSnapshot inmutable publicado con una sola asignación."""
+import threading
+
+import pytest
+
+import main
+from records import Pick
+
+
+def _pick(fixture_id: int) -> Pick:
+    return Pick(fixture_id, f"L{fixture_id} vs V{fixture_id}", "Premier League", "home_win", 0.55, "PRO", 0.2,
+                1.6, 1.1, "01-03-2026", "16:00")
+
+
+@pytest.fixture
+def engine(engine_paths):
+    return main.FixItPRO()
+
+
+def test_snapshot_is_read_only(engine):
+    engine.stats["historial"] = [{"equipos": "A vs B"}]
+    engine.stats["ligas"] = {"LaLiga": 4, "Serie A": 7, "PL": 1, "BL1": 2}
+    engine._swap_snapshot(stats=True)
+    snap = engine.snapshot
+    with pytest.raises(TypeError):
+        snap.stats["ganadas"] = 99
+    with pytest.raises(TypeError):
+        snap.stats["historial"][0]["equipos"] = "C vs D"
+    assert snap.top_leagues == (("Serie A", 7), ("LaLiga", 4), ("BL1", 2))
+    # Cambios posteriores del motor no alteran el snapshot ya publicado
+    engine.stats["historial"].append({"equipos": "E vs F"})
+    assert len(snap.stats["historial"]) == 1
+
+
+def test_swap_rebuilds_only_what_changed(engine):
+    with engine._lock:
+        engine.cached_picks = [_pick(1), _pick(1), _pick(2)]
+    engine._swap_snapshot(picks=True)
+    first = engine.snapshot
+    assert [m["id"] for m in first.sidebar["Premier League"]] == [1, 2]
+
+    engine.last_updated = "12:00"
+    second = engine.snapshot
+    assert second.version == first.version + 1 and second.last_updated == "12:00"
+    assert second.picks is first.picks and second.sidebar is first.sidebar and second.stats is first.stats
+
+    engine._swap_snapshot(stats=True)
+    assert engine.snapshot.stats is not first.stats and engine.snapshot.picks is first.picks
+
+
+def test_readers_never_see_a_half_built_snapshot(engine, monkeypatch):
+    stop, torn = threading.Event(), []
+
+    def reader():
+        while not stop.is_set():
+            snap = main.get_snapshot()
+            if len(snap.picks) != int(snap.last_updated or 0):
+                torn.append(snap.version)
+
+    with engine._lock:
+        engine._last_updated = "0"
+        engine._swap_snapshot(picks=True)
+    monkeypatch.setattr(main, "engine", engine)
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    try:
+        for t in threads:
+            t.start()
+        for n in range(1, 200):
+            with engine._lock:
+                engine.cached_picks = [_pick(i) for i in range(n)]
+                engine._last_updated = str(n)
+                engine._swap_snapshot(picks=True)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    assert torn == []
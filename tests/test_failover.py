@@ -0,0 +1,54 @@
+"""Paso de follower a líder: el estado privado del líder anterior no se pierde."""
+import main
+from records import Pick
+
+
+def _pick(fixture_id: int) -> Pick:
+    return Pick(fixture_id, "Local vs Visitante", "Premier League", "home_win", 0.55, "PRO", 0.2,
+                1.6, 1.1, "01-03-2026", "16:00")
+
+
+def test_follower_promoted_to_leader_keeps_pending_and_settled(engine_paths, monkeypatch):
+    leader = main.FixItPRO()
+    leader.role = "leader"
+    leader.pending.register(101, "2026-03-01T15:00:00Z", "PL", [_pick(101)])
+    leader.settled.add(202)
+    leader.save_stats()
+    leader.publish_snapshot()
+
+    follower = main.FixItPRO()
+    follower.role = "follower"
+    follower.refresh_from_snapshot()
+    # Picks pendientes publicados después de que el follower arrancara
+    leader.pending.register(103, "2026-03-02T15:00:00Z", "PL", [_pick(103)])
+    leader.settled.add(204)
+    leader.save_stats()
+
+    monkeypatch.setattr(follower.sync, "submit", lambda comps=None: None)
+    monkeypatch.setattr(follower, "start_scheduler", lambda: None)
+    follower.become_leader()
+    follower.save_stats()
+
+    store = main.StatsStore(main.STATS_DB)
+    stats = store.load()
+    assert set(stats["pending_picks"]) == {"101", "103"}
+    assert set(stats["processed_fixtures"]) == {202, 204}
+    assert 103 in follower.pending and 204 in follower.settled
+    store.close()
+
+
+def test_follower_merges_published_keys_only(engine_paths):
+    leader = main.FixItPRO()
+    leader.role = "leader"
+    leader.pending.register(101, "2026-03-01T15:00:00Z", "PL", [_pick(101)])
+    leader.stats["historial"] = [{"teams": "A vs B"}]
+    leader.save_stats()
+    leader.publish_snapshot()
+
+    follower = main.FixItPRO()
+    follower.role = "follower"
+    follower.stats["historial"] = []
+    follower.refresh_from_snapshot()
+    assert follower.stats["historial"] == [{"teams": "A vs B"}]
+    assert "101" in follower.stats["pending_picks"]
+    assert follower.stats["processed_fixtures"] is follower.settled
@@ -0,0 +1,62 @@
+"""TeamFeatureStore: medias exponenciales incrementales por equipo."""
+from datetime import datetime, timezone
+
+import pytest
+
+from features import TeamFeatureStore
+from records import MatchRow
+
+DAY = 86400.0
+
+
+def _row(match_id, day, home_id, away_id, home_goals, away_goals, comp="PL"):
+    return MatchRow(match_id, day * DAY, home_id, away_id, home_goals, away_goals, comp)
+
+
+def test_ewm_matches_reference_and_splits():
+    store = TeamFeatureStore(alpha=0.5)
+    store.ingest([_row(1, 1, 10, 20, 2, 0), _row(2, 2, 30, 10, 1, 1), _row(3, 3, 10, 40, 4, 2)])
+    team = store.get(10)
+    assert team.matches == 3 and team.home_matches == 2 and team.away_matches == 1
+    # Media sin sesgo: pesos 0.125, 0.25, 0.5 sobre 2, 1, 4 goles a favor
+    scored = (0.125 * 2 + 0.25 * 1 + 0.5 * 4) / (0.125 + 0.25 + 0.5)
+    assert team.goals() == pytest.approx((scored, (0.25 * 1 + 0.5 * 2) / 0.875))
+    assert team.goals("home", min_matches=2) == pytest.approx(((0.25 * 2 + 0.5 * 4) / 0.75, (0.5 * 2) / 0.75))
+    # Sin partidos suficientes como visitante usa el total
+    assert team.goals("away", min_matches=2) == team.goals()
+
+
+def test_duplicates_are_ignored():
+    store = TeamFeatureStore()
+    rows = [_row(1, 1, 10, 20, 2, 0), _row(2, 2, 20, 10, 1, 3)]
+    assert store.ingest(rows) == 4
+    version = store.get(10).version()
+    assert store.ingest(rows) == 0
+    assert store.get(10).version() == version
+
+
+def test_cup_match_before_older_league_matches_is_rebuilt():
+    """Las competiciones se ingieren una a una: una copa reciente no tapa la liga anterior."""
+    cup = [_row(100, 100, 10, 99, 1, 0, "CL")]
+    league = [_row(60 + d, d, 10, 20 + d, 2, 1) for d in range(68, 100, 6)]
+
+    per_comp = TeamFeatureStore(alpha=0.3)
+    per_comp.ingest(cup)
+    per_comp.ingest(league)
+
+    batch = TeamFeatureStore(alpha=0.3)
+    batch.ingest(cup + league)
+
+    team = per_comp.get(10)
+    assert team.matches == len(league) + 1
+    assert team.last_match_id == 100
+    assert team.goals() == pytest.approx(batch.get(10).goals())
+    assert team.goals() != pytest.approx((1.0, 0.0))
+
+
+def test_rest_days_uses_last_kickoff():
+    store = TeamFeatureStore()
+    kickoff = datetime(2026, 3, 1, 20, 0, tzinfo=timezone.utc).timestamp()
+    store.ingest([MatchRow(1, kickoff, 10, 20, 1, 0)])
+    assert store.get(10).rest_days(datetime(2026, 3, 4, 9, 0)) == 3
+    assert store.get(999) is None
@@ -0,0 +1,72 @@
+"""Huella de entradas por partido: los partidos sin cambios reutilizan sus picks guardados."""
+from datetime import datetime
+
+import pytest
+import pytz
+
+import main
+from records import MatchRow
+
+TZ    = pytz.timezone("Europe/Madrid")
+TODAY = TZ.localize(datetime(2026, 3, 10, 10, 0))
+
+
+class Features:
+    def __init__(self, version):
+        self._version = version
+
+    def version(self):
+        return self._version
+
+
+def _fixture(fixture_id=1, odds=(2.1, 3.4, 3.2)):
+    return {"id": fixture_id, "comp": "PL", "home_id": 10, "away_id": 20, "teams": "A vs B", "league": "PL",
+            "spain_dt": TZ.localize(datetime(2026, 3, 10, 21, 0)), "odds": odds}
+
+
+def test_fingerprint_depends_on_every_input(monkeypatch):
+    base = main.fixture_fingerprint(_fixture(), Features("a"), Features("b"), TODAY)
+    assert base == main.fixture_fingerprint(_fixture(), Features("a"), Features("b"), TODAY)
+    assert base != main.fixture_fingerprint(_fixture(odds=(2.2, 3.4, 3.2)), Features("a"), Features("b"), TODAY)
+    assert base != main.fixture_fingerprint(_fixture(), Features("a2"), Features("b"), TODAY)
+    assert base != main.fixture_fingerprint(_fixture(), Features("a"), None, TODAY)
+    assert base != main.fixture_fingerprint(_fixture(), Features("a"), Features("b"),
+                                            TZ.localize(datetime(2026, 3, 11, 10, 0)))
+    monkeypatch.setattr(main, "MODEL_VERSION", "otra")
+    assert base != main.fixture_fingerprint(_fixture(), Features("a"), Features("b"), TODAY)
+
+
+@pytest.fixture
+def engine(engine_paths, monkeypatch):
+    engine = main.FixItPRO()
+    evaluated = []
+    original = engine._evaluate_fixtures
+    monkeypatch.setattr(engine, "_evaluate_fixtures",
+                        lambda fixtures, today: evaluated.extend(fx["id"] for fx in fixtures) or original(fixtures, today))
+    engine.evaluated = evaluated
+    return engine
+
+
+def test_unchanged_fixtures_reuse_saved_picks(engine):
+    first = engine._score_fixtures([_fixture(1), _fixture(2)], TODAY)
+    assert engine.evaluated == [1, 2] and first
+    again = engine._score_fixtures([_fixture(1), _fixture(2)], TODAY)
+    assert engine.evaluated == [1, 2]
+    assert again == first
+    assert set(engine.stats["fixture_picks"]) == {"1", "2"}
+
+
+def test_changed_inputs_recompute_only_that_fixture(engine, monkeypatch):
+    engine._score_fixtures([_fixture(1), _fixture(2)], TODAY)
+    engine._score_fixtures([_fixture(1, odds=(1.5, 4.0, 6.0)), _fixture(2)], TODAY)
+    assert engine.evaluated == [1, 2, 1]
+
+    # Un nuevo ajuste de la liga invalida todos sus partidos
+    monkeypatch.setattr(main.LEAGUE_MODELS, "fit_id", lambda comp: "refit")
+    engine._score_fixtures([_fixture(1, odds=(1.5, 4.0, 6.0)), _fixture(2)], TODAY)
+    assert engine.evaluated == [1, 2, 1, 1, 2]
+
+    # Y también una nueva versión de las features de un equipo
+    engine.features.ingest([MatchRow(99, TODAY.timestamp() - 7 * 86400, 10, 30, 2, 1, "PL")])
+    engine._score_fixtures([_fixture(1, odds=(1.5, 4.0, 6.0))], TODAY)
+    assert engine.evaluated[-1] == 1 and len(engine.evaluated) == 6
@@ -0,0 +1,93 @@
+"""Ajuste por competición: recuperación de fuerzas, condiciones de máxima verosimilitud y reajustes."""
+import numpy as np
+import pytest
+
+from fitting import LeagueModels, fit_league, fit_signature
+from records import MatchRow
+
+DAY = 86400.0
+NOW = 400 * DAY
+
+
+def _season(attack, defence, home_avg=1.5, away_avg=1.1, rounds=4, seed=3):
+    """Todos contra todos `rounds` veces con goles Poisson de los parámetros dados."""
+    rng, rows, match_id = np.random.default_rng(seed), [], 0
+    teams = list(attack)
+    for r in range(rounds):
+        for h in teams:
+            for a in teams:
+                if h == a:
+                    continue
+                lam_h = home_avg * attack[h] * defence[a]
+                lam_a = away_avg * attack[a] * defence[h]
+                match_id += 1
+                rows.append(MatchRow(match_id, NOW - (rounds - r) * 7 * DAY, h, a,
+                                     int(rng.poisson(lam_h)), int(rng.poisson(lam_a)), "PL"))
+    return rows
+
+
+ATTACK  = {1: 1.6, 2: 1.2, 3: 1.0, 4: 0.9, 5: 0.8, 6: 0.7}
+DEFENCE = {1: 0.6, 2: 0.8, 3: 1.0, 4: 1.1, 5: 1.3, 6: 1.4}
+
+
+def _normalized(strengths: dict) -> dict:
+    mean = np.exp(np.mean(np.log(list(strengths.values()))))
+    return {t: s / mean for t, s in strengths.items()}
+
+
+def test_recovers_generating_parameters():
+    fit = fit_league("PL", _season(ATTACK, DEFENCE, rounds=40), NOW, prior_matches=0.5)
+    assert fit.matches == 6 * 5 * 40 and fit.iterations < 200
+    attack, defence = _normalized(ATTACK), _normalized(DEFENCE)
+    for team in ATTACK:
+        assert fit.attack[team] == pytest.approx(attack[team], rel=0.15)
+        assert fit.defence[team] == pytest.approx(defence[team], rel=0.15)
+    assert np.exp(np.mean(np.log(list(fit.attack.values())))) == pytest.approx(1.0)
+    assert fit.lambdas(1, 6)[0] > fit.lambdas(6, 1)[0]
+    assert fit.lambdas(1, 99) is None
+
+
+def test_without_prior_expected_goals_match_observed():
+    """Sin prior, en el máximo de verosimilitud los goles esperados de cada equipo igualan a los marcados."""
+    rows = _season(ATTACK, DEFENCE, rounds=3)
+    fit = fit_league("PL", rows, NOW, prior_matches=0.0, tol=1e-10, max_iter=2000)
+    for team in ATTACK:
+        expected = sum(fit.lambdas(r.home_id, r.away_id)[0] for r in rows if r.home_id == team)
+        expected += sum(fit.lambdas(r.home_id, r.away_id)[1] for r in rows if r.away_id == team)
+        scored = sum(r.home_goals for r in rows if r.home_id == team)
+        scored += sum(r.away_goals for r in rows if r.away_id == team)
+        assert expected == pytest.approx(scored, rel=1e-6)
+    home_goals = sum(r.home_goals for r in rows)
+    assert sum(fit.lambdas(r.home_id, r.away_id)[0] for r in rows) == pytest.approx(home_goals, rel=1e-6)
+
+
+def test_decay_favours_recent_form():
+    # El equipo 1 marcaba poco hace un año y mucho ahora
+    old = [MatchRow(i, NOW - 300 * DAY, 1, 2 + i % 3, 0, 1, "PL") for i in range(20)]
+    new = [MatchRow(100 + i, NOW - 5 * DAY, 1, 2 + i % 3, 3, 1, "PL") for i in range(20)]
+    flat  = fit_league("PL", old + new, NOW)
+    decay = fit_league("PL", old + new, NOW, decay_per_day=0.02)
+    assert decay.attack[1] > flat.attack[1]
+
+
+def test_warm_start_reaches_same_fit():
+    rows = _season(ATTACK, DEFENCE)
+    cold = fit_league("PL", rows, NOW, tol=1e-10, max_iter=1000)
+    warm = fit_league("PL", rows, NOW, previous=cold, tol=1e-10, max_iter=1000)
+    assert warm.iterations < cold.iterations
+    for team in ATTACK:
+        assert warm.attack[team] == pytest.approx(cold.attack[team], rel=1e-6)
+    assert fit_league("PL", [], NOW) is None
+
+
+def test_league_models_refit_only_when_inputs_change():
+    rows = _season(ATTACK, DEFENCE, rounds=2)
+    models = LeagueModels(min_matches=10)
+    assert not models.refit("PL", rows[:5], NOW)
+    assert models.refit("PL", rows, NOW)
+    assert models.fit_id("PL") == fit_signature(rows, NOW)
+    assert not models.refit("PL", list(reversed(rows)), NOW)
+    assert models.refit("PL", rows, NOW + DAY)           # cambia el día de referencia del decay
+    assert models.refit("PL", rows[:-1], NOW + DAY)
+    assert models.summary()["PL"]["matches"] == len(rows) - 1
+    assert models.get("CL") is None and models.fit_id("CL") is None
@@ -0,0 +1,65 @@
+"""TeamHistoryCache: TTL, invalidación por partido jugado, LRU y formato persistido."""
+import time
+from datetime import datetime, timezone
+
+import main
+from records import MatchRow
+
+DAY = 86400.0
+
+
+def _rows(team_id, n, start=1_770_000_000.0):
+    return [MatchRow(team_id * 100 + i, start - i * 7 * DAY, team_id, 99, 1, 0, "PL") for i in range(n)]
+
+
+def test_hit_miss_and_limit():
+    cache = main.TeamHistoryCache(ttl_seconds=3600, max_teams=10)
+    assert cache.get(1, 5) is None
+    cache.put(1, _rows(1, 5))
+    assert [m.id for m in cache.get(1, 3)] == [100, 101, 102]
+    assert cache.get(1, 6) is None            # pide más de los que hay
+    assert cache.counters() == {"teams": 1, "hits": 1, "misses": 2, "stale": 0, "hit_ratio": 0.333}
+
+
+def test_ttl_expiry_is_stale():
+    cache = main.TeamHistoryCache(ttl_seconds=3600, max_teams=10)
+    cache.put(1, _rows(1, 5))
+    cache._entries["1"]["fetched_at"] -= 3601
+    assert cache.get(1, 5) is None and cache.stale == 1
+
+
+def test_team_played_since_download_invalidates_for_later_fixtures():
+    cache = main.TeamHistoryCache(ttl_seconds=30 * DAY, max_teams=10)
+    cache.put(1, _rows(1, 5))
+    fetched_at = cache._entries["1"]["fetched_at"]
+    played = fetched_at + DAY
+    cache.mark_played(1, played)
+    cache.mark_played(1, played - 5 * DAY)    # un kickoff anterior no retrocede la marca
+    before = datetime.fromtimestamp(played - 3600, timezone.utc)
+    after  = datetime.fromtimestamp(played + 3600, timezone.utc)
+    assert cache.get(1, 5, as_of=before) is not None
+    assert cache.get(1, 5, as_of=after) is None
+
+
+def test_lru_eviction():
+    cache = main.TeamHistoryCache(ttl_seconds=3600, max_teams=2)
+    cache.put(1, _rows(1, 5))
+    cache.put(2, _rows(2, 5))
+    cache.get(1, 5)                            # 1 pasa a ser el más reciente
+    cache.put(3, _rows(3, 5))
+    assert set(cache.to_dict()) == {"1", "3"}
+
+
+def test_load_persisted_rows_and_legacy_lists():
+    cache = main.TeamHistoryCache(ttl_seconds=3600, max_teams=10)
+    legacy_payload = {"id": 7, "utcDate": "2026-02-01T15:00:00Z", "status": "FINISHED",
+                      "homeTeam": {"id": 2}, "awayTeam": {"id": 9}, "score": {"fullTime": {"home": 0, "away": 0}}}
+    cache.load({
+        "1": {"fetched_at": time.time(), "matches": [r.to_row() for r in _rows(1, 5)]},
+        "2": [legacy_payload] * 5,
+        "3": "basura",
+    })
+    assert set(cache.to_dict()) == {"1", "2"}
+    assert isinstance(cache.to_dict()["2"]["matches"][0], MatchRow)
+    assert len(cache.get(1, 5)) == 5
+    assert cache.get(2, 5) is None and cache.stale == 1   # lista sin fecha: nace caducada
@@ -0,0 +1,99 @@
+"""Historiales desde los listados por competición: ventana incremental, fusión e índice por equipo."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import main
+from records import MatchRow
+
+TODAY = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def _ts(day: int) -> float:
+    return (TODAY - timedelta(days=day)).timestamp()
+
+
+def _row(match_id, days_ago, home, away, comp="PL"):
+    return MatchRow(match_id, _ts(days_ago), home, away, 1, 0, comp)
+
+
+def _api(match_id, days_ago, home, away, comp="PL", status="FINISHED"):
+    kickoff = (TODAY - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {"id": match_id, "utcDate": kickoff, "status": status, "competition": {"code": comp},
+            "homeTeam": {"id": home}, "awayTeam": {"id": away}, "score": {"fullTime": {"home": 2, "away": 1}}}
+
+
+def test_window_is_incremental_with_one_day_overlap():
+    index = main.CompetitionHistoryIndex()
+    first = index.window_for("PL", TODAY)
+    assert first == ((TODAY - timedelta(days=main.BULK_HISTORY_DAYS)).strftime("%Y-%m-%d"), "2026-03-10")
+    index.merge("PL", [], "2026-03-10")
+    assert index.window_for("PL", TODAY + timedelta(days=2)) == ("2026-03-09", "2026-03-12")
+    assert index.window_for("CL", TODAY) == first
+
+
+def test_merge_dedupes_orders_and_trims_per_team():
+    index = main.CompetitionHistoryIndex(max_per_team=3)
+    assert index.merge("PL", [_row(1, 20, 10, 20), _row(2, 5, 30, 10), _row(3, 12, 10, 40)], "2026-03-10") == 6
+    assert index.merge("PL", [_row(2, 5, 30, 10), _row(4, 1, 10, 50)], "2026-03-10") == 2
+    assert [m.id for m in index.recent(10, 5)] == [4, 2, 3]
+    assert [m.id for m in index.recent(10, 2)] == [4, 2]
+    assert index.recent(999) == [] and len(index) == 5
+
+
+def test_competition_matches_keep_the_fit_window():
+    index = main.CompetitionHistoryIndex()
+    old = main.LEAGUE_FIT_WINDOW_DAYS + 5
+    index.merge("PL", [_row(1, old, 10, 20), _row(2, 3, 10, 20)], "2026-03-10")
+    index.merge("CL", [_row(3, 3, 10, 60, "CL")], "2026-03-10")
+    assert [m.id for m in index.competition_matches("PL")] == [2]
+    assert [m.id for m in index.competition_matches("CL")] == [3]
+
+
+class FakeResponse:
+    def __init__(self, status_code, matches=(), text=""):
+        self.status_code = status_code
+        self.text        = text
+        self._matches    = list(matches)
+
+    def json(self):
+        return {"matches": self._matches}
+
+
+class FakeApi:
+    def __init__(self, responses: dict):
+        self.responses = responses
+        self.urls      = []
+
+    def get(self, url, endpoint, circuit_key=None, timeout=None):
+        self.urls.append(url)
+        for fragment, response in self.responses.items():
+            if fragment in url:
+                return response
+        raise AssertionError(f"petición inesperada: {url}")
+
+
+@pytest.fixture
+def engine(engine_paths):
+    return main.FixItPRO()
+
+
+def test_refresh_history_index_one_request_per_competition(engine, monkeypatch):
+    engine.api = FakeApi({
+        "/competitions/PL/": FakeResponse(200, [_api(1, 3, 10, 20), _api(2, 10, 20, 10)]),
+        "/competitions/CL/": FakeResponse(200, [_api(3, 1, 10, 60, "CL")]),
+        "/competitions/BL1/": FakeResponse(403, text="restricted"),
+    })
+    engine.refresh_history_index(TODAY, ["PL", "CL", "BL1"])
+    assert len(engine.api.urls) == 3
+    assert all("status=FINISHED" in url and "dateTo=2026-03-10" in url for url in engine.api.urls)
+    assert [m.id for m in engine.history_index.recent(10)] == [3, 1, 2]
+    assert engine.features.get(10).matches == 3
+    # Una competición que falló vuelve a pedir la ventana completa
+    assert engine.history_index.window_for("BL1", TODAY) == engine.history_index.window_for("SA", TODAY)
+    assert engine.history_index.window_for("PL", TODAY)[0] == "2026-03-09"
+
+    # Con historial suficiente en el índice no se pide al API por equipo
+    monkeypatch.setattr(main, "HISTORY_MODE", "bulk")
+    assert [m.id for m in engine.fetch_team_history(10, limit=3)] == [3, 1, 2]
+    assert len(engine.api.urls) == 3
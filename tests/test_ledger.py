@@ -0,0 +1,118 @@
+"""PickLedger: segmentos NDJSON, índices sellados, agregados y consultas."""
+import json
+import os
+
+from ledger import PickLedger, pick_id
+
+
+def _pick(fixture, market="over_2_5", league="Premier League", date="01-03-2026", selection=""):
+    return {"id": fixture, "market_key": market, "selection": selection, "date": date, "time": "16:00",
+            "league": league, "teams": f"A{fixture} vs B{fixture}", "market": market,
+            "lam_home": 1.4, "lam_away": 1.1, "probability": 0.55, "odds": 1.9, "value": 0.045}
+
+
+def _segments(directory):
+    return sorted(n for n in os.listdir(directory) if n.endswith(".ndjson"))
+
+
+def test_append_picks_deduplicates_across_sealed_segments(tmp_path):
+    ledger = PickLedger(str(tmp_path), segment_bytes=600)
+    picks = [_pick(i) for i in range(12)]
+    assert ledger.append_picks(picks[:6] + picks[:2]) == 6
+    for pick in picks[6:]:
+        ledger.append_picks([pick])
+    assert len(_segments(tmp_path)) > 1
+    assert ledger.append_picks(picks) == 0
+    assert ledger.append_picks([_pick(3, selection="2-1", market="correct_score")]) == 1
+    assert ledger.counters()["picks"] == 13
+
+
+def test_outcomes_update_aggregates_and_survive_restart(tmp_path):
+    ledger = PickLedger(str(tmp_path), seed={"ganadas": 5, "perdidas": 2, "ligas": {"Serie A": 5}})
+    picks = [_pick(1), _pick(2, market="btts_yes", league="Serie A"), _pick(3)]
+    ledger.append_picks(picks)
+    graded = [(picks[0], "won", "3-1"), (picks[1], "lost", "0-0"), (picks[2], "push", "1-1")]
+    assert ledger.record_outcomes(graded) == 3
+    assert ledger.record_outcomes(graded[:1]) == 0
+
+    summary = ledger.summary()
+    assert (summary["won"], summary["lost"], summary["push"]) == (6, 3, 1)
+    assert summary["by_league"]["Serie A"] == {"won": 5, "lost": 1}
+    assert summary["by_market"]["over_2_5"] == {"won": 1, "lost": 0}
+    assert ledger.stats_view() == {"ganadas": 6, "perdidas": 3, "ligas": {"Serie A": 5, "Premier League": 1}}
+
+    assert PickLedger(str(tmp_path)).summary() == summary
+
+
+def test_outcomes_after_saved_aggregates_are_counted_on_start(tmp_path):
+    """Un corte entre el append y el guardado de aggregates.json no pierde resultados."""
+    ledger = PickLedger(str(tmp_path))
+    pick = _pick(1)
+    ledger.append_picks([pick])
+    ledger.record_outcomes([(pick, "won", "2-0")])
+    aggregates_path = tmp_path / "aggregates.json"
+    saved = json.loads(aggregates_path.read_text())
+
+    other = _pick(2)
+    ledger.append_picks([other])
+    ledger.record_outcomes([(other, "lost", "0-1")])
+    aggregates_path.write_text(json.dumps(saved))
+
+    summary = PickLedger(str(tmp_path)).summary()
+    assert (summary["won"], summary["lost"]) == (1, 1)
+
+
+def test_legacy_aggregates_without_watermark_are_not_recounted(tmp_path):
+    ledger = PickLedger(str(tmp_path))
+    pick = _pick(1)
+    ledger.append_picks([pick])
+    ledger.record_outcomes([(pick, "won", "2-0")])
+    aggregates_path = tmp_path / "aggregates.json"
+    legacy = json.loads(aggregates_path.read_text())
+    legacy.pop("counted_through")
+    aggregates_path.write_text(json.dumps(legacy))
+    assert PickLedger(str(tmp_path)).summary()["won"] == 1
+
+
+def test_query_filters_and_joins_outcomes_from_later_segments(tmp_path):
+    ledger = PickLedger(str(tmp_path), segment_bytes=500, sealed_cache=1)
+    early = [_pick(i, date="01-03-2026") for i in range(4)]
+    late  = [_pick(10 + i, league="La Liga", market="btts_yes", date="08-03-2026") for i in range(4)]
+    ledger.append_picks(early)
+    ledger.append_picks(late)
+    for i, pick in enumerate(early + late):
+        ledger.record_outcomes([(pick, "won" if i % 2 else "lost", "1-0")])
+    assert len(_segments(tmp_path)) > 2
+
+    records = list(ledger.query())
+    assert [r["pick_id"] for r in records] == [pick_id(p) for p in early + late]
+    assert [r["outcome"] for r in records] == ["won" if i % 2 else "lost" for i in range(8)]
+    assert all(r["settled_at"] for r in records)
+    assert ledger.counters()["sealed_cached"] <= 1
+
+    assert [r["fixture_id"] for r in ledger.query(league="La Liga", market="btts_yes")] == [10, 11, 12, 13]
+    assert [r["fixture_id"] for r in ledger.query(date_to="2026-03-01")] == [0, 1, 2, 3]
+    assert list(ledger.query(league="La Liga", date_to="2026-03-01")) == []
+
+
+def test_query_leaves_unsettled_picks_open(tmp_path):
+    ledger = PickLedger(str(tmp_path))
+    ledger.append_picks([_pick(1), _pick(2)])
+    ledger.record_outcomes([(_pick(2), "void", None)])
+    records = {r["fixture_id"]: r for r in ledger.query()}
+    assert (records[1]["outcome"], records[1]["settled_at"]) == (None, None)
+    assert records[2]["outcome"] == "void"
+    csv_text = "".join(ledger.export_csv())
+    assert csv_text.splitlines()[0].startswith("pick_id,ts,fixture_id") and len(csv_text.splitlines()) == 3
+
+
+def test_reader_catches_up_with_writer(tmp_path):
+    writer = PickLedger(str(tmp_path), segment_bytes=400)
+    reader = PickLedger(str(tmp_path), segment_bytes=400)
+    picks = [_pick(i) for i in range(6)]
+    for pick in picks:
+        writer.append_picks([pick])
+    writer.record_outcomes([(picks[0], "won", "1-0")])
+    assert [r["fixture_id"] for r in reader.query()] == list(range(6))
+    assert reader.summary()["won"] == 1
+    assert reader.append_picks(picks) == 0
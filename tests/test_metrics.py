@@ -0,0 +1,76 @@
+"""Métricas en memoria y su exposición en formato de texto de Prometheus."""
+import threading
+
+from metrics import Registry
+
+
+def test_counter_and_gauge_render_with_labels():
+    registry = Registry()
+    syncs = registry.counter("fixit_sync_total", "Sincronizaciones", ("result",))
+    ratio = registry.gauge("fixit_ratio", "Proporción")
+    syncs.inc(result="ok")
+    syncs.inc(2, result="ok")
+    syncs.inc(result='err "quoted"\n')
+    ratio.set(0.75)
+    text = registry.render()
+    assert "# TYPE fixit_sync_total counter" in text
+    assert 'fixit_sync_total{result="ok"} 3.0' in text
+    assert 'fixit_sync_total{result="err \\"quoted\\"\\n"} 1.0' in text
+    assert "fixit_ratio 0.75" in text and text.endswith("\n")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram("fixit_latency_seconds", "Latencia", ("endpoint",), buckets=(0.1, 1.0, 0.5))
+    for value in (0.05, 0.1, 0.3, 0.7, 4.0):
+        latency.observe(value, endpoint="matches")
+    lines = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    assert lines == [
+        'fixit_latency_seconds_bucket{endpoint="matches",le="0.1"} 2',
+        'fixit_latency_seconds_bucket{endpoint="matches",le="0.5"} 3',
+        'fixit_latency_seconds_bucket{endpoint="matches",le="1.0"} 4',
+        'fixit_latency_seconds_bucket{endpoint="matches",le="+Inf"} 5',
+        'fixit_latency_seconds_sum{endpoint="matches"} 5.15',
+        'fixit_latency_seconds_count{endpoint="matches"} 5',
+    ]
+
+
+def test_histogram_time_and_thread_safety():
+    registry = Registry()
+    phase = registry.histogram("fixit_phase_seconds", "Fases", ("phase",))
+    with phase.time(phase="fetch"):
+        pass
+
+    def worker():
+        for _ in range(1000):
+            phase.observe(0.01, phase="score")
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    text = registry.render()
+    assert 'fixit_phase_seconds_count{phase="fetch"} 1' in text
+    assert 'fixit_phase_seconds_count{phase="score"} 4000' in text
+
+
+def test_collectors_run_before_render_and_errors_are_ignored():
+    registry = Registry()
+    gauge = registry.gauge("fixit_cache_hit_ratio", "Aciertos")
+    calls = []
+    registry.add_collector(lambda: (calls.append(1), gauge.set(len(calls))))
+    registry.add_collector(lambda: 1 / 0)
+    assert "fixit_cache_hit_ratio 1" in registry.render()
+    assert "fixit_cache_hit_ratio 2" in registry.render()
+
+
+def test_metrics_endpoint_serves_engine_registry(monkeypatch):
+    import app as webapp
+    import main
+    monkeypatch.setattr(main.engine, "_thread_initialized", True, raising=False)
+    resp = webapp.app.test_client().get("/metrics")
+    assert resp.status_code == 200 and resp.mimetype == "text/plain"
+    body = resp.get_data(as_text=True)
+    assert "# TYPE fixit_sync_phase_seconds histogram" in body
+    assert "fixit_http_request_seconds" in body
@@ -0,0 +1,126 @@
+"""Cuotas de The Odds API: normalización de nombres, índice de cruce y proveedor con cache."""
+import json
+
+import odds
+from odds import OddsIndex, OddsProvider, consensus_1x2, load_aliases, normalize_team
+
+KICKOFF = "2026-03-01T15:00:00Z"
+TS = odds._kickoff_ts(KICKOFF)
+
+
+def _event(home, away, prices=((2.0, 3.4, 3.8),), commence=KICKOFF, event_id=None):
+    books = [{"markets": [{"key": "h2h", "outcomes": [
+        {"name": home, "price": h}, {"name": "Draw", "price": d}, {"name": away, "price": a}]}]}
+        for h, d, a in prices]
+    return {"id": event_id or f"{home}-{away}", "home_team": home, "away_team": away,
+            "commence_time": commence, "bookmakers": books}
+
+
+def test_normalize_team():
+    assert normalize_team("Club Atlético de Madrid") == "atletico madrid"
+    assert normalize_team("Brighton & Hove Albion FC") == "brighton"
+    assert normalize_team("FC Internazionale Milano") == "inter milan"
+    assert normalize_team("Inter") == "inter milan"
+    assert normalize_team("Manchester United FC") == normalize_team("Manchester United") == "man united"
+    assert normalize_team(None) == ""
+
+
+def test_load_aliases_normalizes_both_sides(tmp_path):
+    path = tmp_path / "aliases.json"
+    path.write_text(json.dumps({"Wolverhampton W. FC": "Wolves", "RC Lens": "Racing Club de Lens"}))
+    aliases = load_aliases(str(path))
+    assert aliases["wolverhampton w"] == "wolves"
+    assert normalize_team("RC Lens", aliases) == normalize_team("Lens", aliases) == "racing lens"
+    assert load_aliases() == odds.TEAM_ALIASES
+
+
+def test_consensus_is_median_of_bookmakers():
+    event = _event("Arsenal", "Chelsea", prices=((2.0, 3.4, 3.8), (2.1, 3.3, 3.6), (9.0, 3.5, 1.0)))
+    # La cuota 1.0 no es un precio válido y no entra en la mediana
+    assert consensus_1x2(event) == (2.1, 3.4, 3.7)
+    assert consensus_1x2({"home_team": "A", "away_team": "B", "bookmakers": []}) == (None, None, None)
+
+
+def test_index_matches_pair_swapped_and_single_team():
+    index = OddsIndex([_event("Manchester United", "Tottenham Hotspur"),
+                       _event("Paris Saint-Germain", "Olympique Marseille"),
+                       _event("Real Betis", "Sevilla")], odds.TEAM_ALIASES, tolerance_seconds=5400)
+    event, swapped = index.find(["Manchester United FC", "Man United"], ["Tottenham Hotspur FC"], TS)
+    assert event["home_team"] == "Manchester United" and swapped is False
+    event, swapped = index.find(["Olympique de Marseille"], ["Paris Saint-Germain FC"], TS)
+    assert event["home_team"] == "Paris Saint-Germain" and swapped is True
+    # Solo un nombre coincide: vale si es el mismo partido a la misma hora
+    event, swapped = index.find(["Real Betis Balompié"], ["Sevilla FC Andalucía"], TS + 600)
+    assert event["away_team"] == "Sevilla" and swapped is False
+    event, swapped = index.find(["Sevilla Atlético"], ["Real Betis"], TS)
+    assert event["home_team"] == "Real Betis" and swapped is True
+
+
+def test_index_respects_kickoff_tolerance_and_picks_closest():
+    first  = _event("Arsenal", "Chelsea", event_id="league", commence="2026-03-01T15:00:00Z")
+    second = _event("Arsenal", "Chelsea", event_id="cup", commence="2026-03-04T19:45:00Z")
+    index = OddsIndex([first, second], odds.TEAM_ALIASES, tolerance_seconds=5400)
+    assert index.find(["Arsenal FC"], ["Chelsea FC"], odds._kickoff_ts("2026-03-04T20:00:00Z"))[0]["id"] == "cup"
+    assert index.find(["Arsenal FC"], ["Chelsea FC"], TS + 2 * 86400) == (None, False)
+    assert index.find(["Leeds"], ["Everton"], TS) == (None, False)
+
+
+class FakeResponse:
+    def __init__(self, status_code, events=(), remaining="480"):
+        self.status_code = status_code
+        self.headers     = {"x-requests-remaining": remaining}
+        self._events     = list(events)
+
+    def json(self):
+        return self._events
+
+
+class FakeClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls     = []
+
+    def get(self, url, endpoint=None, circuit_key=None, params=None):
+        self.calls.append((url, circuit_key, params))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def _fixture(home, away, comp="PL", odds_value=None):
+    return {"comp": comp, "kickoff": TS, "home_names": [home], "away_names": [away], "odds": odds_value}
+
+
+def test_provider_attaches_odds_in_fixture_orientation():
+    client = FakeClient([FakeResponse(200, [_event("Chelsea", "Arsenal", prices=((2.5, 3.2, 2.9),))])])
+    provider = OddsProvider(client, "secret", ttl_seconds=600)
+    fixtures = [_fixture("Arsenal FC", "Chelsea FC"), _fixture("Everton", "Leeds"),
+                _fixture("Brentford", "Fulham", odds_value=(1.9, 3.5, 4.0)), _fixture("X", "Y", comp="WC")]
+    assert provider.attach(fixtures) == 1
+    assert fixtures[0]["odds"] == (2.9, 3.2, 2.5)
+    assert fixtures[1]["odds"] is None and fixtures[2]["odds"] == (1.9, 3.5, 4.0)
+    assert len(client.calls) == 1
+    url, circuit_key, params = client.calls[0]
+    assert url.endswith("/sports/soccer_epl/odds/") and circuit_key == "odds:soccer_epl"
+    assert params["apiKey"] == "secret" and "secret" not in url
+    assert provider.counters() == {"sports_cached": 1, "requests": 1, "remaining": 480}
+
+
+def test_provider_caches_and_falls_back_on_errors(monkeypatch):
+    now = {"t": 1000.0}
+    monkeypatch.setattr(odds.time, "time", lambda: now["t"])
+    logs = []
+    events = [_event("Arsenal", "Chelsea")]
+    client = FakeClient([FakeResponse(200, events), RuntimeError("https://x/?apiKey=secret"),
+                         FakeResponse(429)])
+    provider = OddsProvider(client, "secret", ttl_seconds=600, log=lambda msg, level=None: logs.append(msg))
+    assert provider.events("soccer_epl") == events
+    now["t"] += 300
+    assert provider.events("soccer_epl") == events and len(client.calls) == 1
+    now["t"] += 400
+    assert provider.events("soccer_epl") == events
+    assert provider.events("soccer_epl") == events
+    assert len(client.calls) == 3
+    assert logs and not any("secret" in msg for msg in logs)
+    assert OddsProvider(FakeClient([FakeResponse(500)]), "k").events("soccer_epl") == []
@@ -0,0 +1,94 @@
+"""Página principal cacheada: un render por versión del snapshot, ETag por representación y 304."""
+import gzip
+import threading
+from email.utils import format_datetime
+
+import pytest
+
+import app as webapp
+import main
+from app import PageCache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    state = {"snap": main.engine.snapshot._replace(version=1, published_at=1_772_000_000.0)}
+    renders = []
+    original = webapp.render_template
+
+    def counting_render(*args, **kwargs):
+        renders.append(kwargs.get("last_sync"))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(main.engine, "_thread_initialized", True, raising=False)
+    monkeypatch.setattr(main.engine, "refresh_from_snapshot", lambda: None)
+    monkeypatch.setattr(main, "get_snapshot", lambda: state["snap"])
+    monkeypatch.setattr(webapp, "PAGE_CACHE", PageCache())
+    monkeypatch.setattr(webapp, "render_template", counting_render)
+    test_client = webapp.app.test_client()
+    test_client.state, test_client.renders = state, renders
+    return test_client
+
+
+def test_page_rendered_once_per_version(client):
+    first = client.get("/")
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+    assert client.get("/").data == first.data
+    assert len(client.renders) == 1
+
+    client.state["snap"] = client.state["snap"]._replace(version=2, last_updated="otra sync")
+    second = client.get("/")
+    assert len(client.renders) == 2
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+
+def test_gzip_and_identity_have_distinct_etags(client):
+    plain  = client.get("/")
+    zipped = client.get("/", headers={"Accept-Encoding": "gzip, deflate"})
+    assert zipped.headers["Content-Encoding"] == "gzip" and "Content-Encoding" not in plain.headers
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gz"'
+    assert zipped.headers["Vary"] == "Accept-Encoding"
+    # El ETag sin comprimir no valida la copia gzip
+    resp = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]})
+    assert resp.status_code == 200
+
+
+def test_conditional_requests_get_304(client):
+    page = client.get("/", headers={"Accept-Encoding": "gzip"})
+    resp = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": page.headers["ETag"]})
+    assert resp.status_code == 304 and resp.data == b""
+    assert resp.headers["ETag"] == page.headers["ETag"]
+
+    since = page.headers["Last-Modified"]
+    assert client.get("/", headers={"If-Modified-Since": since}).status_code == 304
+    # If-None-Match manda sobre If-Modified-Since
+    assert client.get("/", headers={"If-None-Match": '"otro"', "If-Modified-Since": since}).status_code == 200
+
+    client.state["snap"] = client.state["snap"]._replace(version=3, published_at=1_772_000_600.0,
+                                                         last_updated="nueva")
+    assert client.get("/", headers={"If-None-Match": page.headers["ETag"]}).status_code == 200
+    older = format_datetime(page.last_modified, usegmt=True)
+    assert client.get("/", headers={"If-Modified-Since": older}).status_code == 200
+
+
+def test_concurrent_misses_render_once():
+    cache, calls = PageCache(), []
+    barrier = threading.Barrier(8)
+
+    def render():
+        calls.append(1)
+        return "<html>1</html>"
+
+    def worker():
+        barrier.wait()
+        cache.get(("v1", "2026-03-01"), 0, render)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    # ETag por contenido: otro worker con la misma página da el mismo ETag
+    assert PageCache().get("otra-version", 0, render).etag == cache.get(("v1", "2026-03-01"), 0, render).etag
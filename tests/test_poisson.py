@@ -0,0 +1,98 @@
+"""Kernels del 1X2: matriz de marcadores en lote, escalar y Skellam con corte por partido."""
+import numpy as np
+import pytest
+
+import main
+
+REFERENCE_GOALS = 60
+
+
+def _lambda_grid(low: float = 0.1, high: float = 5.0, step: float = 0.05):
+    grid = np.arange(low, high + 1e-9, step)
+    lam_h, lam_a = np.meshgrid(grid, grid)
+    return lam_h.ravel(), lam_a.ravel()
+
+
+def test_skellam_within_reported_bound_over_clamped_range():
+    lam_h, lam_a = _lambda_grid()
+    reference = main.calculate_1x2_poisson_batch(lam_h, lam_a, max_goals=REFERENCE_GOALS)
+
+    batch, bound = main.skellam_1x2_batch(lam_h, lam_a)
+    assert (np.abs(batch - reference).max(axis=1) <= bound + 1e-13).all()
+    assert bound.max() <= main.SKELLAM_EPS
+
+    scalar = np.array([main.skellam_1x2(lh, la) for lh, la in zip(lam_h.tolist(), lam_a.tolist())])
+    assert (np.abs(scalar[:, :3] - reference).max(axis=1) <= scalar[:, 3] + 1e-13).all()
+    assert scalar[:, 3].max() <= main.SKELLAM_EPS
+    np.testing.assert_allclose(batch, scalar[:, :3], atol=2 * main.SKELLAM_EPS)
+
+
+def test_skellam_beats_truncated_grid_precision():
+    lam_h, lam_a = _lambda_grid(0.3, 5.0, 0.1)
+    reference = main.calculate_1x2_poisson_batch(lam_h, lam_a, max_goals=REFERENCE_GOALS)
+    grid_err = np.abs(main.calculate_1x2_poisson_batch(lam_h, lam_a) - reference).max()
+    skellam_err = np.abs(main.skellam_1x2_batch(lam_h, lam_a)[0] - reference).max()
+    assert grid_err > 1e-3
+    assert skellam_err < 1e-9
+
+
+def test_skellam_batch_cuts_each_row_at_its_own_cutoff():
+    """Una fila da lo mismo sola que junto a un partido con λ alto."""
+    alone, alone_bound = main.skellam_1x2_batch([0.4], [0.6])
+    mixed, mixed_bound = main.skellam_1x2_batch([4.9, 0.4, 2.0], [4.8, 0.6, 1.1])
+    np.testing.assert_array_equal(mixed[1], alone[0])
+    assert mixed_bound[1] == alone_bound[0]
+
+
+def test_bucketed_cutoffs_never_below_exact_cutoff():
+    lams = np.linspace(0.0, 8.0, 1601)
+    cutoffs = main._skellam_cutoffs(lams, main.SKELLAM_EPS / 2)
+    exact = [main._poisson_tail_cutoff(lam, main.SKELLAM_EPS / 2) for lam in lams.tolist()]
+    assert (cutoffs >= exact).all()
+
+
+def test_skellam_empty_and_normalized():
+    out, bound = main.skellam_1x2_batch([], [])
+    assert out.shape == (0, 3) and bound.shape == (0,)
+    out, _ = main.skellam_1x2_batch([1.2, 3.4], [0.9, 0.2])
+    np.testing.assert_allclose(out.sum(axis=1), 1.0)
+
+
+def test_outcome_kernel_switch(monkeypatch):
+    lam_h, lam_a = [1.4, 2.2], [1.1, 0.7]
+    monkeypatch.setattr(main, "ONE_X_TWO_KERNEL", "skellam")
+    np.testing.assert_array_equal(main.outcome_1x2_batch(lam_h, lam_a), main.skellam_1x2_batch(lam_h, lam_a)[0])
+    monkeypatch.setattr(main, "ONE_X_TWO_KERNEL", "grid")
+    np.testing.assert_array_equal(main.outcome_1x2_batch(lam_h, lam_a),
+                                  main.calculate_1x2_poisson_batch(lam_h, lam_a))
+
+
+def test_markets_take_outcome_instead_of_grid_1x2():
+    matrix = main.ScorelineCache().get(1.5, 1.2)
+    outcome = main.skellam_1x2(1.5, 1.2)[:3]
+    markets = matrix.markets(outcome)
+    assert (markets["home_win"], markets["draw"], markets["away_win"]) == outcome
+    assert markets["dc_1x"] == pytest.approx(outcome[0] + outcome[1])
+    assert markets["dc_12"] == pytest.approx(outcome[0] + outcome[2])
+
+
+def test_batch_grid_matches_scalar_engine():
+    rng = np.random.default_rng(11)
+    lam_h, lam_a = rng.uniform(0.0, 5.0, 200), rng.uniform(0.0, 5.0, 200)
+    lam_h[:2] = 0.0
+    batch = main.calculate_1x2_poisson_batch(lam_h, lam_a)
+    scalar = np.array([main.calculate_1x2_poisson(lh, la) for lh, la in zip(lam_h.tolist(), lam_a.tolist())])
+    np.testing.assert_allclose(batch, scalar, rtol=1e-12, atol=1e-15)
+    assert main.calculate_1x2_poisson_batch([], []).shape == (0, 3)
+
+
+def test_pmf_table_and_grid_normalization():
+    table = main.poisson_pmf_table([0.0, 1.3, 4.2], max_goals=8)
+    expected = [[main.poisson_prob(lam, k) for k in range(9)] for lam in (0.0, 1.3, 4.2)]
+    np.testing.assert_allclose(table, expected, rtol=1e-12)
+
+    grid = main.scoreline_grid_batch([1.3, 4.2], [0.8, 2.5], max_goals=6)
+    assert grid.shape == (2, 7, 7)
+    np.testing.assert_allclose(grid.sum(axis=(1, 2)), 1.0)
+    home, away = main.poisson_pmf_table([1.3, 0.8], max_goals=6)
+    np.testing.assert_allclose(grid[0], np.outer(home, away) / (home.sum() * away.sum()))
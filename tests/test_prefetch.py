@@ -0,0 +1,79 @@
+"""Precarga de historiales: una descarga por equipo único y modelo en cuanto hay ambos historiales."""
+import threading
+import time
+from datetime import datetime
+
+import pytest
+import pytz
+
+import main
+
+TZ    = pytz.timezone("Europe/Madrid")
+TODAY = TZ.localize(datetime(2026, 3, 10, 10, 0))
+
+
+def _match(match_id, home, away, utc_date, comp="PL"):
+    return {"id": match_id, "utcDate": utc_date, "competition": {"code": comp, "name": comp},
+            "homeTeam": {"id": home, "name": f"Team {home}"}, "awayTeam": {"id": away, "name": f"Team {away}"}}
+
+
+class RecordingHistory:
+    """fetch_team_history de pega: anota equipo, as_of y concurrencia máxima."""
+
+    def __init__(self, fail=()):
+        self.calls   = []
+        self.fail    = set(fail)
+        self.active  = 0
+        self.peak    = 0
+        self._lock   = threading.Lock()
+
+    def __call__(self, team_id, limit=5, as_of=None):
+        with self._lock:
+            self.calls.append((team_id, limit, as_of))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+        if team_id in self.fail:
+            raise RuntimeError("timeout")
+        return []
+
+
+@pytest.fixture
+def engine(engine_paths):
+    return main.FixItPRO()
+
+
+def test_each_unique_team_is_fetched_once_with_its_earliest_kickoff(engine, monkeypatch):
+    history = RecordingHistory()
+    monkeypatch.setattr(engine, "fetch_team_history", history)
+    scored = []
+    original = engine._score_fixtures
+    monkeypatch.setattr(engine, "_score_fixtures",
+                        lambda fixtures, today: scored.append([fx["id"] for fx in fixtures]) or original(fixtures, today))
+    matches = [
+        _match(1, 10, 20, "2026-03-10T19:00:00Z"),
+        _match(2, 30, 10, "2026-03-11T17:00:00Z"),
+        _match(3, 20, 40, "2026-03-11T20:00:00Z"),
+        _match(4, 50, 60, "2026-03-14T20:00:00Z"),   # fuera de hoy/mañana
+    ]
+    picks = engine._build_poisson_picks(matches, TODAY)
+
+    assert sorted(team for team, _, _ in history.calls) == [10, 20, 30, 40]
+    as_of = {team: when for team, _, when in history.calls}
+    kickoff = {m["id"]: datetime.fromisoformat(m["utcDate"].replace("Z", "+00:00")).astimezone(TZ) for m in matches}
+    assert as_of == {10: kickoff[1], 20: kickoff[1], 30: kickoff[2], 40: kickoff[3]}
+    if main.HISTORY_WORKERS > 1:
+        assert history.peak > 1
+    assert sorted(fid for batch in scored for fid in batch) == [1, 2, 3]
+    assert {p["id"] for p in picks} <= {1, 2, 3}
+    assert sorted(engine.stats["fixture_picks"]) == ["1", "2", "3"]
+
+
+def test_failed_history_still_scores_the_fixture(engine, monkeypatch):
+    history = RecordingHistory(fail={20})
+    monkeypatch.setattr(engine, "fetch_team_history", history)
+    engine._build_poisson_picks([_match(1, 10, 20, "2026-03-10T19:00:00Z")], TODAY)
+    assert sorted(team for team, _, _ in history.calls) == [10, 20]
+    assert list(engine.stats["fixture_picks"]) == ["1"]
@@ -0,0 +1,72 @@
+"""Picks y partidos compactos: proyección del API, filas persistidas y lectura como dict."""
+import pytest
+
+import main  # noqa: F401  registra el catálogo de mercados
+from records import MatchRow, Pick
+
+
+def _api_match(match_id=7, status="FINISHED", home=2, away=1):
+    return {"id": match_id, "utcDate": "2026-03-01T15:00:00Z", "status": status, "competition": {"code": "PL"},
+            "homeTeam": {"id": 10, "name": "Arsenal FC"}, "awayTeam": {"id": 20, "name": "Chelsea FC"},
+            "score": {"fullTime": {"home": home, "away": away}}, "referees": [{"name": "X"}], "odds": {}}
+
+
+def test_match_row_projects_finished_matches_only():
+    rows = MatchRow.project([_api_match(), _api_match(8, status="SCHEDULED"), _api_match(9, home=None),
+                             dict(_api_match(10), utcDate="")])
+    assert len(rows) == 1
+    row = rows[0]
+    assert (row.id, row.home_id, row.away_id, row.home_goals, row.away_goals, row.comp) == (7, 10, 20, 2, 1, "PL")
+    assert row.utc_date == "2026-03-01T15:00:00Z"
+
+
+def test_match_row_round_trip_and_legacy_payload():
+    row = MatchRow.from_api(_api_match())
+    again = MatchRow.load(row.to_row())
+    assert again.to_row() == row.to_row() == [7, int(row.kickoff), 10, 20, 2, 1, "PL"]
+    assert MatchRow.load(_api_match()).to_row() == row.to_row()
+    assert MatchRow.load(_api_match(status="IN_PLAY")) is None
+
+
+def _pick(**overrides):
+    args = dict(fixture_id=5, teams="Arsenal vs Chelsea", league="Premier League", market_key="over_25",
+                probability=0.6123, odds=1.95, value=0.194, lam_home=1.6, lam_away=1.2,
+                date="01-03-2026", time="16:00")
+    args.update(overrides)
+    return Pick(**args)
+
+
+def test_pick_reads_like_the_old_dict():
+    pick = _pick()
+    assert pick["market_key"] == "over_25" and pick.get("market") == "Más de 2.5 Goles"
+    assert pick["prob"] == 61 and pick["icon"] == "fa-arrow-trend-up"
+    assert pick.get("unknown", "x") == "x" and "selection" not in pick and "odds" in pick
+    with pytest.raises(KeyError):
+        pick["selection"]
+    assert pick.description.endswith("Valor=0.194")
+    assert _pick(odds="N/A").description.endswith("Confianza Poisson=61%")
+    assert set(pick.to_dict()) == set(pick.keys())
+
+
+def test_correct_score_selection_in_market_label():
+    pick = _pick(market_key="correct_score", selection="2-1", probability=0.14)
+    assert pick.market == "Resultado Exacto 2-1" and pick["selection"] == "2-1"
+    assert "selection" in pick.keys()
+
+
+def test_pick_row_round_trip_and_interning():
+    pick = _pick(market_key="correct_score", selection="1-0")
+    again = Pick.load(pick.to_row())
+    assert again.to_dict() == pick.to_dict()
+    assert again.teams is pick.teams and again.league is pick.league
+    assert pick.to_row()[3] == "correct_score"
+
+
+def test_legacy_dicts_load_and_unknown_markets_drop():
+    legacy = {"id": 5, "teams": "A vs B", "league": "LaLiga", "market_key": "correct_score",
+              "market": "Resultado Exacto 0-0", "prob": 17, "odds": "N/A", "date": "01-03-2026", "time": "21:00"}
+    pick = Pick.load(legacy)
+    assert pick.selection == "0-0" and pick.probability == pytest.approx(0.17) and pick.value == 0.0
+    assert Pick.load(dict(legacy, market_key="corners_over_95")) is None
+    assert Pick.load([5, "A vs B", "L", "gone_market", None, 10, 0.1, None, 0, 1, 1, "d", "t"]) is None
+    assert len(Pick.load_many([legacy, dict(legacy, market_key="gone"), _pick().to_row()])) == 2
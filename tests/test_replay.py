@@ -0,0 +1,92 @@
+"""Grabación y reproducción offline de football-data.org, y sync completa contra el corpus."""
+import json
+import os
+
+import pytest
+import requests
+
+import main
+from api_client import RateGovernor
+from replay import Recorder, ReplayServer, corpus_key, load_entry, synthesize_corpus
+
+
+class FakeResponse:
+    def __init__(self, status_code, text, headers=None):
+        self.status_code = status_code
+        self.text        = text
+        self.headers     = headers or {}
+
+
+def test_corpus_key_sorts_query_and_drops_dates_when_approximate():
+    url = "https://api.football-data.org/v4/matches?dateTo=2026-03-11&competitions=PL,CL&dateFrom=2026-03-10"
+    assert corpus_key(url) == "/matches?competitions=PL%2CCL&dateFrom=2026-03-10&dateTo=2026-03-11"
+    assert corpus_key(url, exact=False) == "/matches"
+    assert corpus_key("http://127.0.0.1:8099/v4/teams/5/matches?status=FINISHED&limit=5") == \
+        "/teams/5/matches?limit=5&status=FINISHED"
+
+
+def test_recorder_round_trip_with_approximate_lookup(tmp_path):
+    recorder = Recorder(str(tmp_path))
+    recorder.record("https://api.football-data.org/v4/matches?dateFrom=2026-03-10&dateTo=2026-03-11",
+                    FakeResponse(200, '{"matches": []}', {"X-Requests-Available-Minute": "9", "Set-Cookie": "x"}))
+    exact = load_entry(str(tmp_path), "http://localhost/v4/matches?dateTo=2026-03-11&dateFrom=2026-03-10")
+    assert exact["status"] == 200 and exact["body"] == '{"matches": []}'
+    assert exact["headers"] == {"X-Requests-Available-Minute": "9"}
+    # Otro día: responde la grabación aproximada (sin fechas)
+    assert load_entry(str(tmp_path), "http://localhost/v4/matches?dateFrom=2026-04-01")["body"] == exact["body"]
+    assert load_entry(str(tmp_path), "http://localhost/v4/teams/1/matches") is None
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = str(tmp_path / "corpus")
+    assert synthesize_corpus(path, 4, ["PL", "CL"]) == {"fixtures": 4, "teams": 8}
+    return path
+
+
+def test_server_serves_corpus_and_injects_plan_errors(corpus):
+    server = ReplayServer(corpus, plan_errors=("/competitions/CL",)).start()
+    try:
+        resp = requests.get(f"{server.base_url}/matches?dateFrom=2026-01-01", timeout=5)
+        assert resp.status_code == 200 and len(resp.json()["matches"]) == 4
+        resp = requests.get(f"{server.base_url}/competitions/CL/matches?status=FINISHED", timeout=5)
+        assert resp.status_code == 403 and "Free plans" in resp.json()["message"]
+        assert requests.get(f"{server.base_url}/teams/1/matches", timeout=5).status_code == 404
+        assert server.requests == 3
+    finally:
+        server.stop()
+
+
+def test_server_quota_answers_429_with_retry_after(corpus):
+    server = ReplayServer(corpus, max_per_minute=2).start()
+    try:
+        url = f"{server.base_url}/competitions/PL/matches?status=FINISHED"
+        first, second, third = (requests.get(url, timeout=5) for _ in range(3))
+        assert first.headers["X-Requests-Available-Minute"] == "1"
+        assert second.headers["X-Requests-Available-Minute"] == "0"
+        assert third.status_code == 429 and int(third.headers["Retry-After"]) > 0
+    finally:
+        server.stop()
+
+
+@pytest.mark.parametrize("mode", ["team", "bulk"])
+def test_full_sync_against_replay_server_records_a_corpus(corpus, engine_paths, monkeypatch, mode):
+    server = ReplayServer(corpus).start()
+    recorded = str(engine_paths / "recorded")
+    monkeypatch.setattr(main, "BASE_URL", server.base_url)
+    monkeypatch.setattr(main, "API_KEY", "replay")
+    monkeypatch.setattr(main, "HISTORY_MODE", mode)
+    monkeypatch.setattr(main, "RECORD_DIR", recorded)
+    try:
+        engine = main.FixItPRO()
+        engine.api.governor = RateGovernor(6000, main.API_RATE_BURST)
+        assert engine.fetch_data() == "ok"
+    finally:
+        server.stop()
+    assert engine.cached_picks
+    assert {p["id"] for p in engine.cached_picks} <= {1, 2, 3, 4}
+    # La grabación de la sync sirve a su vez como corpus
+    entries = [json.load(open(os.path.join(recorded, f))) for f in os.listdir(recorded)]
+    assert any(e["url"].startswith("/matches") for e in entries)
+    team_requests = [e for e in entries if e["url"].startswith("/teams/")]
+    assert (len(team_requests) > 0) == (mode == "team")
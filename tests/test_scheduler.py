@@ -0,0 +1,132 @@
+"""Scheduler: cron en hora de Madrid, recuperación de ejecuciones perdidas y trabajos con clave."""
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import scheduler
+from scheduler import CronSchedule, Scheduler
+
+MADRID = ZoneInfo("Europe/Madrid")
+
+
+def _ts(*args) -> float:
+    return datetime(*args, tzinfo=MADRID).timestamp()
+
+
+def _local(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, MADRID).replace(tzinfo=None)
+
+
+class MemoryState:
+    def __init__(self):
+        self.meta = {}
+
+    def get_meta(self, key):
+        return self.meta.get(key)
+
+    def set_meta(self, key, value):
+        self.meta[key] = str(value)
+
+
+@pytest.fixture
+def now(monkeypatch):
+    clock = {"t": _ts(2026, 3, 2, 10, 0)}   # lunes
+    monkeypatch.setattr(scheduler.time, "time", lambda: clock["t"])
+    return clock
+
+
+def test_parse_fields():
+    cron = CronSchedule("*/15 8-20/4 1,15 * 1-5", MADRID)
+    assert cron.minutes == [0, 15, 30, 45]
+    assert cron.hours == [8, 12, 16, 20]
+    assert cron.days == {1, 15}
+    assert CronSchedule("0 0 * * 7", MADRID).weekdays == {0}
+    for bad in ("* * * *", "60 * * * *", "* 5-3 * * *", "*/0 * * * *", "* * 0 * *"):
+        with pytest.raises(ValueError):
+            CronSchedule(bad, MADRID)
+
+
+def test_next_after_in_madrid_time():
+    cron = CronSchedule("30 9 * * 1-5", MADRID)
+    friday = _ts(2026, 3, 6, 9, 30)
+    assert _local(cron.next_after(friday - 60)) == datetime(2026, 3, 6, 9, 30)
+    # Estrictamente posterior: desde la propia hora salta al lunes
+    assert _local(cron.next_after(friday)) == datetime(2026, 3, 9, 9, 30)
+    # Tras el cambio de hora la ejecución sigue a las 9:30 locales
+    assert _local(cron.next_after(_ts(2026, 3, 27, 12, 0))) == datetime(2026, 3, 30, 9, 30)
+    assert cron.next_after(_ts(2026, 3, 30, 0, 0)) - cron.next_after(_ts(2026, 3, 27, 0, 0)) == 3 * 86400 - 3600
+
+
+def test_day_of_month_or_weekday():
+    """Con los dos campos de día restringidos basta con que cumpla uno, como en cron."""
+    cron = CronSchedule("0 12 13 * 5", MADRID)
+    fires, ts = [], _ts(2026, 3, 1, 0, 0)
+    for _ in range(4):
+        ts = cron.next_after(ts)
+        fires.append(_local(ts).day)
+    assert fires == [6, 13, 20, 27]
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *", MADRID).next_after(0)
+
+
+def test_missed_run_within_grace_fires_once_on_start(now):
+    now["t"] = _ts(2026, 3, 2, 9, 40)
+    state = MemoryState()
+    state.set_meta("scheduler:sync", _ts(2026, 3, 2, 7, 0))
+    logs = []
+    sched = Scheduler(state=state, misfire_grace=3 * 3600, log=logs.append)
+    job = sched.add_cron("sync", "0 * * * *", MADRID, lambda: "ok")
+    # 08:00 y 09:00 perdidas: se recupera solo la más reciente
+    assert _local(job.nominal) == datetime(2026, 3, 2, 9, 0) and job.due == now["t"]
+    assert len(logs) == 1 and "recuperándola" in logs[0]
+
+
+def test_missed_run_outside_grace_is_skipped(now):
+    state = MemoryState()
+    state.set_meta("scheduler:sync", _ts(2026, 3, 1, 7, 0))
+    logs = []
+    sched = Scheduler(state=state, misfire_grace=600, log=logs.append)
+    job = sched.add_cron("sync", "0 7 * * *", MADRID, lambda: "ok")
+    assert _local(job.nominal) == datetime(2026, 3, 3, 7, 0)
+    assert "fuera del margen" in logs[0]
+
+
+def test_fire_reschedules_cron_and_records_last_run(now):
+    state, runs = MemoryState(), []
+    sched = Scheduler(state=state, on_run=lambda job, outcome: runs.append((job.key, outcome)))
+    sched.add_cron("sync", "5 10 * * *", MADRID, lambda: "coalesced")
+    now["t"] = _ts(2026, 3, 2, 10, 5)
+    job, delay = sched._next_due()
+    assert job is not None and delay == 0.0
+    sched._fire(job)
+    assert runs == [("sync", "coalesced")]
+    assert float(state.get_meta("scheduler:sync")) == _ts(2026, 3, 2, 10, 5)
+    assert [_local(j["nominal"]) for j in sched.pending()] == [datetime(2026, 3, 3, 10, 5)]
+
+
+def test_late_wakeup_beyond_grace_is_a_misfire(now):
+    runs = []
+    sched = Scheduler(misfire_grace=60, log=lambda msg: None, on_run=lambda job, outcome: runs.append(outcome))
+    sched.add_cron("sync", "5 10 * * *", MADRID, lambda: pytest.fail("no debe ejecutarse"))
+    now["t"] = _ts(2026, 3, 2, 10, 30)
+    job, _ = sched._next_due()
+    sched._fire(job)
+    assert runs == ["misfire"] and len(sched.pending()) == 1
+
+
+def test_keyed_jobs_reschedule_and_cancel(now):
+    sched = Scheduler()
+    first = sched.add_at("prekickoff:1", now["t"] + 600, lambda: None)
+    assert sched.add_at("prekickoff:1", now["t"] + 600, lambda: None) is first
+    sched.add_at("prekickoff:1", now["t"] + 300, lambda: None, kind="prekickoff")
+    sched.add_at("settle:1", now["t"] + 900, lambda: None)
+    assert first.cancelled
+    assert [(j["key"], j["kind"]) for j in sched.pending()] == [("prekickoff:1", "prekickoff"), ("settle:1", "once")]
+
+    assert sched.cancel("settle:1") and not sched.cancel("settle:1")
+    job, delay = sched._next_due()
+    assert job is None and delay == pytest.approx(300)
+    now["t"] += 300
+    job, _ = sched._next_due()
+    assert job.key == "prekickoff:1" and sched.pending() == []
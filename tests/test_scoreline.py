@@ -0,0 +1,87 @@
+"""Matriz de marcadores: mercados derivados y LRU por λ cuantizados."""
+import math
+
+import numpy as np
+import pytest
+
+import main
+
+
+def _direct(lam_home, lam_away, predicate, max_goals=8):
+    """Suma directa de la matriz truncada y renormalizada, marcador a marcador."""
+    total = hit = 0.0
+    for i in range(max_goals + 1):
+        for j in range(max_goals + 1):
+            p = main.poisson_prob(lam_home, i) * main.poisson_prob(lam_away, j)
+            total += p
+            hit += p if predicate(i, j) else 0.0
+    return hit / total
+
+
+def test_markets_match_direct_sums():
+    lam_home, lam_away = 1.7, 0.9
+    markets = main.ScorelineCache(quantum=1e-6).get(lam_home, lam_away).markets()
+    checks = {
+        "home_win": lambda i, j: i > j, "draw": lambda i, j: i == j, "dc_x2": lambda i, j: i <= j,
+        "over_25": lambda i, j: i + j > 2.5, "under_15": lambda i, j: i + j < 1.5,
+        "btts_yes": lambda i, j: i > 0 and j > 0,
+        "ah_home_-1.5": lambda i, j: i - j > 1.5, "ah_away_+1.5": lambda i, j: j - i + 1.5 > 0,
+    }
+    for key, predicate in checks.items():
+        assert markets[key] == pytest.approx(_direct(lam_home, lam_away, predicate), abs=1e-12), key
+    for line in ("15", "25", "35"):
+        assert markets[f"over_{line}"] + markets[f"under_{line}"] == pytest.approx(1.0)
+    assert markets["btts_yes"] + markets["btts_no"] == pytest.approx(1.0)
+    assert markets["ah_home_-1.5"] + markets["ah_away_+1.5"] == pytest.approx(1.0)
+    assert set(markets) == set(main.MARKET_META) - {"correct_score"}
+
+
+def test_whole_line_handicap_has_push():
+    matrix = main.ScorelineCache().get(1.4, 1.1)
+    win, push, lose = matrix.asian_handicap(-1, "home")
+    assert push == pytest.approx(_direct(1.4, 1.1, lambda i, j: i - j == 1))
+    assert win + push + lose == pytest.approx(1.0)
+    assert matrix.asian_handicap(0, "away")[1] == pytest.approx(matrix.outcome_1x2()[1])
+
+
+def test_correct_scores_are_the_most_likely():
+    matrix = main.ScorelineCache().get(2.2, 0.6)
+    top = matrix.correct_scores(3)
+    assert [score for score, _ in top] == [(2, 0), (1, 0), (3, 0)]
+    probs = [p for _, p in top]
+    assert probs == sorted(probs, reverse=True)
+    assert probs[0] == pytest.approx(float(matrix.grid.max()))
+    assert len(matrix.correct_scores(1000)) == matrix.grid.size
+
+
+def test_cache_quantizes_and_counts():
+    cache = main.ScorelineCache(maxsize=8, quantum=0.01)
+    first = cache.get_many([1.501, 1.499, 2.0], [1.0, 1.0, 1.0])
+    assert first[0] is first[1]
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert first[0].lam_home == pytest.approx(1.5)
+    assert cache.get(1.5, 1.0) is first[0] and cache.hits == 2
+    with pytest.raises(ValueError):
+        first[0].grid[0, 0] = 1.0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = main.ScorelineCache(maxsize=2)
+    a = cache.get(1.0, 1.0)
+    cache.get(2.0, 1.0)
+    assert cache.get(1.0, 1.0) is a         # 1.0 pasa a ser el más reciente
+    cache.get(3.0, 1.0)                     # expulsa 2.0
+    misses = cache.misses
+    assert cache.get(1.0, 1.0) is a and cache.misses == misses
+    cache.get(2.0, 1.0)
+    assert cache.misses == misses + 1
+
+
+def test_batch_grids_match_individual_matrices():
+    rng = np.random.default_rng(5)
+    lam_h, lam_a = rng.uniform(0.3, 4.0, 50).round(2), rng.uniform(0.3, 4.0, 50).round(2)
+    matrices = main.ScorelineCache().get_many(lam_h.tolist(), lam_a.tolist())
+    for matrix, lh, la in zip(matrices, lam_h, lam_a):
+        home, draw, away = matrix.outcome_1x2()
+        assert (home, draw, away) == pytest.approx(main.calculate_1x2_poisson(lh, la), abs=1e-12)
+        assert math.isclose(home + draw + away, 1.0)
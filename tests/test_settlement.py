@@ -0,0 +1,74 @@
+"""Liquidación: grade_pick por mercado, índice de pendientes y ids liquidados."""
+import pytest
+
+from settlement import PendingPicks, SettledIds, grade_pick
+
+
+@pytest.mark.parametrize("market_key, score, expected", [
+    ("home_win", (2, 1), "won"), ("home_win", (1, 1), "lost"),
+    ("draw", (0, 0), "won"), ("draw", (2, 0), "lost"),
+    ("away_win", (0, 1), "won"), ("away_win", (3, 1), "lost"),
+    ("dc_1x", (1, 1), "won"), ("dc_1x", (0, 1), "lost"),
+    ("dc_x2", (0, 2), "won"), ("dc_x2", (2, 0), "lost"),
+    ("dc_12", (2, 0), "won"), ("dc_12", (1, 1), "lost"),
+    ("over_25", (2, 1), "won"), ("over_25", (1, 1), "lost"),
+    ("under_15", (1, 0), "won"), ("under_15", (1, 1), "lost"),
+    ("over_35", (2, 2), "won"), ("under_35", (2, 2), "lost"),
+    ("btts_yes", (1, 1), "won"), ("btts_yes", (2, 0), "lost"),
+    ("btts_no", (0, 3), "won"), ("btts_no", (1, 2), "lost"),
+    ("ah_home_-1.5", (3, 1), "won"), ("ah_home_-1.5", (2, 1), "lost"),
+    ("ah_away_+1.5", (2, 1), "won"), ("ah_away_+1.5", (3, 1), "lost"),
+    ("ah_home_+1.5", (0, 1), "won"), ("ah_away_-1.5", (0, 2), "won"),
+])
+def test_grade_pick_by_market(market_key, score, expected):
+    assert grade_pick({"market_key": market_key}, *score) == expected
+
+
+def test_asian_handicap_whole_line_pushes():
+    assert grade_pick({"market_key": "ah_home_-1"}, 2, 1) == "push"
+    assert grade_pick({"market_key": "ah_away_+1"}, 2, 1) == "push"
+    assert grade_pick({"market_key": "ah_home_-1"}, 3, 1) == "won"
+    assert grade_pick({"market_key": "ah_away_0"}, 1, 1) == "push"
+
+
+def test_correct_score_uses_selection_or_market_text():
+    assert grade_pick({"market_key": "correct_score", "selection": "2-1"}, 2, 1) == "won"
+    assert grade_pick({"market_key": "correct_score", "selection": "2-1"}, 1, 2) == "lost"
+    assert grade_pick({"market_key": "correct_score", "market": "Resultado Exacto 0-0"}, 0, 0) == "won"
+    assert grade_pick({"market_key": "correct_score", "market": "Resultado Exacto"}, 0, 0) == "void"
+
+
+def test_unknown_market_is_void():
+    assert grade_pick({"market_key": "corners_over_95"}, 1, 0) == "void"
+    assert grade_pick({}, 1, 0) == "void"
+
+
+def test_pending_picks_due_by_kickoff():
+    data = {}
+    pending = PendingPicks(data)
+    pending.register(2, "2026-03-01T18:00:00Z", "PL", [{"market_key": "draw"}])
+    pending.register(1, "2026-03-01T15:00:00Z", "PL", [{"market_key": "home_win"}])
+    pending.register(3, "2026-03-01T20:00:00Z", "PL", [])
+    assert len(pending) == 2 and 3 not in pending and "1" in data
+
+    kickoff = pending.kickoff(1)
+    assert pending.due(kickoff + 5 * 3600, after_seconds=2 * 3600) == [1, 2]
+    assert pending.due(kickoff + 2 * 3600, after_seconds=2 * 3600) == [1]
+    assert pending.pop(1) == [{"market_key": "home_win"}]
+    assert pending.pop(1) == [] and pending.kickoff(1) == 0.0
+
+    pending.register(2, "2026-03-01T18:00:00Z", "PL", [])
+    assert len(pending) == 0
+
+
+def test_settled_ids_track_unsaved_additions():
+    settled = SettledIds(["5", 6, None])
+    assert 5 in settled and "6" in settled and "x" not in settled and None not in settled
+    settled.add(6)
+    settled.add("7")
+    settled.add(8)
+    assert settled.take_unsaved() == [7, 8]
+    assert settled.take_unsaved() == []
+    settled.restore_unsaved([7])
+    assert settled.take_unsaved() == [7]
+    assert sorted(settled) == [5, 6, 7, 8] and len(settled) == 4
@@ -0,0 +1,78 @@
+"""Simulador Monte Carlo de temporada: entradas, probabilidades y reproducibilidad."""
+import itertools
+
+import numpy as np
+import pytest
+
+from simulator import build_inputs, sample_poisson, simulate
+
+
+def _match(match_id, home, away, status="SCHEDULED", score=None, stage="REGULAR_SEASON"):
+    m = {"id": match_id, "status": status, "stage": stage,
+         "homeTeam": {"id": home, "shortName": f"T{home}"}, "awayTeam": {"id": away, "shortName": f"T{away}"},
+         "score": {"fullTime": {"home": score[0], "away": score[1]} if score else {"home": None, "away": None}}}
+    return m
+
+
+def _league(teams=6, played_rounds=1):
+    """Doble vuelta entre `teams` equipos; las primeras `played_rounds` jornadas ya jugadas (gana el local)."""
+    pairs = list(itertools.permutations(range(1, teams + 1), 2))
+    matches = []
+    for i, (home, away) in enumerate(pairs):
+        if i < played_rounds * (teams // 2):
+            matches.append(_match(i, home, away, "FINISHED", (2, 0)))
+        else:
+            matches.append(_match(i, home, away))
+    return matches
+
+
+def _inputs(**kwargs):
+    return build_inputs("PL", _league(**kwargs), lambda home, away: (1.5, 1.1))
+
+
+def test_build_inputs_table_and_remaining():
+    inputs = _inputs()
+    assert len(inputs.teams) == 6 and len(inputs.home) == 30 - 3
+    assert inputs.points.sum() == 9 and inputs.played.sum() == 6
+    assert build_inputs("PL", [_match(1, 1, 2, "FINISHED", (1, 0))], lambda h, a: (1.0, 1.0)) is None
+    # Las eliminatorias no forman parte de la tabla
+    knockout = _league() + [_match(99, 1, 2, stage="SEMI_FINALS")]
+    assert len(build_inputs("PL", knockout, lambda h, a: (1.0, 1.0)).home) == 27
+
+
+def test_probabilities_sum_to_one_per_team_and_position():
+    result = simulate(_inputs(), 20_000, workers=1, chunk=5_000, seed=7)
+    positions = np.array([row["positions"] for row in result["table"]])
+    np.testing.assert_allclose(positions.sum(axis=1), 1.0, atol=1e-3)
+    np.testing.assert_allclose(positions.sum(axis=0), 1.0, atol=1e-3)
+    assert sum(row["title"] for row in result["table"]) == pytest.approx(1.0, abs=1e-3)
+    zones = result["zones"]
+    assert sum(row["relegation"] for row in result["table"]) == pytest.approx(zones["relegation"], abs=1e-3)
+    for row in result["table"]:
+        assert row["expected_points"] >= row["points"]
+
+
+def test_fixed_seed_is_deterministic_across_pool_sizes():
+    inputs = _inputs()
+    serial   = simulate(inputs, 30_000, workers=1, chunk=10_000, seed=123)
+    parallel = simulate(inputs, 30_000, workers=3, chunk=10_000, seed=123)
+    assert serial == parallel
+    assert simulate(inputs, 30_000, workers=1, chunk=10_000, seed=124) != serial
+
+
+def test_decided_league_gives_certain_title():
+    matches = _league(teams=4, played_rounds=0)
+    # El equipo 1 ya suma 30 puntos: nadie puede alcanzarlo
+    matches += [_match(100 + i, 1, 2, "FINISHED", (3, 0)) for i in range(10)]
+    inputs = build_inputs("PL", matches, lambda home, away: (1.4, 1.2))
+    result = simulate(inputs, 5_000, workers=1, seed=1)
+    leader = next(row for row in result["table"] if row["team_id"] == 1)
+    assert leader["title"] == 1.0 and leader["positions"][0] == 1.0
+
+
+def test_sample_poisson_matches_means():
+    rng = np.random.default_rng(0)
+    lam = np.array([0.3, 1.5, 4.0])
+    goals = sample_poisson(rng, lam, 200_000)
+    np.testing.assert_allclose(goals.mean(axis=0), lam, rtol=0.02)
+    np.testing.assert_allclose(goals.var(axis=0), lam, rtol=0.05)
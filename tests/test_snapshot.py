@@ -0,0 +1,58 @@
+"""Multi-worker: lease del líder por flock y snapshot SQLite compartido."""
+import threading
+
+import pytest
+
+import snapshot
+from snapshot import LeaderLease, SharedSnapshot
+
+
+@pytest.mark.skipif(snapshot.fcntl is None, reason="flock no disponible")
+def test_only_one_lease_holder_until_release(tmp_path):
+    path = str(tmp_path / "fixit.lease")
+    first, second = LeaderLease(path), LeaderLease(path)
+    assert first.try_acquire() and first.held
+    assert first.try_acquire()                  # reentrante en el mismo objeto
+    assert not second.try_acquire() and not second.held
+    first.release()
+    assert second.try_acquire()
+    second.release()
+
+
+def test_snapshot_generations_and_payload(tmp_path):
+    db = str(tmp_path / "snapshot.db")
+    leader, follower = SharedSnapshot(db), SharedSnapshot(db)
+    assert follower.read() == (0, None) and follower.generation() == 0
+    assert leader.publish({"picks": [[1, "A vs B"]], "last_updated": "12:00"}) == 1
+    assert leader.publish({"picks": [], "last_updated": "12:05"}) == 2
+    assert follower.generation() == 2
+    assert follower.read() == (2, {"picks": [], "last_updated": "12:05"})
+
+
+def test_concurrent_publishes_get_distinct_generations(tmp_path):
+    db = str(tmp_path / "snapshot.db")
+    writers = [SharedSnapshot(db) for _ in range(4)]
+    generations = []
+    lock = threading.Lock()
+
+    def publish(writer, n):
+        for i in range(10):
+            generation = writer.publish({"writer": n, "i": i})
+            with lock:
+                generations.append(generation)
+
+    threads = [threading.Thread(target=publish, args=(w, n)) for n, w in enumerate(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(generations) == list(range(1, 41))
+
+
+def test_sync_requests_are_consumed_once(tmp_path):
+    db = str(tmp_path / "snapshot.db")
+    leader, follower = SharedSnapshot(db), SharedSnapshot(db)
+    follower.request_sync({"PL", "CL"})
+    follower.request_sync()
+    assert leader.take_sync_requests() == [["CL", "PL"], None]
+    assert leader.take_sync_requests() == []
@@ -0,0 +1,91 @@
+"""StatsStore: guardado incremental por filas sucias y migración única de stats.json."""
+import json
+import threading
+
+import store
+from settlement import SettledIds
+from store import StatsStore, empty_stats
+
+
+def _count_dumps(monkeypatch) -> list:
+    calls = []
+    original = store._dump
+
+    def counting(value):
+        calls.append(value)
+        return original(value)
+
+    monkeypatch.setattr(store, "_dump", counting)
+    return calls
+
+
+def test_save_serializes_only_replaced_rows(tmp_path, monkeypatch):
+    db = StatsStore(str(tmp_path / "stats.db"))
+    stats = db.load()
+    stats["pending_picks"] = {str(i): {"kickoff": "2026-03-01T15:00:00Z", "picks": []} for i in range(50)}
+    stats["historial"] = [{"equipos": f"A{i} vs B{i}"} for i in range(10)]
+    assert db.save(stats) == 60 + len(store.COUNTER_KEYS)
+
+    dumps = _count_dumps(monkeypatch)
+    assert db.save(stats) == 0
+    assert dumps == []
+
+    stats["pending_picks"]["7"] = {"kickoff": "2026-03-02T15:00:00Z", "picks": []}
+    del stats["pending_picks"]["8"]
+    assert db.save(stats) == 2
+    assert len(dumps) == 1
+
+    reloaded = StatsStore(str(tmp_path / "stats.db")).load()
+    assert reloaded["pending_picks"]["7"]["kickoff"] == "2026-03-02T15:00:00Z"
+    assert "8" not in reloaded["pending_picks"] and len(reloaded["pending_picks"]) == 49
+
+
+def test_settled_ids_are_appended(tmp_path):
+    db = StatsStore(str(tmp_path / "stats.db"))
+    stats = db.load()
+    stats["processed_fixtures"] = SettledIds(stats["processed_fixtures"])
+    stats["processed_fixtures"].add(11)
+    db.save(stats)
+    stats["processed_fixtures"].add(12)
+    assert db.save(stats) == 1
+    assert sorted(db.load()["processed_fixtures"]) == [11, 12]
+
+
+def test_migration_runs_once_across_concurrent_workers(tmp_path):
+    json_path = tmp_path / "stats.json"
+    data = empty_stats()
+    data.update(ganadas=3, historial=[{"equipos": "A vs B"}], processed_fixtures=[1, 2])
+    json_path.write_text(json.dumps(data))
+
+    db_path = str(tmp_path / "stats.db")
+    stores  = [StatsStore(db_path) for _ in range(4)]
+    results = [None] * len(stores)
+    barrier = threading.Barrier(len(stores))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = stores[i].migrate_from_json(str(json_path))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(stores))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 1
+    stats = StatsStore(db_path).load()
+    assert stats["ganadas"] == 3
+    assert stats["historial"] == [{"equipos": "A vs B"}]
+    assert sorted(stats["processed_fixtures"]) == [1, 2]
+
+
+def test_corrupt_json_is_quarantined(tmp_path):
+    json_path = tmp_path / "stats.json"
+    json_path.write_text('{"ganadas": 3, "historial": [')
+    db = StatsStore(str(tmp_path / "stats.db"))
+    messages = []
+    assert db.migrate_from_json(str(json_path), log=lambda msg, level="INFO": messages.append(level)) is False
+    assert not json_path.exists() and (tmp_path / "stats.json.corrupt").exists()
+    assert messages == ["WARNING"]
+    assert db.get_meta("migrated_from_json") == str(json_path) + ".corrupt"
+    assert db.load()["ganadas"] == 0
@@ -0,0 +1,126 @@
+"""Sincronizaciones single-flight con trabajos unidos y cola de trabajos en segundo plano."""
+import threading
+
+from sync_jobs import SyncCoordinator, SyncJob, WorkQueue
+
+
+class GatedRun:
+    """run(job) que espera a que el test lo suelte, para tener un trabajo en curso."""
+
+    def __init__(self, result="ok"):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.jobs    = []
+        self.result  = result
+
+    def __call__(self, job):
+        self.jobs.append(job.comps)
+        self.started.set()
+        assert self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_covers():
+    assert SyncJob(1).covers(None) and SyncJob(1).covers(frozenset({"PL"}))
+    partial = SyncJob(2, {"PL", "CL"})
+    assert partial.covers(frozenset({"PL"})) and not partial.covers(frozenset({"BL1"}))
+    assert not partial.covers(None)
+
+
+def test_requests_join_the_running_job_or_a_single_pending_one():
+    run = GatedRun()
+    finished, all_finished = [], threading.Event()
+
+    def on_finish(job):
+        finished.append(job)
+        if len(finished) == 2:
+            all_finished.set()
+
+    coordinator = SyncCoordinator(run, on_finish=on_finish)
+    running, coalesced = coordinator.submit({"PL"})
+    assert not coalesced and run.started.wait(5)
+
+    same, coalesced = coordinator.submit({"PL"})
+    assert same is running and coalesced and running.callers == 2
+
+    # En curso solo PL: CL y BL1 van a un único trabajo pendiente
+    pending, coalesced = coordinator.submit({"CL"})
+    assert pending is not running and not coalesced
+    joined, coalesced = coordinator.submit({"BL1"})
+    assert joined is pending and coalesced and pending.comps == {"CL", "BL1"}
+    assert pending.state == "queued" and coordinator.current() is running
+
+    run.release.set()
+    assert all_finished.wait(5)
+    assert run.jobs == [frozenset({"PL"}), frozenset({"CL", "BL1"})]
+    assert [job.id for job in finished] == [running.id, pending.id]
+    assert pending.to_dict()["state"] == "done" and pending.to_dict()["callers"] == 2
+    assert coordinator.get(running.id) is running and coordinator.current() is pending
+
+
+def test_pending_full_request_widens_to_all_competitions():
+    run = GatedRun()
+    coordinator = SyncCoordinator(run)
+    running, _ = coordinator.submit({"PL"})
+    assert run.started.wait(5)
+    pending, _ = coordinator.submit({"CL"})
+    coordinator.submit()
+    assert pending.comps is None
+    run.release.set()
+    assert pending.wait(5)
+
+
+def test_failed_run_and_on_finish_errors_do_not_stop_the_loop():
+    run = GatedRun(result=RuntimeError("API caída"))
+    run.release.set()
+    coordinator = SyncCoordinator(run, on_finish=lambda job: 1 / 0)
+    job, _ = coordinator.submit()
+    assert job.wait(5)
+    assert (job.state, job.result, job.error) == ("failed", "error", "API caída")
+    run.result = "partial"
+    again, coalesced = coordinator.submit()
+    assert not coalesced and again.wait(5) and again.state == "done" and again.result == "partial"
+
+
+def test_progress_and_history_limit():
+    coordinator = SyncCoordinator(lambda job: "ok", keep=2)
+    jobs = []
+    for _ in range(3):
+        job, _ = coordinator.submit()
+        assert job.wait(5)
+        jobs.append(job)
+    assert coordinator.get(jobs[0].id) is None and coordinator.get(jobs[2].id) is jobs[2]
+    jobs[2].advance(fixtures=3, picks=5)
+    assert jobs[2].to_dict()["fixtures_done"] == 3 and jobs[2].to_dict()["picks"] == 5
+    assert jobs[2].to_dict()["elapsed"] is not None
+
+
+def test_work_queue_dedupes_queued_keys_and_requeues_running_ones():
+    gate, started = threading.Event(), threading.Event()
+    runs, outcomes, done = [], [], threading.Event()
+
+    def slow():
+        runs.append("settle:1")
+        started.set()
+        gate.wait(5)
+
+    def on_run(key, outcome):
+        outcomes.append((key, outcome))
+        if len(outcomes) == 4:
+            done.set()
+
+    queue = WorkQueue("test", on_run=on_run)
+    assert queue.submit("settle:1", slow)
+    assert started.wait(5)
+    assert queue.pending() == ["settle:1"]
+    assert queue.submit("settle:1", lambda: runs.append("settle:1 again") or "requeued")
+    assert queue.submit("settle:2", lambda: 1 / 0)
+    assert not queue.submit("settle:2", lambda: None)
+    assert queue.submit("settle:3", lambda: runs.append("settle:3"))
+    assert queue.pending() == ["settle:1", "settle:1", "settle:2", "settle:3"]
+    gate.set()
+    assert done.wait(5)
+    assert runs == ["settle:1", "settle:1 again", "settle:3"]
+    assert outcomes == [("settle:1", "ok"), ("settle:1", "requeued"), ("settle:2", "error"), ("settle:3", "ok")]